@@ -0,0 +1,28 @@
+import importlib
+
+
+# Station simulations of trash and track fires at MTA subway stations.
+#
+#     mtasim.mtasim     Station: scheduled cleaning, one event at a time
+#     mtasim.demandsim  Station: threshold cleaning, one event at a time
+#     mtasim.jumpsim    JumpStation: both policies, a cleaning cycle at a time
+#     mtasim.batchsim   BatchStation: scheduled cleaning, many replications at once in numpy
+#     mtasim.sync       syncprod.Station: both policies on common random numbers, with
+#                       costs, and the parallel, sweep and network runners around it
+#                       (multipolicy.MultiStation runs any number of policies at once, and
+#                       trackbeds.TrackBedStation every track bed of a station in numpy;
+#                       crews.CrewNetwork shares a few cleaning crews among many stations)
+#
+# Importing a module never runs a simulation, and numpy (and matplotlib) are only
+# imported by the code that needs them, so importing mtasim costs next to nothing.
+# Submodules are imported on first access, e.g. mtasim.jumpsim.JumpStation after
+# a plain "import mtasim". The scenarios run from the command line through
+# "python -m mtasim" (see __main__.py).
+SUBMODULES = ["mtasim", "demandsim", "jumpsim", "batchsim", "eventlist", "renewal", "markov", "benchmarks",
+              "sync"]
+
+
+def __getattr__(name):
+    if name in SUBMODULES:
+        return importlib.import_module("mtasim." + name)
+    raise AttributeError("module mtasim has no attribute " + name)
@@ -0,0 +1,318 @@
+import argparse
+import random
+import statistics
+import sys
+
+
+# Command line for the existing scenarios:
+#     python -m mtasim periodic  --ridership 20000000 --cleaning-rate 60000 --reps 50 [--engine event|jump|batch]
+#     python -m mtasim threshold --ridership 20000000 --threshold 10000 --reps 50 [--engine event|jump]
+#     (--analytic prints the expected fires and cleanings from renewal.py instead, and
+#     --distribution their exact distributions and tails from markov.py)
+#     python -m mtasim compare   --ridership 20000000 --threshold 2500 --cleaning-rate 30240 --metric maintenance
+#                                [--ridership-profile subway --bucket hour]
+#     python -m mtasim policies  --ridership 25000000 --threshold 1500 2150 2500 --cleaning-rate 26280 --reps 20
+#     python -m mtasim beds      --ridership 25000000 --track-beds 4 --threshold 2150 --cleaning-rate 26280 --reps 100
+#     python -m mtasim sweep     --ridership 25000000 --threshold 1500 2150 2500 --cleaning-rate 20160 26280 --reps 100
+#     python -m mtasim network   stations.csv
+#     python -m mtasim crews     stations.csv --crews 10 --rule fifo|trash|hazard --travel-time 30
+#     python -m mtasim benchmark [--output benchmarks.json | --compare old.json new.json]
+# Each command imports only the modules it runs, so e.g. periodic never loads numpy.
+ENGINES = ["event", "jump", "batch"]
+
+
+def parse_fire_rate_inflation(value):
+    if value == "auto":
+        return value
+    return float(value)
+
+
+def print_summary(name, values):
+    print(name + ": " + str(sum(values) / len(values)) + " +/- " + str(statistics.stdev(values) if len(values) > 1 else 0.0)
+          + " (mean +/- stdev over " + str(len(values)) + " replications)")
+
+
+def print_distribution(name, distribution):
+    from mtasim import markov
+    print(name + ": mean " + str(markov.mean(distribution)))
+    for count in range(len(distribution)):
+        print("  " + str(count) + ": " + str(distribution[count]) + " (at least " + str(count) + ": "
+              + str(markov.tail_probability(distribution, count)) + ")")
+
+
+def run_single_policy(args, policy):
+    if args.distribution:
+        from mtasim.jumpsim import JumpStation
+        s1 = JumpStation(args.ridership, args.track_beds, args.threshold, args.cleaning_rate)
+        distributions = s1.count_distributions(args.end_time, policy)
+        print_distribution("Fires", distributions["fires"])
+        print_distribution("Cleanings", distributions["cleanings"])
+        return 0
+    if args.analytic:
+        # JumpStation has the same rates as the event simulations
+        from mtasim.jumpsim import JumpStation
+        s1 = JumpStation(args.ridership, args.track_beds, args.threshold, args.cleaning_rate)
+        expected = s1.expected_results(args.end_time, policy)
+        for name in expected:
+            print("Expected " + name.replace("_", " ") + ": " + str(expected[name]))
+        return 0
+    if args.seed is not None:
+        random.seed(args.seed)
+    if args.engine == "batch":
+        if policy != "periodic":
+            print("MUST USE THE event OR jump ENGINE FOR THE THRESHOLD POLICY")
+            return 1
+        from mtasim.batchsim import BatchStation
+        s1 = BatchStation(args.ridership, args.track_beds, args.threshold, args.cleaning_rate)
+        fires, cleanings = s1.simulate(args.end_time, args.reps, args.seed)
+        fires = fires.tolist()
+        cleanings = cleanings.tolist()
+    else:
+        if args.engine == "jump":
+            from mtasim.jumpsim import JumpStation
+            s1 = JumpStation(args.ridership, args.track_beds, args.threshold, args.cleaning_rate)
+        elif policy == "periodic":
+            from mtasim.mtasim import Station
+            s1 = Station(args.ridership, args.track_beds, args.threshold, args.cleaning_rate)
+        else:
+            from mtasim.demandsim import Station
+            s1 = Station(args.ridership, args.track_beds, args.threshold)
+        fires = []
+        cleanings = []
+        for i in range(args.reps):
+            if args.engine == "jump":
+                s1.simulate(args.end_time, policy)
+            else:
+                s1.simulate(args.end_time)
+            fires.append(s1.num_fires)
+            cleanings.append(s1.num_cleanings)
+    print_summary("Fires", fires)
+    print_summary("Cleanings", cleanings)
+    return 0
+
+
+def run_periodic(args):
+    return run_single_policy(args, "periodic")
+
+
+def run_threshold(args):
+    return run_single_policy(args, "threshold")
+
+
+def run_compare(args):
+    from mtasim.sync import syncprod
+    cache = None
+    if args.cache is not None:
+        from mtasim.sync.cache import ResultCache
+        cache = ResultCache(args.cache)
+    ridership_profile = None
+    if args.ridership_profile == "subway":
+        from mtasim.sync import ridership
+        ridership_profile = ridership.subway_profile()
+    tracer = None
+    if args.quiet:
+        from mtasim.sync import tracing
+        tracer = tracing.Tracer(tracing.SILENT)
+    syncprod.run_simulations(args.ridership, args.track_beds, args.threshold, args.cleaning_rate, args.metric,
+                             args.limit, seed=args.seed, antithetic=args.antithetic,
+                             control_variate=args.control_variate, fire_rate_inflation=args.fire_rate_inflation,
+                             cache=cache, checkpoint=args.checkpoint, resume=args.resume, tracer=tracer,
+                             profile=args.profile, ridership_profile=ridership_profile, bucket=args.bucket)
+    if cache is not None:
+        cache.close()
+    return 0
+
+
+def run_policies(args):
+    from mtasim.sync import multipolicy
+    # many thresholds and cleaning rates, but one station
+    if len(args.ridership) > 1 or len(args.track_beds) > 1:
+        print("MUST PROVIDE ONE RIDERSHIP AND ONE NUMBER OF TRACK BEDS (USE sweep FOR MORE)")
+        return 1
+    policies = [multipolicy.periodic_policy(cleaning_rate) for cleaning_rate in args.cleaning_rate]
+    policies = policies + [multipolicy.threshold_policy(trash_threshold) for trash_threshold in args.threshold]
+    multipolicy.run_policies(args.ridership[0], args.track_beds[0], policies, args.reps, seed=args.seed,
+                             end_time=args.end_time)
+    return 0
+
+
+def run_beds(args):
+    from mtasim.sync.trackbeds import TrackBedStation
+    s1 = TrackBedStation(args.ridership, args.track_beds, args.threshold, args.cleaning_rate,
+                         ridership_shares=args.shares)
+    year = s1.simulate(args.end_time, args.reps, seed=args.seed)
+    for metric in year:
+        print_summary(metric, list(year[metric]))
+    beds = s1.bed_results()
+    for metric in ["fires_baseline", "fires_alt"]:
+        print(metric + " by track bed: " + str([float(value) for value in beds[metric].mean(axis=0)]))
+    return 0
+
+
+def run_sweep(args):
+    from mtasim.sync import sweep
+    cache = None
+    if args.cache is not None:
+        from mtasim.sync.cache import ResultCache
+        cache = ResultCache(args.cache)
+    grid = {"annual_ridership": args.ridership, "num_track_beds": args.track_beds,
+            "trash_threshold": args.threshold, "cleaning_rate": args.cleaning_rate}
+    rows = sweep.run_sweep(grid, args.reps, seed=args.seed, num_workers=args.workers, end_time=args.end_time,
+                           antithetic=args.antithetic, fire_rate_inflation=args.fire_rate_inflation, cache=cache)
+    if cache is not None:
+        cache.close()
+    for row in rows:
+        print(str(row["annual_ridership"]) + " " + str(row["trash_threshold"]) + " " + str(row["cleaning_rate"])
+              + ": maintenance baseline " + str(row["maintenance_cost_baseline_mean"])
+              + " alt " + str(row["maintenance_cost_alt_mean"]))
+    if args.output is not None:
+        sweep.write_table(rows, args.output)
+    return 0
+
+
+def run_network(args):
+    from mtasim.sync import network
+    stations = network.load_stations(args.stations, args.threshold, args.cleaning_rate)
+    results = network.run_network_simulation(stations, seed=args.seed, num_workers=args.workers,
+                                             end_time=args.end_time)
+    network.print_network_summary(stations, results)
+    return 0
+
+
+def run_crews(args):
+    from mtasim.sync import network
+    from mtasim.sync.crews import CrewNetwork
+    stations = network.load_stations(args.stations, args.threshold, 0.0)
+    s1 = CrewNetwork(stations, args.crews, args.rule, args.travel_time)
+    s1.simulate(args.end_time, seed=args.seed)
+    s1.print_state()
+    return 0
+
+
+def run_benchmark(args):
+    from mtasim import benchmarks
+    if args.compare is not None:
+        benchmarks.compare(benchmarks.load_results(args.compare[0]), benchmarks.load_results(args.compare[1]))
+    else:
+        benchmarks.save_results(benchmarks.run_benchmarks(args.engines), args.output)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m mtasim",
+                                     description="Simulate trash and track fires at subway stations.")
+    commands = parser.add_subparsers(dest="command")
+
+    def add_station_arguments(command, threshold, cleaning_rate, many=False):
+        nargs = "+" if many else None
+        command.add_argument("--ridership", type=int, nargs=nargs, default=[20000000] if many else 20000000,
+                             help="annual ridership")
+        command.add_argument("--track-beds", type=int, nargs=nargs, default=[1] if many else 1,
+                             help="number of track beds")
+        command.add_argument("--threshold", type=int, nargs=nargs, default=[threshold] if many else threshold,
+                             help="trash threshold of the threshold policy")
+        command.add_argument("--cleaning-rate", type=float, nargs=nargs,
+                             default=[cleaning_rate] if many else cleaning_rate,
+                             help="minutes between scheduled cleanings")
+        command.add_argument("--seed", type=int, default=None)
+        command.add_argument("--end-time", type=float, default=525600, help="minutes per replication")
+
+    periodic = commands.add_parser("periodic", help="scheduled cleaning only")
+    add_station_arguments(periodic, 6000, 60000)
+    periodic.add_argument("--reps", type=int, default=50)
+    periodic.add_argument("--engine", choices=ENGINES, default="event")
+    periodic.add_argument("--analytic", action="store_true", help="expectations without simulating")
+    periodic.add_argument("--distribution", action="store_true", help="exact distributions without simulating")
+    periodic.set_defaults(run=run_periodic)
+
+    threshold = commands.add_parser("threshold", help="threshold cleaning only")
+    add_station_arguments(threshold, 10000, 60000)
+    threshold.add_argument("--reps", type=int, default=50)
+    threshold.add_argument("--engine", choices=ENGINES[:2], default="event")
+    threshold.add_argument("--analytic", action="store_true", help="expectations without simulating")
+    threshold.add_argument("--distribution", action="store_true", help="exact distributions without simulating")
+    threshold.set_defaults(run=run_threshold)
+
+    compare = commands.add_parser("compare", help="both policies with costs, until their intervals separate")
+    add_station_arguments(compare, 2500, 30240)
+    compare.add_argument("--metric", choices=["fires", "maintenance", "productivity"], default="maintenance")
+    compare.add_argument("--limit", type=int, default=None, help="most replications to run")
+    compare.add_argument("--antithetic", action="store_true")
+    compare.add_argument("--control-variate", action="store_true")
+    compare.add_argument("--fire-rate-inflation", type=parse_fire_rate_inflation, default=1.0,
+                         help="importance sampling of fires, a factor or auto")
+    compare.add_argument("--cache", default=None, help="SQLite file of finished replications")
+    compare.add_argument("--checkpoint", default=None)
+    compare.add_argument("--resume", action="store_true")
+    compare.add_argument("--profile", action="store_true")
+    compare.add_argument("--quiet", action="store_true", help="do not trace every replication")
+    compare.add_argument("--ridership-profile", choices=["constant", "subway"], default="constant",
+                         help="ridership by hour, weekday and month")
+    compare.add_argument("--bucket", choices=["hour", "weekday", "month"], default=None,
+                         help="also report results by this time bucket")
+    compare.set_defaults(run=run_compare)
+
+    policies = commands.add_parser("policies", help="any number of policies in one pass on common random numbers")
+    add_station_arguments(policies, 2150, 26280, many=True)
+    policies.set_defaults(seed=0)
+    policies.add_argument("--reps", type=int, default=20)
+    policies.set_defaults(run=run_policies)
+
+    beds = commands.add_parser("beds", help="both policies on every track bed of a station, in numpy")
+    add_station_arguments(beds, 2150, 26280)
+    beds.set_defaults(track_beds=4, seed=0)
+    beds.add_argument("--reps", type=int, default=100)
+    beds.add_argument("--shares", type=float, nargs="+", default=None,
+                      help="share of the ridership of each track bed")
+    beds.set_defaults(run=run_beds)
+
+    sweep = commands.add_parser("sweep", help="both policies over a grid of parameters")
+    add_station_arguments(sweep, 2150, 26280, many=True)
+    sweep.set_defaults(seed=0)
+    sweep.add_argument("--reps", type=int, default=100)
+    sweep.add_argument("--workers", type=int, default=None)
+    sweep.add_argument("--antithetic", action="store_true")
+    sweep.add_argument("--fire-rate-inflation", type=parse_fire_rate_inflation, default=1.0)
+    sweep.add_argument("--cache", default=None)
+    sweep.add_argument("--output", default=None, help="CSV file for the table")
+    sweep.set_defaults(run=run_sweep)
+
+    network = commands.add_parser("network", help="every station in a CSV")
+    network.add_argument("stations", help="CSV with station, annual_ridership, num_track_beds columns")
+    network.add_argument("--threshold", type=int, default=None)
+    network.add_argument("--cleaning-rate", type=float, default=None)
+    network.add_argument("--seed", type=int, default=0)
+    network.add_argument("--workers", type=int, default=None)
+    network.add_argument("--end-time", type=float, default=525600)
+    network.set_defaults(run=run_network)
+
+    crews = commands.add_parser("crews", help="every station in a CSV, cleaned and repaired by a few shared crews")
+    crews.add_argument("stations", help="CSV with station, annual_ridership, num_track_beds columns")
+    crews.add_argument("--crews", type=int, default=10, help="number of crews")
+    crews.add_argument("--rule", choices=["fifo", "trash", "hazard"], default="fifo",
+                       help="which waiting station a free crew takes first")
+    crews.add_argument("--travel-time", type=float, default=30.0, help="minutes for a crew to reach a station")
+    crews.add_argument("--threshold", type=int, default=2150)
+    crews.add_argument("--seed", type=int, default=0)
+    crews.add_argument("--end-time", type=float, default=525600)
+    crews.set_defaults(run=run_crews)
+
+    benchmark = commands.add_parser("benchmark", help="fixed-seed benchmarks of the engines")
+    benchmark.add_argument("--output", default="benchmarks.json")
+    benchmark.add_argument("--engines", nargs="+", default=None)
+    benchmark.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), default=None)
+    benchmark.set_defaults(run=run_benchmark)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command is None:
+        parser.print_help()
+        return 1
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
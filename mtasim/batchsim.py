@@ -0,0 +1,187 @@
+import math
+import statistics
+import numpy
+
+
+# Vectorized version of the periodic model in mtasim.py. Every replication is a
+# "lane" in a set of numpy arrays, and all lanes are advanced together.
+#
+# Each step covers the next block_size trash arrivals of every lane. Only the time
+# of the last arrival in the block is drawn (a gamma variate), and a fire
+# candidate is drawn by thinning against the largest fire rate the block can
+# reach. For most lanes that candidate lands after the block, so the block holds
+# no fire and the individual arrival times are never needed. The few lanes with a
+# fire candidate inside the block, or with the end of the year inside it, get
+# their arrival times filled in (uniform order statistics given the last one) and
+# are resolved exactly. Anything drawn past the event that ends a block is thrown
+# away, which is fine since the Poisson arrivals and fire clocks are memoryless.
+class BatchStation:
+
+    def __init__(self, annual_ridership, num_track_beds, trash_threshold, cleaning_rate, block_size=1024):
+        self.annual_ridership = annual_ridership
+        self.num_track_beds = num_track_beds
+
+        self.trash_threshold = trash_threshold
+
+        self.cleaning_rate = cleaning_rate
+
+        # same rates as mtasim.Station
+        self.trash_arrival_rate = (1.0/100000000) * annual_ridership
+        self.fire_arrival_rate_scalar = 1.0/1000000000
+
+        # number of trash arrivals covered per lane on each step
+        self.block_size = block_size
+
+        # one entry per replication
+        self.num_reps = 0
+        self.time = numpy.zeros(0)
+        self.aggregate_trash = numpy.zeros(0, dtype=numpy.int64)
+        self.next_scheduled_cleaning = numpy.zeros(0)
+        self.num_cleanings = numpy.zeros(0, dtype=numpy.int64)
+        self.num_scheduled_cleanings = numpy.zeros(0, dtype=numpy.int64)
+        self.num_fires = numpy.zeros(0, dtype=numpy.int64)
+        self.num_trash_arrivals = numpy.zeros(0, dtype=numpy.int64)
+
+    def initialize_simulation(self, num_reps):
+        self.num_reps = num_reps
+        self.time = numpy.zeros(num_reps)
+        self.aggregate_trash = numpy.zeros(num_reps, dtype=numpy.int64)
+        self.next_scheduled_cleaning = numpy.full(num_reps, float(self.cleaning_rate))
+        self.num_cleanings = numpy.zeros(num_reps, dtype=numpy.int64)
+        self.num_scheduled_cleanings = numpy.zeros(num_reps, dtype=numpy.int64)
+        self.num_fires = numpy.zeros(num_reps, dtype=numpy.int64)
+        self.num_trash_arrivals = numpy.zeros(num_reps, dtype=numpy.int64)
+
+    def print_state(self):
+        print("--------------------------------")
+        print("Number of replications: " + str(self.num_reps))
+        print("Mean number of cleanings: " + str(self.num_cleanings.mean()))
+        print("Mean number of scheduled cleanings: " + str(self.num_scheduled_cleanings.mean()))
+        print("Mean number of fires: " + str(self.num_fires.mean()))
+        print("Mean number of trash arrivals: " + str(self.num_trash_arrivals.mean()))
+        print("--------------------------------\n\n")
+
+    def advance(self, lanes, end_time, rng):
+        block_size = self.block_size
+
+        time = self.time[lanes]
+        aggregate_trash = self.aggregate_trash[lanes]
+        next_scheduled_cleaning = self.next_scheduled_cleaning[lanes]
+
+        # time of the last trash arrival in the block
+        block_length = rng.standard_gamma(block_size, lanes.size) / self.trash_arrival_rate
+        # the fire rate never exceeds its value just before the last arrival in the block
+        max_fire_rate = self.fire_arrival_rate_scalar * (aggregate_trash + block_size - 1)
+        with numpy.errstate(divide="ignore"):
+            fire_candidate = rng.standard_exponential(lanes.size) / max_fire_rate
+
+        window = numpy.minimum(block_length, next_scheduled_cleaning)
+        detailed = (fire_candidate < window) | (time + window >= end_time)
+
+        # no fire and no end of year before the block ends or the scheduled cleaning happens
+        simple = numpy.flatnonzero(~detailed)
+        cleaning = next_scheduled_cleaning[simple] < block_length[simple]
+        whole_block = simple[~cleaning]
+        self.time[lanes[whole_block]] = time[whole_block] + block_length[whole_block]
+        self.aggregate_trash[lanes[whole_block]] = aggregate_trash[whole_block] + block_size
+        self.next_scheduled_cleaning[lanes[whole_block]] = next_scheduled_cleaning[whole_block] - block_length[whole_block]
+        self.num_trash_arrivals[lanes[whole_block]] += block_size
+
+        scheduled = simple[cleaning]
+        # arrivals before the last one are uniform over the block
+        arrivals = rng.binomial(block_size - 1, next_scheduled_cleaning[scheduled] / block_length[scheduled])
+        self.time[lanes[scheduled]] = time[scheduled] + next_scheduled_cleaning[scheduled]
+        self.aggregate_trash[lanes[scheduled]] = 0
+        self.next_scheduled_cleaning[lanes[scheduled]] = self.cleaning_rate
+        self.num_trash_arrivals[lanes[scheduled]] += arrivals
+        self.num_cleanings[lanes[scheduled]] += 1
+        self.num_scheduled_cleanings[lanes[scheduled]] += 1
+
+        detailed = numpy.flatnonzero(detailed)
+        if detailed.size > 0:
+            self.advance_detailed(lanes[detailed], end_time, block_length[detailed], fire_candidate[detailed], rng)
+
+    def advance_detailed(self, lanes, end_time, block_length, fire_candidate, rng):
+        num_lanes = lanes.size
+        block_size = self.block_size
+        rows = numpy.arange(num_lanes)
+
+        time = self.time[lanes]
+        aggregate_trash = self.aggregate_trash[lanes]
+        next_scheduled_cleaning = self.next_scheduled_cleaning[lanes]
+
+        # arrival_times[:, j] is the time of the j-th arrival in the block, with
+        # arrival_times[:, 0] = 0 standing in for the start of the block
+        arrival_times = numpy.zeros((num_lanes, block_size + 1))
+        arrival_times[:, 1:block_size] = numpy.sort(rng.random_sample((num_lanes, block_size - 1)), axis=1)
+        arrival_times[:, 1:block_size] *= block_length[:, None]
+        arrival_times[:, block_size] = block_length
+
+        # thin the fire candidates down to the actual fire rate, which only counts
+        # the trash that has arrived by the time of the candidate
+        max_trash = aggregate_trash + block_size - 1
+        window = numpy.minimum(block_length, next_scheduled_cleaning)
+        fire = numpy.full(num_lanes, math.inf)
+        pending = numpy.flatnonzero(fire_candidate < window)
+        while pending.size > 0:
+            candidate = fire_candidate[pending]
+            trash = aggregate_trash[pending] + (arrival_times[pending, 1:block_size] <= candidate[:, None]).sum(axis=1)
+            accepted = rng.random_sample(pending.size) * max_trash[pending] < trash
+            fire[pending[accepted]] = candidate[accepted]
+            pending = pending[~accepted]
+            fire_candidate[pending] = fire_candidate[pending] + rng.standard_exponential(pending.size) / (self.fire_arrival_rate_scalar * max_trash[pending])
+            pending = pending[fire_candidate[pending] < window[pending]]
+
+        # same tie-breaking as Station.simulate: trash, then scheduled cleaning, then fire
+        event = numpy.minimum(fire, next_scheduled_cleaning)
+        has_event = event < block_length
+        arrivals = numpy.where(has_event, (arrival_times[:, 1:] <= event[:, None]).sum(axis=1), block_size)
+
+        # Station.simulate keeps processing events while its clock is before
+        # end_time, so the first event past the end of the year still counts
+        before_end = (time[:, None] + arrival_times[:, :block_size] < end_time).sum(axis=1)
+        processed = numpy.minimum(arrivals, before_end)
+        last_arrival = arrival_times[rows, processed]
+        cleaning = has_event & (processed == arrivals) & (time + last_arrival < end_time)
+        scheduled_cleaning = cleaning & (next_scheduled_cleaning <= fire)
+        fire_cleaning = cleaning & ~scheduled_cleaning
+
+        time = numpy.where(cleaning, time + event, time + last_arrival)
+        aggregate_trash = numpy.where(cleaning, 0, aggregate_trash + processed)
+        # next_scheduled_cleaning is relative to the lane's clock, which moves to the
+        # fire on a fire and to the last trash arrival otherwise; like Station.clean(True),
+        # a fire leaves the scheduled cleaning where it was
+        next_scheduled_cleaning = numpy.where(scheduled_cleaning, self.cleaning_rate,
+                                              next_scheduled_cleaning - numpy.where(fire_cleaning, event, last_arrival))
+
+        self.time[lanes] = time
+        self.aggregate_trash[lanes] = aggregate_trash
+        self.next_scheduled_cleaning[lanes] = next_scheduled_cleaning
+        self.num_trash_arrivals[lanes] += processed
+        self.num_cleanings[lanes] += cleaning
+        self.num_scheduled_cleanings[lanes] += scheduled_cleaning
+        self.num_fires[lanes] += fire_cleaning
+
+    def simulate(self, end_time, num_reps, seed=None):
+        rng = numpy.random.RandomState(seed)
+        # initialize start of simulation
+        self.initialize_simulation(num_reps)
+
+        lanes = numpy.arange(num_reps)
+        while lanes.size > 0:
+            self.advance(lanes, end_time, rng)
+            lanes = lanes[self.time[lanes] < end_time]
+        return self.num_fires, self.num_cleanings
+
+
+if __name__ == "__main__":
+    print("Starting")
+    s1 = BatchStation(20000000, 1, 6000, 60000)
+    num_reps = 1000
+    fires, cleanings = s1.simulate(525600, num_reps)
+    s1.print_state()
+    print(sum(fires)/len(fires))
+    print(statistics.stdev(fires.tolist()))
+
+    print(sum(cleanings)/len(cleanings))
+    print(statistics.stdev(cleanings.tolist()))
@@ -0,0 +1,226 @@
+import json
+import multiprocessing
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+from mtasim import demandsim
+from mtasim import mtasim
+from mtasim.sync import syncprod
+
+
+# Benchmarks of the Station simulations, for comparing one revision with another.
+#
+# Every scenario runs a fixed number of simulated years of one engine at one
+# ridership, with a fixed seed, so two revisions simulate the same years:
+#     mtasim     mtasim.Station, scheduled cleaning
+#     demandsim  demandsim.Station, threshold cleaning
+#     syncprod   syncprod.Station, both policies side by side
+# Each scenario runs in a fresh process so its peak memory (the process' maximum
+# resident set size) is its own. Events are counted by the stations' event lists.
+# Also measured: the time to import each engine in a fresh interpreter, and the
+# time for a freshly spawned worker process to build its first syncprod.Station.
+#
+#     python -m mtasim.benchmarks [results.json]
+#     python -m mtasim.benchmarks compare old.json new.json
+ENGINES = ["mtasim", "demandsim", "syncprod"]
+
+# annual ridership -> simulated years per scenario, about a second of work each
+RIDERSHIPS = {200000: 40, 3700000: 8, 25000000: 2, 40000000: 1}
+
+SEED = 12345
+END_TIME = 525600
+
+# policy parameters of the scenarios, one track bed
+TRASH_THRESHOLD = 2150
+CLEANING_RATE = 26280
+
+# in compare, changes in events per second smaller than this are reported as noise
+NOISE = 0.05
+
+IMPORT_MODULES = ["mtasim", "mtasim.mtasim", "mtasim.demandsim", "mtasim.jumpsim", "mtasim.batchsim",
+                  "mtasim.sync.syncprod", "mtasim.sync.parallel"]
+
+
+def scenarios(engines=None):
+    if engines is None:
+        engines = ENGINES
+    result = []
+    for engine in engines:
+        if engine not in ENGINES:
+            raise ValueError("UNKNOWN ENGINE " + engine)
+        for annual_ridership in RIDERSHIPS:
+            result.append({"name": engine + "_" + str(annual_ridership),
+                           "engine": engine,
+                           "annual_ridership": annual_ridership,
+                           "reps": RIDERSHIPS[annual_ridership]})
+    return result
+
+
+def make_station(engine, annual_ridership):
+    if engine == "mtasim":
+        return mtasim.Station(annual_ridership, 1, TRASH_THRESHOLD, CLEANING_RATE)
+    if engine == "demandsim":
+        return demandsim.Station(annual_ridership, 1, TRASH_THRESHOLD)
+    return syncprod.Station(annual_ridership, 1, TRASH_THRESHOLD, CLEANING_RATE, verbose=False)
+
+
+def peak_memory_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    if sys.platform == "darwin":
+        return peak / 1048576
+    return peak / 1024
+
+
+def run_scenario(scenario):
+    s1 = make_station(scenario["engine"], scenario["annual_ridership"])
+    random.seed(SEED)
+    num_events = 0
+    start = time.perf_counter()
+    for rep in range(scenario["reps"]):
+        if scenario["engine"] == "syncprod":
+            s1.seed(SEED, rep)
+        s1.simulate(END_TIME)
+        num_events = num_events + s1.events.num_popped
+    wall_time = time.perf_counter() - start
+    result = dict(scenario)
+    result["wall_time"] = wall_time
+    result["events"] = num_events
+    result["events_per_sec"] = num_events / wall_time
+    result["reps_per_sec"] = scenario["reps"] / wall_time
+    result["peak_memory_mb"] = peak_memory_mb()
+    return result
+
+
+def import_time(module, repeat=5):
+    # best of repeat, in seconds, each in a fresh interpreter
+    code = ("import time\nstart = time.perf_counter()\nimport " + module + "\n"
+            "print(time.perf_counter() - start)")
+    best = None
+    for i in range(repeat):
+        output = subprocess.run([sys.executable, "-c", code], stdout=subprocess.PIPE, universal_newlines=True,
+                                check=True).stdout
+        seconds = float(output.split()[-1])
+        if best is None or seconds < best:
+            best = seconds
+    return best
+
+
+def worker_ready():
+    make_station("syncprod", 200000)
+    return True
+
+
+def worker_startup_time(repeat=3):
+    # best of repeat, in seconds: spawn a worker and have it build a station
+    context = multiprocessing.get_context("spawn")
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        with context.Pool(1) as pool:
+            pool.apply(worker_ready)
+            seconds = time.perf_counter() - start
+        if best is None or seconds < best:
+            best = seconds
+    return best
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                              universal_newlines=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(engines=None, verbose=True):
+    import_times = {}
+    for module in IMPORT_MODULES:
+        import_times[module] = import_time(module)
+        if verbose:
+            print("import " + module + ": " + str(round(1000 * import_times[module], 1)) + " ms")
+    worker_startup = worker_startup_time()
+    if verbose:
+        print("worker startup: " + str(round(1000 * worker_startup, 1)) + " ms")
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for scenario in scenarios(engines):
+        with context.Pool(1) as pool:
+            result = pool.apply(run_scenario, (scenario,))
+        if verbose:
+            print_result(result)
+        results.append(result)
+    return {"revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "import_times": import_times,
+            "worker_startup": worker_startup,
+            "results": results}
+
+
+def print_result(result):
+    print(result["name"] + ": " + str(result["events"]) + " events in " + str(round(result["wall_time"], 3))
+          + " s, " + str(round(result["events_per_sec"])) + " events/s, "
+          + str(round(result["reps_per_sec"], 3)) + " reps/s, peak memory "
+          + str(round(result["peak_memory_mb"], 1)) + " MB")
+
+
+def save_results(benchmark, path):
+    with open(path, "w") as f:
+        json.dump(benchmark, f, indent=2)
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(old, new):
+    # speedup of new over old for every scenario they both ran, new / old events per second
+    old_results = {}
+    for result in old["results"]:
+        old_results[result["name"]] = result
+    speedups = {}
+    print("old " + str(old["revision"]) + ", new " + str(new["revision"]))
+    # older result files may not have the startup measurements
+    old_import_times = old.get("import_times", {})
+    for module in new.get("import_times", {}):
+        if module in old_import_times:
+            print("import " + module + ": " + str(round(1000 * old_import_times[module], 1)) + " -> "
+                  + str(round(1000 * new["import_times"][module], 1)) + " ms")
+    if "worker_startup" in old and "worker_startup" in new:
+        print("worker startup: " + str(round(1000 * old["worker_startup"], 1)) + " -> "
+              + str(round(1000 * new["worker_startup"], 1)) + " ms")
+    for result in new["results"]:
+        if result["name"] not in old_results:
+            continue
+        previous = old_results[result["name"]]
+        speedup = result["events_per_sec"] / previous["events_per_sec"]
+        speedups[result["name"]] = speedup
+        if speedup > 1 + NOISE:
+            verdict = "faster"
+        elif speedup < 1 - NOISE:
+            verdict = "SLOWER"
+        else:
+            verdict = "same"
+        print(result["name"] + ": " + str(round(previous["events_per_sec"])) + " -> "
+              + str(round(result["events_per_sec"])) + " events/s (x" + str(round(speedup, 3)) + ", " + verdict
+              + "), peak memory " + str(round(previous["peak_memory_mb"], 1)) + " -> "
+              + str(round(result["peak_memory_mb"], 1)) + " MB")
+    return speedups
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "compare":
+        compare(load_results(sys.argv[2]), load_results(sys.argv[3]))
+    elif len(sys.argv) <= 2:
+        path = sys.argv[1] if len(sys.argv) == 2 else "benchmarks.json"
+        print("Starting")
+        save_results(run_benchmarks(), path)
+    else:
+        print("MUST PROVIDE RESULTS PATH OR compare OLD NEW")
+        sys.exit(1)
@@ -2,6 +2,9 @@ import math
 import random
 import statistics
 from collections import deque
+from mtasim.eventlist import EventList
+from mtasim import markov
+from mtasim import renewal
 
 
 class Station:
@@ -30,8 +33,8 @@ class Station:
 
         self.num_fires = 0
 
-        self.next_trash_arrival = 0.0
-        self.next_fire_arrival = 0.0
+        # future event list; ties go to trash, then fire
+        self.events = EventList({"trash": 0, "fire": 1})
 
     def initialize_simulation(self):
         self.time = 0.0
@@ -41,15 +44,15 @@ class Station:
         self.num_threshold_cleanings = 0
         self.num_fires = 0
 
-        self.next_trash_arrival = random.expovariate(self.trash_arrival_rate)
-        self.next_fire_arrival = math.inf
+        self.events.clear()
+        self.events.schedule("trash", random.expovariate(self.trash_arrival_rate))
 
     def print_state(self):
         print("--------------------------------")
         print("Current Time: " + str(self.time))
         print("Aggregate Trash: " + str(self.aggregate_trash))
-        print("Time until next trash: " + str(self.next_trash_arrival))
-        print("Time until next fire: " + str(self.next_fire_arrival))
+        print("Time until next trash: " + str(self.events.time_of("trash") - self.time))
+        print("Time until next fire: " + str(self.events.time_of("fire") - self.time))
         print("\nFire arrival rate: " + str(self.fire_arrival_rate))
         print("\nNumber of cleanings to date:" + str(self.num_cleanings))
         print("Number of threshold cleanings to date:" + str(self.num_threshold_cleanings))
@@ -59,8 +62,8 @@ class Station:
     def recalculate_next_fire_arrival(self):
         # set fire arrival rate based on aggregate trash
         self.fire_arrival_rate = (1.0/1000000000) * self.aggregate_trash
-        # generate next_fire_arrival
-        self.next_fire_arrival = random.expovariate(self.fire_arrival_rate)
+        # generate next fire arrival
+        self.events.schedule("fire", self.time + random.expovariate(self.fire_arrival_rate))
 
     def clean(self, fire):
         self.num_cleanings = self.num_cleanings + 1
@@ -70,54 +73,58 @@ class Station:
         # increment self.time by amount of time for cleaning / fire repair
         if not fire:
             self.num_threshold_cleanings = self.num_threshold_cleanings + 1
-        self.next_trash_arrival = random.expovariate(self.trash_arrival_rate)
-        self.next_fire_arrival = math.inf
+        self.events.schedule("trash", self.time + random.expovariate(self.trash_arrival_rate))
+        self.events.cancel("fire")
+
+    def expected_results(self, end_time):
+        # expected fires and cleanings in end_time minutes, from renewal theory (see renewal.py)
+        return renewal.expected_results(self.trash_arrival_rate, 1.0/1000000000, self.trash_threshold, None,
+                                        end_time, "threshold")
+
+    def count_distributions(self, end_time):
+        # exact distributions of fires and cleanings in end_time minutes (see markov.py)
+        return markov.count_distributions(self.trash_arrival_rate, 1.0/1000000000, self.trash_threshold, None,
+                                          end_time, "threshold")
 
     def simulate(self, end_time):
         # initialize start of simulation
         self.initialize_simulation()
 
         while self.time < end_time:
-            if self.next_trash_arrival == min(self.next_fire_arrival, self.next_trash_arrival):
+            self.time, event = self.events.pop()
+            if event == "trash":
                 # print("********* Trash Arrives")
-                time_elapsed = self.next_trash_arrival
-                self.time = self.time + time_elapsed
                 self.aggregate_trash = self.aggregate_trash + 1
                 if self.aggregate_trash > self.trash_threshold:
                     self.clean(False)
                 else:
-                    self.next_trash_arrival = random.expovariate(self.trash_arrival_rate)
+                    self.events.schedule("trash", self.time + random.expovariate(self.trash_arrival_rate))
                     self.recalculate_next_fire_arrival()
-            else:  # next_fire_arrival is the min
+            else:  # fire
                 # self.print_state()
                 # print("********* FIRE!!!")
-                time_elapsed = self.next_fire_arrival
-                self.time = self.time + time_elapsed
                 self.num_fires = self.num_fires + 1
                 self.clean(True)
 
 
-print("Starting")
-threshold = 10000
-# s1 = Station(40000000, 2, threshold)
-# s1 = Station(200000, 1, threshold)
-s1 = Station(20000000, 1, threshold)
-# s1 = Station(40000000, 1, threshold)
-num_reps = 50
-reps = []
-for i in range(num_reps):
-    s1.simulate(525600)
-    s1.print_state()
-    reps.append((s1.num_fires, s1.num_cleanings))
-print()
-print([x[0] for x in reps])
-print(sum([x[0] for x in reps])/len([x[0] for x in reps]))
-print(statistics.stdev([x[0] for x in reps]))
-
-print([x[1] for x in reps])
-print(sum([x[1] for x in reps])/len([x[1] for x in reps]))
-print(statistics.stdev([x[1] for x in reps]))
-
-
-
-
+if __name__ == "__main__":
+    print("Starting")
+    threshold = 10000
+    # s1 = Station(40000000, 2, threshold)
+    # s1 = Station(200000, 1, threshold)
+    s1 = Station(20000000, 1, threshold)
+    # s1 = Station(40000000, 1, threshold)
+    num_reps = 50
+    reps = []
+    for i in range(num_reps):
+        s1.simulate(525600)
+        s1.print_state()
+        reps.append((s1.num_fires, s1.num_cleanings))
+    print()
+    print([x[0] for x in reps])
+    print(sum([x[0] for x in reps])/len([x[0] for x in reps]))
+    print(statistics.stdev([x[0] for x in reps]))
+
+    print([x[1] for x in reps])
+    print(sum([x[1] for x in reps])/len([x[1] for x in reps]))
+    print(statistics.stdev([x[1] for x in reps]))
@@ -0,0 +1,91 @@
+import heapq
+import itertools
+import math
+
+
+# Future event list for the Station simulations, kept as a binary heap on absolute
+# event times.
+#
+# Every pending event has a name ("trash", "fire", ...) and there is at most one
+# pending event per name, so scheduling a name that is already pending reschedules
+# it. Events at the same time come out in the order of their priority (lower
+# first), then in the order they were scheduled. Cancelled and rescheduled entries
+# are not removed from the heap; they are skipped when they reach the top, and the
+# heap is rebuilt once they make up more than half of it.
+class EventList:
+
+    def __init__(self, priorities=None):
+        # event name -> tie-breaking priority
+        self.priorities = {} if priorities is None else dict(priorities)
+        # heap entries are (time, priority, count, name)
+        self.heap = []
+        # event name -> its live heap entry
+        self.entries = {}
+        self.counter = itertools.count()
+        # events popped since the last clear
+        self.num_popped = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, name):
+        return name in self.entries
+
+    def clear(self):
+        self.heap = []
+        self.entries = {}
+        self.counter = itertools.count()
+        self.num_popped = 0
+
+    def schedule(self, name, time):
+        # schedule (or reschedule) name at absolute time; an event at infinity never
+        # happens, so it is just cancelled
+        if time == math.inf:
+            self.entries.pop(name, None)
+            return
+        count = next(self.counter)
+        entry = (time, self.priorities.get(name, 0), count, name)
+        self.entries[name] = entry
+        heapq.heappush(self.heap, entry)
+        # only look at the size of the heap every 64 events
+        if not count & 63 and len(self.heap) > 2 * len(self.entries) + 32:
+            self.compact()
+
+    def reschedule(self, name, delay):
+        # move a pending event later (or earlier) by delay
+        self.schedule(name, self.entries[name][0] + delay)
+
+    def cancel(self, name):
+        self.entries.pop(name, None)
+
+    def compact(self):
+        entries = self.entries
+        self.heap = [entry for entry in self.heap if entries.get(entry[3]) is entry]
+        heapq.heapify(self.heap)
+
+    def time_of(self, name):
+        entry = self.entries.get(name)
+        if entry is None:
+            return math.inf
+        return entry[0]
+
+    def peek(self):
+        heap = self.heap
+        entries = self.entries
+        while heap and entries.get(heap[0][3]) is not heap[0]:
+            heapq.heappop(heap)
+        if not heap:
+            return math.inf, None
+        return heap[0][0], heap[0][3]
+
+    def pop(self):
+        heap = self.heap
+        entries = self.entries
+        while heap:
+            entry = heapq.heappop(heap)
+            name = entry[3]
+            if entries.get(name) is entry:
+                del entries[name]
+                self.num_popped = self.num_popped + 1
+                return entry[0], name
+        raise IndexError("pop from an empty event list")
@@ -1,7 +1,5 @@
 import math
 import random
-import numpy as np
-import matplotlib.pyplot as plt
 import statistics
 
 # rate = 20000000.0/100000000.0  # 0.2 arrivals of trash per minute
@@ -24,23 +22,26 @@ def generate_three_weeks_of_trash():
         interarrival_time = -math.log(1.0 - random.random()) / rate
     print(num_arrivals)  # print the total number of arrivals of trash in this three week period
 
-for i in range(50):
-    generate_three_weeks_of_trash()
+if __name__ == "__main__":
+    for i in range(50):
+        generate_three_weeks_of_trash()
 
-print("Notice how steady/consistent the amount of trash generated in 3 weeks is / how little variance there is")
+    print("Notice how steady/consistent the amount of trash generated in 3 weeks is / how little variance there is")
 
 
 
-# psamples = np.random.poisson(12, 10000)
-psamples = np.random.poisson(rate*limit, 10000)
-print(psamples)
-print(sum(psamples)/len(psamples))
-print()
-print(statistics.stdev(psamples))
-print(statistics.stdev(psamples)**2)
-print()
-print(rate*limit)
+    import numpy as np
+    # psamples = np.random.poisson(12, 10000)
+    psamples = np.random.poisson(rate*limit, 10000)
+    print(psamples)
+    print(sum(psamples)/len(psamples))
+    print()
+    print(statistics.stdev(psamples))
+    print(statistics.stdev(psamples)**2)
+    print()
+    print(rate*limit)
 
 
-count, bins, ignored = plt.hist(psamples, 14, normed=True)
-plt.show()
\ No newline at end of file
+    import matplotlib.pyplot as plt
+    count, bins, ignored = plt.hist(psamples, 14, normed=True)
+    plt.show()
@@ -0,0 +1,202 @@
+import math
+import random
+import statistics
+from mtasim import markov
+from mtasim import renewal
+
+
+# Cycle-jump version of mtasim.py (periodic cleaning) and demandsim.py (threshold
+# cleaning). Both models reset aggregate_trash to zero on every cleaning and every
+# fire, and between resets the fire rate is fire_arrival_rate_scalar times the
+# number of units of trash on the tracks. So instead of stepping through every
+# trash arrival, each call below draws the next cleaning or fire directly from the
+# cumulative fire hazard since the last reset.
+#
+# Periodic policy: every unit of trash can be seen as carrying its own
+# Exp(fire_arrival_rate_scalar) ignition clock that starts when it arrives, and the
+# first ignition is the fire. The ignition times of Poisson arrivals form a Poisson
+# process with cumulative intensity
+#     trash_arrival_rate * (t - (1 - exp(-fire_arrival_rate_scalar * t)) / fire_arrival_rate_scalar)
+# so the time to the next fire takes one exponential draw and a Newton solve.
+#
+# Threshold policy: counted in trash arrivals instead of minutes, the k-th interval
+# after a reset ends in a fire with probability
+#     fire_arrival_rate_scalar * k / (trash_arrival_rate + fire_arrival_rate_scalar * k)
+# The interval the fire lands in is found by binary search on the cumulative log
+# hazard, which has a closed form, and the length of the cycle is a gamma draw
+# whose rate is the mean of the interval rates. That rate is exact to first order in
+# fire_arrival_rate_scalar * k / trash_arrival_rate, which is below 1e-4 for every
+# station we model.
+class JumpStation:
+
+    def __init__(self, annual_ridership, num_track_beds, trash_threshold, cleaning_rate):
+        self.annual_ridership = annual_ridership
+        self.num_track_beds = num_track_beds
+
+        self.trash_threshold = trash_threshold
+
+        self.cleaning_rate = cleaning_rate
+
+        # same rates as mtasim.Station and demandsim.Station
+        self.trash_arrival_rate = (1.0/100000000) * annual_ridership
+        self.fire_arrival_rate_scalar = 1.0/1000000000
+
+        # Units: minutes
+        self.time = 0.0
+
+        self.num_cleanings = 0
+        self.num_scheduled_cleanings = 0
+        self.num_threshold_cleanings = 0
+        self.num_fires = 0
+        self.num_cycles = 0
+
+    def initialize_simulation(self):
+        self.time = 0.0
+
+        self.num_cleanings = 0
+        self.num_scheduled_cleanings = 0
+        self.num_threshold_cleanings = 0
+        self.num_fires = 0
+        self.num_cycles = 0
+
+    def print_state(self):
+        print("--------------------------------")
+        print("Current Time: " + str(self.time))
+        print("\nNumber of cleanings to date:" + str(self.num_cleanings))
+        print("Number of scheduled cleanings to date:" + str(self.num_scheduled_cleanings))
+        print("Number of threshold cleanings to date:" + str(self.num_threshold_cleanings))
+        print("Number of fires to date:" + str(self.num_fires))
+        print("Number of cleaning cycles simulated:" + str(self.num_cycles))
+        print("--------------------------------\n\n")
+
+    def cumulative_fire_hazard(self, elapsed):
+        # cumulative intensity of the first ignition, elapsed minutes after a reset
+        x = self.fire_arrival_rate_scalar * elapsed
+        if x < 1e-3:
+            # series for x + expm1(-x), which cancels badly for small x
+            y = x * x * (0.5 - x * (1.0/6 - x * (1.0/24 - x / 120)))
+        else:
+            y = x + math.expm1(-x)
+        return self.trash_arrival_rate * y / self.fire_arrival_rate_scalar
+
+    def time_to_next_fire(self):
+        hazard = random.expovariate(1.0)
+        # the cumulative hazard is close to quadratic, which gives a good first guess
+        elapsed = math.sqrt(2.0 * hazard / (self.trash_arrival_rate * self.fire_arrival_rate_scalar))
+        for i in range(50):
+            rate = self.trash_arrival_rate * -math.expm1(-self.fire_arrival_rate_scalar * elapsed)
+            step = (self.cumulative_fire_hazard(elapsed) - hazard) / rate
+            elapsed = elapsed - step
+            if abs(step) <= 1e-12 * elapsed:
+                break
+        return elapsed
+
+    def log_survival(self, num_intervals):
+        # sum over k = 1..num_intervals of log(1 + fire_arrival_rate_scalar * k / trash_arrival_rate),
+        # i.e. minus the log of the chance that none of the first num_intervals
+        # intervals after a reset ends in a fire
+        x = self.fire_arrival_rate_scalar / self.trash_arrival_rate
+        m = num_intervals
+        if x * m < 1e-2:
+            s1 = m * (m + 1) / 2.0
+            s2 = m * (m + 1) * (2 * m + 1) / 6.0
+            s3 = s1 * s1
+            s4 = m * (m + 1) * (2 * m + 1) * (3 * m * m + 3 * m - 1) / 30.0
+            return x * s1 - x * x * s2 / 2 + x ** 3 * s3 / 3 - x ** 4 * s4 / 4
+        return math.lgamma(1.0 / x + m + 1) - math.lgamma(1.0 / x + 1) + m * math.log(x)
+
+    def cycle_length(self, num_intervals):
+        # total length of intervals 0..num_intervals - 1 after a reset
+        mean_rate = self.trash_arrival_rate + self.fire_arrival_rate_scalar * (num_intervals - 1) / 2.0
+        return random.gammavariate(num_intervals, 1.0 / mean_rate)
+
+    def simulate_periodic(self, end_time):
+        next_scheduled_cleaning = self.cleaning_rate
+        while True:
+            self.num_cycles = self.num_cycles + 1
+            next_fire = self.time + self.time_to_next_fire()
+            if next_fire < next_scheduled_cleaning:
+                if next_fire >= end_time:
+                    break
+                self.time = next_fire
+                self.num_fires = self.num_fires + 1
+                self.num_cleanings = self.num_cleanings + 1
+            else:
+                if next_scheduled_cleaning >= end_time:
+                    break
+                self.time = next_scheduled_cleaning
+                self.num_cleanings = self.num_cleanings + 1
+                self.num_scheduled_cleanings = self.num_scheduled_cleanings + 1
+                next_scheduled_cleaning = next_scheduled_cleaning + self.cleaning_rate
+        self.time = end_time
+
+    def simulate_threshold(self, end_time):
+        while True:
+            self.num_cycles = self.num_cycles + 1
+            # interval k after a reset has k units of trash on the tracks; a threshold
+            # cleaning happens on the arrival that ends interval trash_threshold
+            hazard = random.expovariate(1.0)
+            if self.log_survival(self.trash_threshold) <= hazard:
+                fire = False
+                num_intervals = self.trash_threshold + 1
+            else:
+                # smallest k whose log survival exceeds the drawn hazard
+                low = 1
+                high = self.trash_threshold
+                while low < high:
+                    middle = (low + high) // 2
+                    if self.log_survival(middle) > hazard:
+                        high = middle
+                    else:
+                        low = middle + 1
+                fire = True
+                num_intervals = low + 1
+            next_cleaning = self.time + self.cycle_length(num_intervals)
+            if next_cleaning >= end_time:
+                break
+            self.time = next_cleaning
+            self.num_cleanings = self.num_cleanings + 1
+            if fire:
+                self.num_fires = self.num_fires + 1
+            else:
+                self.num_threshold_cleanings = self.num_threshold_cleanings + 1
+        self.time = end_time
+
+    def expected_results(self, end_time, policy="periodic"):
+        # expected fires and cleanings in end_time minutes, from renewal theory (see renewal.py)
+        return renewal.expected_results(self.trash_arrival_rate, self.fire_arrival_rate_scalar, self.trash_threshold,
+                                        self.cleaning_rate, end_time, policy)
+
+    def count_distributions(self, end_time, policy="periodic"):
+        # exact distributions of fires and cleanings in end_time minutes (see markov.py)
+        return markov.count_distributions(self.trash_arrival_rate, self.fire_arrival_rate_scalar,
+                                          self.trash_threshold, self.cleaning_rate, end_time, policy)
+
+    def simulate(self, end_time, policy="periodic"):
+        # initialize start of simulation
+        self.initialize_simulation()
+
+        if policy == "periodic":
+            self.simulate_periodic(end_time)
+        elif policy == "threshold":
+            self.simulate_threshold(end_time)
+        else:
+            print("MUST PROVIDE POLICY")
+
+
+if __name__ == "__main__":
+    print("Starting")
+    s1 = JumpStation(20000000, 1, 10000, 60000)
+    num_reps = 1000
+    for policy in ["periodic", "threshold"]:
+        reps = []
+        for i in range(num_reps):
+            s1.simulate(525600, policy)
+            reps.append((s1.num_fires, s1.num_cleanings))
+        s1.print_state()
+        print(policy)
+        print(sum([x[0] for x in reps])/len([x[0] for x in reps]))
+        print(statistics.stdev([x[0] for x in reps]))
+
+        print(sum([x[1] for x in reps])/len([x[1] for x in reps]))
+        print(statistics.stdev([x[1] for x in reps]))
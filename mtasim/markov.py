@@ -0,0 +1,275 @@
+import math
+
+
+# Exact distributions of the number of fires and cleanings per year, from the
+# continuous-time Markov chain of the trash level, with no Monte Carlo noise.
+#
+# Between resets the trash level is a birth process: it goes up by one at
+# trash_arrival_rate and a fire takes it back to zero at fire_arrival_rate_scalar
+# times the level. Under the threshold policy the arrival that takes the level past
+# trash_threshold triggers a cleaning, so the chain has trash_threshold + 1 levels.
+# Under the periodic policy the level is only bounded by the number of arrivals.
+#
+# TrashChain keeps the generator among the levels as a sparse matrix (coordinate
+# lists sorted by row, plus the rates of the fire and cleaning exits of each
+# level) and uniformizes it: with a rate at least the fastest level's total rate,
+# the chain only jumps at the events of a Poisson process, and each of those steps
+# is one multiplication by the uniformized transition matrix. Starting at level
+# zero, cycle_endings gives the chance that a cycle ends in a fire or a cleaning at
+# each step. The mass of the chain sits on a handful of neighbouring levels, so
+# each step only touches the rows in that window.
+#
+# Resets start the chain afresh, so the counts per year follow from the cycle
+# endings by convolution: a fires and b threshold cleanings in n steps happen with
+# chance binomial(a + b, a) times (a-fold fire ending * b-fold cleaning ending *
+# unfinished cycle)(n), and the number of steps in end_time minutes is Poisson with
+# mean the uniformization rate times end_time. Under the periodic policy every
+# cleaning period is its own renewal cycle, so the same is done over one
+# cleaning_rate (and the remainder of the year), and the periods are convolved.
+# A year of a 20M rider station with a threshold of 10,000 (10,001 levels, about
+# 105,000 steps) takes about two seconds.
+#
+# Distributions are numpy arrays of probabilities indexed by count; the counts
+# with probability below tolerance at the top are left out. numpy is imported in
+# the functions that use it. Like the event simulations, a scheduled cleaning at
+# exactly end_time counts.
+TOLERANCE = 1e-15
+
+# mass below this is dropped from the window of levels the chain occupies
+NEGLIGIBLE = 1e-30
+
+
+class TrashChain:
+
+    def __init__(self, trash_arrival_rate, fire_arrival_rate_scalar, num_levels, trash_threshold=None):
+        import numpy
+        self.trash_arrival_rate = trash_arrival_rate
+        self.fire_arrival_rate_scalar = fire_arrival_rate_scalar
+        if trash_threshold is not None:
+            num_levels = int(trash_threshold) + 1
+        self.num_levels = num_levels
+        self.trash_threshold = trash_threshold
+
+        levels = numpy.arange(num_levels)
+        fire_rates = fire_arrival_rate_scalar * levels
+        cleaning_rates = numpy.zeros(num_levels)
+        if trash_threshold is not None:
+            # the next arrival at the threshold level triggers a cleaning
+            cleaning_rates[-1] = trash_arrival_rate
+        # the top level of a periodic chain is never reached within the steps it is built for
+        birth_levels = levels[:-1]
+        total_rates = fire_rates + cleaning_rates
+        total_rates[:-1] = total_rates[:-1] + trash_arrival_rate
+        self.uniformization_rate = float(numpy.max(total_rates))
+
+        # generator among the levels in coordinate form, sorted by row: births and the diagonal
+        rows = numpy.concatenate((birth_levels, levels))
+        columns = numpy.concatenate((birth_levels + 1, levels))
+        rates = numpy.concatenate((numpy.full(len(birth_levels), float(trash_arrival_rate)), -total_rates))
+        order = numpy.argsort(rows, kind="stable")
+        self.rows = rows[order]
+        self.columns = columns[order]
+        self.rates = rates[order]
+        # entries of row i are indptr[i]:indptr[i + 1]
+        self.indptr = numpy.searchsorted(self.rows, numpy.arange(num_levels + 1))
+        # uniformized one step transition probabilities: I + Q / uniformization_rate
+        self.probabilities = self.rates / self.uniformization_rate + (self.rows == self.columns)
+        self.fire_probabilities = fire_rates / self.uniformization_rate
+        self.cleaning_probabilities = cleaning_rates / self.uniformization_rate
+
+    def step(self, low, values):
+        # one uniformized step of the levels low..low + len(values) - 1
+        import numpy
+        high = low + len(values) - 1
+        start = self.indptr[low]
+        stop = self.indptr[high + 1]
+        weights = values[self.rows[start:stop] - low] * self.probabilities[start:stop]
+        return numpy.bincount(self.columns[start:stop] - low, weights=weights, minlength=len(values) + 1)
+
+    def cycle_endings(self, num_steps):
+        # fire[n] and cleaning[n]: chance that a cycle from level zero ends in a fire
+        # or a threshold cleaning at step n, for n = 0..num_steps
+        import numpy
+        fire = numpy.zeros(num_steps + 1)
+        cleaning = numpy.zeros(num_steps + 1)
+        low = 0
+        values = numpy.ones(1)
+        for n in range(1, num_steps + 1):
+            high = low + len(values)
+            fire[n] = values.dot(self.fire_probabilities[low:high])
+            cleaning[n] = values.dot(self.cleaning_probabilities[low:high])
+            values = self.step(low, values)
+            if low + len(values) > self.num_levels:
+                values = values[:self.num_levels - low]
+            # shrink the window to the levels that still hold mass
+            occupied = numpy.flatnonzero(values > NEGLIGIBLE)
+            if len(occupied) == 0:
+                break
+            low = low + occupied[0]
+            values = values[occupied[0]:occupied[-1] + 1]
+        return fire, cleaning
+
+
+def poisson_weights(mean, size):
+    # Poisson(mean) probabilities of 0..size - 1, zero where they are negligible
+    import numpy
+    weights = numpy.zeros(size)
+    if mean == 0.0:
+        weights[0] = 1.0
+        return weights
+    spread = 12.0 * math.sqrt(mean) + 10
+    start = max(0, int(mean - spread))
+    stop = min(size, int(mean + spread) + 1)
+    counts = numpy.arange(start, stop)
+    log_pmf = [k * math.log(mean) - mean - math.lgamma(k + 1) for k in range(start, stop)]
+    weights[counts] = numpy.exp(log_pmf)
+    return weights
+
+
+def convolve(a, b, size):
+    # first size terms of the convolution of a and b
+    import numpy
+    length = 1
+    while length < len(a) + len(b):
+        length = 2 * length
+    result = numpy.fft.irfft(numpy.fft.rfft(a, length) * numpy.fft.rfft(b, length), length)[:size]
+    # clear the rounding noise of the transform
+    return numpy.maximum(result, 0.0)
+
+
+def trim(values):
+    # the first index and the values between the first and last that are not negligible
+    import numpy
+    occupied = numpy.flatnonzero(values > NEGLIGIBLE)
+    if len(occupied) == 0:
+        return 0, numpy.zeros(0)
+    return occupied[0], values[occupied[0]:occupied[-1] + 1]
+
+
+def step_weights(weights, unfinished):
+    # weighted[m] = sum over n of weights[n] * unfinished[n - m]: the chance that the
+    # last cycle ending is at step m and the year ends before the next one
+    size = len(weights)
+    return convolve(unfinished[::-1], weights, 2 * size)[size - 1:2 * size - 1]
+
+
+def count_distribution(fire, cleaning, weights, tolerance=TOLERANCE):
+    # joint[a, b]: chance of a fires and b threshold cleanings within the steps,
+    # whose number has probabilities weights
+    import numpy
+    size = len(weights)
+    unfinished = numpy.maximum(1.0 - numpy.cumsum(fire[:size] + cleaning[:size]), 0.0)
+    weighted = step_weights(weights, unfinished)
+    # fire endings spread over the whole cycle, so their powers are full arrays
+    fire_powers = [numpy.zeros(size)]
+    fire_powers[0][0] = 1.0
+    fire_masses = [1.0]
+    # a cleaning ending takes nearly the same number of steps every time, so its
+    # powers are kept as the short window of steps they occupy
+    cleaning_offset, cleaning_window = trim(cleaning[:size])
+    power_offset, power_window = 0, numpy.ones(1)
+    columns = []
+    seen = False
+    while len(power_window) > 0 and power_offset < size:
+        # last_weighted[m] = sum over k of cleaning power[k] * weighted[m + k]
+        padded = numpy.zeros(size + power_offset + len(power_window))
+        padded[:size] = weighted
+        last_weighted = numpy.correlate(padded[power_offset:power_offset + size + len(power_window) - 1],
+                                        power_window, "valid")
+        b = len(columns)
+        column = []
+        a = 0
+        while True:
+            if a == len(fire_powers):
+                fire_powers.append(convolve(fire_powers[-1], fire[:size], size))
+                fire_masses.append(float(fire_powers[-1].sum()))
+            ways = math.factorial(a + b) // (math.factorial(a) * math.factorial(b))
+            # weighted is at most one, so this bounds every later term of the column
+            if ways * fire_masses[a] < tolerance:
+                break
+            column.append(ways * fire_powers[a].dot(last_weighted))
+            a = a + 1
+        columns.append(column)
+        total = sum(column)
+        if total >= tolerance:
+            seen = True
+        elif seen:
+            break
+        if len(cleaning_window) == 0:
+            break
+        shift, power_window = trim(numpy.convolve(power_window, cleaning_window))
+        power_offset = power_offset + cleaning_offset + shift
+    joint = numpy.zeros((max(len(column) for column in columns), len(columns)))
+    for b in range(len(columns)):
+        joint[:len(columns[b]), b] = columns[b]
+    return joint
+
+
+def threshold_distributions(trash_arrival_rate, fire_arrival_rate_scalar, trash_threshold, end_time,
+                            tolerance=TOLERANCE):
+    import numpy
+    chain = TrashChain(trash_arrival_rate, fire_arrival_rate_scalar, None, trash_threshold)
+    mean_steps = chain.uniformization_rate * end_time
+    size = int(mean_steps + 12.0 * math.sqrt(mean_steps) + 10) + 1
+    fire, cleaning = chain.cycle_endings(size - 1)
+    joint = count_distribution(fire, cleaning, poisson_weights(mean_steps, size), tolerance)
+    num_fires, num_threshold_cleanings = joint.shape
+    cleanings = numpy.zeros(num_fires + num_threshold_cleanings - 1)
+    for a in range(num_fires):
+        cleanings[a:a + num_threshold_cleanings] = cleanings[a:a + num_threshold_cleanings] + joint[a]
+    return {"joint": joint,
+            "fires": joint.sum(axis=1),
+            "threshold_cleanings": joint.sum(axis=0),
+            "cleanings": cleanings}
+
+
+def periodic_distributions(trash_arrival_rate, fire_arrival_rate_scalar, cleaning_rate, end_time,
+                           tolerance=TOLERANCE):
+    import numpy
+    num_periods = int(math.floor(end_time / cleaning_rate))
+    remainder = end_time - num_periods * cleaning_rate
+    # the level can not pass the number of steps, so a chain as tall as the longest
+    # period we look at is never truncated
+    period_rate = trash_arrival_rate + fire_arrival_rate_scalar
+    mean_steps = period_rate * cleaning_rate
+    size = int(mean_steps + 12.0 * math.sqrt(mean_steps) + 10) + 1
+    chain = TrashChain(trash_arrival_rate, fire_arrival_rate_scalar, size + 1)
+    mean_steps = chain.uniformization_rate * cleaning_rate
+    size = min(size, chain.num_levels - 1)
+    fire, cleaning = chain.cycle_endings(size - 1)
+    period = count_distribution(fire, cleaning, poisson_weights(mean_steps, size), tolerance)[:, 0]
+    last = count_distribution(fire, cleaning, poisson_weights(chain.uniformization_rate * remainder, size),
+                              tolerance)[:, 0]
+    fires = last
+    for i in range(num_periods):
+        fires = numpy.convolve(fires, period)
+        # drop the negligible top of the distribution so it does not grow with every period
+        top = numpy.flatnonzero(fires >= tolerance)
+        fires = fires[:top[-1] + 1]
+    cleanings = numpy.concatenate((numpy.zeros(num_periods), fires))
+    return {"fires": fires,
+            "scheduled_cleanings": numpy.concatenate((numpy.zeros(num_periods), [1.0])),
+            "cleanings": cleanings}
+
+
+def count_distributions(trash_arrival_rate, fire_arrival_rate_scalar, trash_threshold, cleaning_rate, end_time,
+                        policy="periodic", tolerance=TOLERANCE):
+    if policy == "periodic":
+        return periodic_distributions(trash_arrival_rate, fire_arrival_rate_scalar, cleaning_rate, end_time,
+                                      tolerance)
+    if policy == "threshold":
+        return threshold_distributions(trash_arrival_rate, fire_arrival_rate_scalar, trash_threshold, end_time,
+                                       tolerance)
+    raise ValueError("MUST PROVIDE POLICY")
+
+
+def mean(distribution):
+    total = 0.0
+    for count in range(len(distribution)):
+        total = total + count * distribution[count]
+    return total
+
+
+def tail_probability(distribution, count):
+    # chance of at least count
+    return float(sum(distribution[count:]))
@@ -2,6 +2,9 @@ import math
 import random
 import statistics
 from collections import deque
+from mtasim.eventlist import EventList
+from mtasim import markov
+from mtasim import renewal
 
 
 class Station:
@@ -13,7 +16,6 @@ class Station:
         self.trash_threshold = trash_threshold
 
         self.cleaning_rate = cleaning_rate
-        self.next_scheduled_cleaning = 0.0
 
         self.maintenance_delay = 0.0
 
@@ -34,8 +36,8 @@ class Station:
 
         self.num_fires = 0
 
-        self.next_trash_arrival = 0.0
-        self.next_fire_arrival = 0.0
+        # future event list; ties go to trash, then scheduled cleaning, then fire
+        self.events = EventList({"trash": 0, "scheduled_cleaning": 1, "fire": 2})
 
     def initialize_simulation(self):
         self.time = 0.0
@@ -45,17 +47,17 @@ class Station:
         self.num_scheduled_cleanings = 0
         self.num_fires = 0
 
-        self.next_trash_arrival = random.expovariate(self.trash_arrival_rate)
-        self.next_fire_arrival = math.inf
-        self.next_scheduled_cleaning = self.cleaning_rate
+        self.events.clear()
+        self.events.schedule("trash", random.expovariate(self.trash_arrival_rate))
+        self.events.schedule("scheduled_cleaning", self.cleaning_rate)
 
     def print_state(self):
         print("--------------------------------")
         print("Current Time: " + str(self.time))
         print("Aggregate Trash: " + str(self.aggregate_trash))
-        print("Time until next trash: " + str(self.next_trash_arrival))
-        print("Time until next cleaning: " + str(self.next_scheduled_cleaning))
-        print("Time until next fire: " + str(self.next_fire_arrival))
+        print("Time until next trash: " + str(self.events.time_of("trash") - self.time))
+        print("Time until next cleaning: " + str(self.events.time_of("scheduled_cleaning") - self.time))
+        print("Time until next fire: " + str(self.events.time_of("fire") - self.time))
         print("\nFire arrival rate: " + str(self.fire_arrival_rate))
         print("\nNumber of cleanings to date:" + str(self.num_cleanings))
         print("Number of scheduled cleanings to date:" + str(self.num_scheduled_cleanings))
@@ -65,8 +67,8 @@ class Station:
     def recalculate_next_fire_arrival(self):
         # set fire arrival rate based on aggregate trash
         self.fire_arrival_rate = (1.0/1000000000) * self.aggregate_trash
-        # generate next_fire_arrival
-        self.next_fire_arrival = random.expovariate(self.fire_arrival_rate)
+        # generate next fire arrival
+        self.events.schedule("fire", self.time + random.expovariate(self.fire_arrival_rate))
 
     def clean(self, fire):
         self.num_cleanings = self.num_cleanings + 1
@@ -76,57 +78,58 @@ class Station:
         # increment self.time by amount of time for cleaning / fire repair
         if not fire:
             self.num_scheduled_cleanings = self.num_scheduled_cleanings + 1
-            self.next_scheduled_cleaning = self.cleaning_rate
-        self.next_trash_arrival = random.expovariate(self.trash_arrival_rate)
-        self.next_fire_arrival = math.inf
+            self.events.schedule("scheduled_cleaning", self.time + self.cleaning_rate)
+        self.events.schedule("trash", self.time + random.expovariate(self.trash_arrival_rate))
+        self.events.cancel("fire")
+
+    def expected_results(self, end_time):
+        # expected fires and cleanings in end_time minutes, from renewal theory (see renewal.py)
+        return renewal.expected_results(self.trash_arrival_rate, 1.0/1000000000, self.trash_threshold,
+                                        self.cleaning_rate, end_time, "periodic")
+
+    def count_distributions(self, end_time):
+        # exact distributions of fires and cleanings in end_time minutes (see markov.py)
+        return markov.count_distributions(self.trash_arrival_rate, 1.0/1000000000, self.trash_threshold,
+                                          self.cleaning_rate, end_time, "periodic")
 
     def simulate(self, end_time):
         # initialize start of simulation
         self.initialize_simulation()
 
         while (self.time < end_time):
-            if self.next_trash_arrival == min(self.next_scheduled_cleaning, self.next_fire_arrival, self.next_trash_arrival):
+            self.time, event = self.events.pop()
+            if event == "trash":
                 # print("********* Trash Arrives")
-                time_elapsed = self.next_trash_arrival
                 self.aggregate_trash = self.aggregate_trash + 1
-                self.next_scheduled_cleaning = self.next_scheduled_cleaning - time_elapsed
-                self.next_trash_arrival = random.expovariate(self.trash_arrival_rate)
-                self.time = self.time + time_elapsed
+                self.events.schedule("trash", self.time + random.expovariate(self.trash_arrival_rate))
                 self.recalculate_next_fire_arrival()
-            elif self.next_scheduled_cleaning == min(self.next_scheduled_cleaning, self.next_fire_arrival, self.next_trash_arrival):
+            elif event == "scheduled_cleaning":
                 # print("********* Scheduled Cleaning")
-                time_elapsed = self.next_scheduled_cleaning
-                self.time = self.time + time_elapsed
                 self.clean(False)
-            else:  # next_fire_arrival is the min
+            else:  # fire
                 # self.print_state()
                 # print("********* FIRE!!!")
-                time_elapsed = self.next_fire_arrival
-                self.time = self.time + time_elapsed
                 self.num_fires = self.num_fires + 1
                 self.clean(True)
 
 
-print("Starting")
-# s1 = Station(40000000, 2, 6000, 30240)
-# s1 = Station(200000, 1, 6000, 30240)
-s1 = Station(20000000, 1, 6000, 60000)
-# s1 = Station(40000000, 1, 6000, 60000)
-num_reps = 50
-reps = []
-for i in range(num_reps):
-    s1.simulate(525600)
-    s1.print_state()
-    reps.append((s1.num_fires, s1.num_cleanings))
-print()
-print([x[0] for x in reps])
-print(sum([x[0] for x in reps])/len([x[0] for x in reps]))
-print(statistics.stdev([x[0] for x in reps]))
-
-print([x[1] for x in reps])
-print(sum([x[1] for x in reps])/len([x[1] for x in reps]))
-print(statistics.stdev([x[1] for x in reps]))
-
-
-
-
+if __name__ == "__main__":
+    print("Starting")
+    # s1 = Station(40000000, 2, 6000, 30240)
+    # s1 = Station(200000, 1, 6000, 30240)
+    s1 = Station(20000000, 1, 6000, 60000)
+    # s1 = Station(40000000, 1, 6000, 60000)
+    num_reps = 50
+    reps = []
+    for i in range(num_reps):
+        s1.simulate(525600)
+        s1.print_state()
+        reps.append((s1.num_fires, s1.num_cleanings))
+    print()
+    print([x[0] for x in reps])
+    print(sum([x[0] for x in reps])/len([x[0] for x in reps]))
+    print(statistics.stdev([x[0] for x in reps]))
+
+    print([x[1] for x in reps])
+    print(sum([x[1] for x in reps])/len([x[1] for x in reps]))
+    print(statistics.stdev([x[1] for x in reps]))
@@ -142,32 +142,33 @@ class Station:
                 self.clean(True)
 
 
-print("Starting")
-#s1 = Station(40000000, 2, 6000, 30240)
-s1 = Station(200000, 1, 6000, 30240)
-# s1 = Station(20000000, 1, 6000, 60000)
-# s1 = Station(40000000, 1, 6000, 60000)
-num_reps = 5
-reps = []
-for i in range(num_reps):
-    s1.simulate(525600)
-    s1.print_state()
-    reps.append((s1.num_fires, s1.num_cleanings, s1.expenditure))
-print()
-print("Number of fires over simulation")
-print([x[0] for x in reps])
-print(sum([x[0] for x in reps])/len([x[0] for x in reps]))
-print(statistics.stdev([x[0] for x in reps]))
-
-print("number of cleanings over simulation")
-print([x[1] for x in reps])
-print(sum([x[1] for x in reps])/len([x[1] for x in reps]))
-print(statistics.stdev([x[1] for x in reps]))
-
-
-# NEW THING
-print("Expenditure over simulation")
-print([x[2] for x in reps])
-print(sum([x[2] for x in reps])/len([x[2] for x in reps]))
-print(statistics.stdev([x[2] for x in reps]))
-# END OF NEW THING
\ No newline at end of file
+if __name__ == "__main__":
+    print("Starting")
+    #s1 = Station(40000000, 2, 6000, 30240)
+    s1 = Station(200000, 1, 6000, 30240)
+    # s1 = Station(20000000, 1, 6000, 60000)
+    # s1 = Station(40000000, 1, 6000, 60000)
+    num_reps = 5
+    reps = []
+    for i in range(num_reps):
+        s1.simulate(525600)
+        s1.print_state()
+        reps.append((s1.num_fires, s1.num_cleanings, s1.expenditure))
+    print()
+    print("Number of fires over simulation")
+    print([x[0] for x in reps])
+    print(sum([x[0] for x in reps])/len([x[0] for x in reps]))
+    print(statistics.stdev([x[0] for x in reps]))
+
+    print("number of cleanings over simulation")
+    print([x[1] for x in reps])
+    print(sum([x[1] for x in reps])/len([x[1] for x in reps]))
+    print(statistics.stdev([x[1] for x in reps]))
+
+
+    # NEW THING
+    print("Expenditure over simulation")
+    print([x[2] for x in reps])
+    print(sum([x[2] for x in reps])/len([x[2] for x in reps]))
+    print(statistics.stdev([x[2] for x in reps]))
+    # END OF NEW THING
\ No newline at end of file
@@ -0,0 +1,198 @@
+import math
+
+
+# Expected fires and cleanings per year from renewal theory, without simulating.
+#
+# Every cleaning and every fire sets aggregate trash back to zero, and trash
+# arrivals are Poisson, so the station starts afresh after each of them.
+#
+# Periodic policy: scheduled cleanings happen every cleaning_rate minutes whatever
+# else happens, so each cleaning period is a renewal cycle, and within a period the
+# fires are a renewal process. Starting from no trash, the time to the next fire
+# has survival exp(-H(t)) with
+#     H(t) = trash_arrival_rate * (t - (1 - exp(-fire_arrival_rate_scalar * t)) / fire_arrival_rate_scalar)
+# (see jumpsim.py), and the expected number of fires in the first t minutes of a
+# period, m(t), solves the renewal equation m(t) = F(t) + integral of m(t - s) dF(s)
+# with F = 1 - exp(-H). It is solved on a grid with the trapezoid rule.
+#
+# Threshold policy: counted in trash arrivals, interval k of a cycle has k units of
+# trash on the tracks, lasts Exp(trash_arrival_rate + fire_arrival_rate_scalar * k)
+# and ends in a fire with probability
+#     fire_arrival_rate_scalar * k / (trash_arrival_rate + fire_arrival_rate_scalar * k)
+# The cycle ends with a fire or with the threshold cleaning on the arrival that
+# ends interval trash_threshold. The chance of each ending and the mean and
+# variance of the time it takes follow from one pass over the intervals. With a
+# threshold in the thousands a cycle is the sum of thousands of exponentials and
+# nearly constant, so the renewal reward asymptote end_time * P(A) / E[C] is off by
+# up to a cycle. Instead the time of each ending is taken to be normal, binned on
+# a grid over the year, and the expected number of endings of each kind by
+# end_time follows from the discrete renewal equation on that grid. Stations with
+# hundreds of cycles a year use the renewal reward asymptote, corrected for the
+# year starting at a renewal, which is accurate there.
+#
+# Like the event simulations, a scheduled cleaning exactly at end_time counts.
+# numpy is imported in the functions that use it.
+
+
+def cumulative_fire_hazard(trash_arrival_rate, fire_arrival_rate_scalar, elapsed):
+    # H(elapsed) for an array of elapsed times since a reset
+    import numpy
+    x = fire_arrival_rate_scalar * numpy.asarray(elapsed, dtype=numpy.float64)
+    # series for x + expm1(-x), which cancels badly for small x
+    series = x * x * (0.5 - x * (1.0/6 - x * (1.0/24 - x / 120)))
+    y = numpy.where(x < 1e-3, series, x + numpy.expm1(-numpy.maximum(x, 1e-3)))
+    return trash_arrival_rate * y / fire_arrival_rate_scalar
+
+
+def periodic_fire_renewal(trash_arrival_rate, fire_arrival_rate_scalar, period, num_steps=1024):
+    # grid times and the expected number of fires m(t) in the first t minutes of a period
+    import numpy
+    # the time to the first fire spreads over about sqrt(2 / (trash rate * fire scalar)),
+    # which every step has to resolve
+    spread = math.sqrt(2.0 / (trash_arrival_rate * fire_arrival_rate_scalar))
+    num_steps = max(num_steps, min(int(64 * period / spread), 16384))
+    times = numpy.linspace(0.0, period, num_steps + 1)
+    distribution = -numpy.expm1(-cumulative_fire_hazard(trash_arrival_rate, fire_arrival_rate_scalar, times))
+    increments = numpy.diff(distribution)
+    expected_fires = numpy.zeros(num_steps + 1)
+    for i in range(1, num_steps + 1):
+        # m(t_i) = F(t_i) + sum over steps j of (m(t_i - t_j) + m(t_i - t_j-1)) / 2 * dF_j,
+        # where only the j = 1 term involves m(t_i) itself
+        known = (expected_fires[i - 1::-1].dot(increments[:i])
+                 + expected_fires[i - 1:0:-1].dot(increments[1:i])) / 2.0
+        expected_fires[i] = (distribution[i] + known) / (1.0 - increments[0] / 2.0)
+    return times, expected_fires
+
+
+def periodic_expectations(trash_arrival_rate, fire_arrival_rate_scalar, cleaning_rate, end_time):
+    import numpy
+    num_periods = int(math.floor(end_time / cleaning_rate))
+    times, expected_fires = periodic_fire_renewal(trash_arrival_rate, fire_arrival_rate_scalar, cleaning_rate)
+    remainder = end_time - num_periods * cleaning_rate
+    fires = float(num_periods * expected_fires[-1] + numpy.interp(remainder, times, expected_fires))
+    return {"fires": fires,
+            "scheduled_cleanings": float(num_periods),
+            "cleanings": num_periods + fires}
+
+
+def normal_cdf(x):
+    # Abramowitz and Stegun 7.1.26, absolute error below 1.5e-7 (numpy has no erf)
+    import numpy
+    z = numpy.abs(x) / math.sqrt(2.0)
+    t = 1.0 / (1.0 + 0.3275911 * z)
+    erfc = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    erfc = erfc * numpy.exp(-z * z)
+    return numpy.where(x >= 0.0, 1.0 - 0.5 * erfc, 0.5 * erfc)
+
+
+def threshold_cycle(trash_arrival_rate, fire_arrival_rate_scalar, trash_threshold):
+    # for k = 0..trash_threshold: the chance that the cycle ends in a fire during
+    # interval k, and the mean and variance of the time that takes; and the same for
+    # the threshold cleaning at the end of interval trash_threshold
+    import numpy
+    k = numpy.arange(int(trash_threshold) + 1, dtype=numpy.float64)
+    rate = trash_arrival_rate + fire_arrival_rate_scalar * k
+    fire = fire_arrival_rate_scalar * k / rate
+    # chance of reaching interval k without a fire
+    reach = numpy.concatenate(([1.0], numpy.cumprod(1.0 - fire)[:-1]))
+    # interval lengths are independent of how the intervals end
+    mean = numpy.cumsum(1.0 / rate)
+    variance = numpy.cumsum(1.0 / (rate * rate))
+    return {"fire_probability": reach * fire,
+            "cleaning_probability": reach[-1] * (1.0 - fire[-1]),
+            "mean": mean,
+            "variance": variance}
+
+
+def ending_distribution(probabilities, means, variances, step, num_steps, width):
+    # chance of a cycle ending in each time step: each way to end is normal with its
+    # mean and variance, spread over the steps around its mean
+    import numpy
+    centers = numpy.rint(means / step).astype(numpy.int64)
+    offsets = numpy.arange(-width, width + 1)
+    steps = centers[:, None] + offsets[None, :]
+    stddevs = numpy.sqrt(variances)[:, None]
+    upper = normal_cdf(((steps + 0.5) * step - means[:, None]) / stddevs)
+    lower = normal_cdf(((steps - 0.5) * step - means[:, None]) / stddevs)
+    # the first step also takes whatever the normal puts before time zero
+    lower = numpy.where(steps <= 0, 0.0, lower)
+    masses = probabilities[:, None] * numpy.maximum(upper - lower, 0.0)
+    keep = (steps >= 0) & (steps <= num_steps)
+    return numpy.bincount(steps[keep], weights=masses[keep], minlength=num_steps + 1)
+
+
+def merge_endings(probabilities, means, variances, group):
+    # combine every group consecutive ways to end into one with the same total
+    # chance and the same mean and variance of the ending time
+    import numpy
+    starts = numpy.arange(0, len(probabilities), group)
+    merged = numpy.add.reduceat(probabilities, starts)
+    total = numpy.where(merged > 0.0, merged, 1.0)
+    merged_means = numpy.add.reduceat(probabilities * means, starts) / total
+    merged_variances = numpy.add.reduceat(probabilities * (variances + means * means), starts) / total
+    merged_variances = numpy.maximum(merged_variances - merged_means * merged_means, variances[starts])
+    return merged, merged_means, merged_variances
+
+
+def threshold_expectations(trash_arrival_rate, fire_arrival_rate_scalar, trash_threshold, end_time, max_steps=2048):
+    import numpy
+    cycle = threshold_cycle(trash_arrival_rate, fire_arrival_rate_scalar, trash_threshold)
+    fire_probability = cycle["fire_probability"]
+    means = cycle["mean"]
+    variances = cycle["variance"]
+    cleaning_probability = cycle["cleaning_probability"]
+    mean_length = numpy.sum(fire_probability * means) + cleaning_probability * means[-1]
+    if end_time / mean_length > max_steps / 16.0:
+        # hundreds of cycles a year: their ends are spread evenly over the end of the
+        # year, and renewal reward with the correction for starting at a renewal,
+        #     end_time * P(A) / E[C] + P(A) * E[C^2] / (2 E[C]^2) - E[C; A] / E[C]
+        # is exact to well within a cycle
+        second_moment = (numpy.sum(fire_probability * (variances + means * means))
+                         + cleaning_probability * (variances[-1] + means[-1] * means[-1]))
+        excess = second_moment / (2.0 * mean_length * mean_length)
+        fire_probability_total = float(numpy.sum(fire_probability))
+        fires = (end_time * fire_probability_total / mean_length + fire_probability_total * excess
+                 - numpy.sum(fire_probability * means) / mean_length)
+        threshold_cleanings = (end_time * cleaning_probability / mean_length + cleaning_probability * excess
+                               - cleaning_probability * means[-1] / mean_length)
+        return {"fires": float(fires),
+                "threshold_cleanings": float(threshold_cleanings),
+                "cleanings": float(fires + threshold_cleanings)}
+    # at least 128 steps per cycle on average, at most max_steps per year
+    step = max(mean_length / 128.0, end_time / float(max_steps))
+    num_steps = int(math.ceil(end_time / step))
+    step = end_time / float(num_steps)
+    width = int(math.ceil(8.0 * math.sqrt(variances[-1]) / step)) + 1
+    # fires in neighbouring intervals end within a fraction of a step of each other
+    group = max(1, int(step * trash_arrival_rate / 4.0))
+    fire_endings = ending_distribution(*merge_endings(fire_probability, means, variances, group),
+                                       step=step, num_steps=num_steps, width=width)
+    cleaning_endings = ending_distribution(numpy.array([cleaning_probability]), means[-1:], variances[-1:], step,
+                                           num_steps, width)
+    endings = fire_endings + cleaning_endings
+    # renewal measure: renewals[i] is the expected number of cycles (counting the
+    # start of the year) that end in step i
+    renewals = numpy.zeros(num_steps + 1)
+    renewals[0] = 1.0 / (1.0 - endings[0])
+    for i in range(1, num_steps + 1):
+        renewals[i] = renewals[i - 1::-1].dot(endings[1:i + 1]) / (1.0 - endings[0])
+    # a cycle that starts in step i and ends by the end of the year; the last step
+    # straddles end_time and counts half
+    weights = numpy.ones(num_steps + 1)
+    weights[-1] = 0.5
+    fire_by = numpy.cumsum(fire_endings * weights)
+    cleaning_by = numpy.cumsum(cleaning_endings * weights)
+    fires = float(renewals.dot(fire_by[::-1]))
+    threshold_cleanings = float(renewals.dot(cleaning_by[::-1]))
+    return {"fires": fires,
+            "threshold_cleanings": threshold_cleanings,
+            "cleanings": fires + threshold_cleanings}
+
+
+def expected_results(trash_arrival_rate, fire_arrival_rate_scalar, trash_threshold, cleaning_rate, end_time,
+                     policy="periodic"):
+    if policy == "periodic":
+        return periodic_expectations(trash_arrival_rate, fire_arrival_rate_scalar, cleaning_rate, end_time)
+    if policy == "threshold":
+        return threshold_expectations(trash_arrival_rate, fire_arrival_rate_scalar, trash_threshold, end_time)
+    raise ValueError("MUST PROVIDE POLICY")
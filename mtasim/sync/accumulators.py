@@ -0,0 +1,168 @@
+import math
+
+
+# Running count, mean, variance, min and max of one metric, updated in O(1) per
+# value with Welford's method. Two accumulators can be merged (Chan et al.), so
+# workers can each summarize their own replications and the parent combines them.
+class RunningStats:
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        # sum of squared differences from the mean
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, value):
+        self.count = self.count + 1
+        delta = value - self.mean
+        self.mean = self.mean + delta / self.count
+        self.m2 = self.m2 + delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other):
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.count = other.count
+            self.mean = other.mean
+            self.m2 = other.m2
+            self.min = other.min
+            self.max = other.max
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean = self.mean + delta * other.count / count
+        self.m2 = self.m2 + other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def variance(self):
+        # sample variance, like statistics.variance
+        if self.count < 2:
+            return math.nan
+        return self.m2 / (self.count - 1)
+
+    def stdev(self):
+        return math.sqrt(self.variance())
+
+    def confidence_interval(self, Z):
+        stddev = self.stdev()
+        ci_plus_minus = (Z * stddev) / math.sqrt(self.count)
+        return self.mean, stddev, ci_plus_minus
+
+
+# Running co-moment of a metric y and a control x whose true mean is known, for
+# control variate estimates of the mean of y. Merges like RunningStats.
+class RunningCovariance:
+
+    def __init__(self):
+        self.count = 0
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self.m2_x = 0.0
+        self.m2_y = 0.0
+        # sum of products of the differences from the means
+        self.c = 0.0
+
+    def update(self, x, y):
+        self.count = self.count + 1
+        delta_x = x - self.mean_x
+        delta_y = y - self.mean_y
+        self.mean_x = self.mean_x + delta_x / self.count
+        self.mean_y = self.mean_y + delta_y / self.count
+        self.m2_x = self.m2_x + delta_x * (x - self.mean_x)
+        self.m2_y = self.m2_y + delta_y * (y - self.mean_y)
+        self.c = self.c + delta_x * (y - self.mean_y)
+
+    def merge(self, other):
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.count = other.count
+            self.mean_x = other.mean_x
+            self.mean_y = other.mean_y
+            self.m2_x = other.m2_x
+            self.m2_y = other.m2_y
+            self.c = other.c
+            return
+        count = self.count + other.count
+        delta_x = other.mean_x - self.mean_x
+        delta_y = other.mean_y - self.mean_y
+        weight = self.count * other.count / count
+        self.mean_x = self.mean_x + delta_x * other.count / count
+        self.mean_y = self.mean_y + delta_y * other.count / count
+        self.m2_x = self.m2_x + other.m2_x + delta_x * delta_x * weight
+        self.m2_y = self.m2_y + other.m2_y + delta_y * delta_y * weight
+        self.c = self.c + other.c + delta_x * delta_y * weight
+        self.count = count
+
+    def covariance(self):
+        if self.count < 2:
+            return math.nan
+        return self.c / (self.count - 1)
+
+    def control_variate_interval(self, control_mean, Z):
+        # regression estimate of the mean of y: mean_y - beta * (mean_x - control_mean)
+        if self.count < 3:
+            return math.nan, math.nan, math.nan
+        if self.m2_x == 0.0:
+            # the control never varied, so there is nothing to adjust with
+            stddev = math.sqrt(self.m2_y / (self.count - 1))
+            return self.mean_y, stddev, (Z * stddev) / math.sqrt(self.count)
+        beta = self.c / self.m2_x
+        mean = self.mean_y - beta * (self.mean_x - control_mean)
+        # residual variance around the fitted line
+        residual = max(self.m2_y - beta * self.c, 0.0) / (self.count - 2)
+        stddev = math.sqrt(residual)
+        deviation = self.mean_x - control_mean
+        ci_plus_minus = Z * math.sqrt(residual * (1.0 / self.count + deviation * deviation / self.m2_x))
+        return mean, stddev, ci_plus_minus
+
+
+# One RunningStats per tracked metric, fed a dict of metric values per replication.
+# If a control metric is given (one name for every metric, or a dict from metric
+# to control), each controlled metric also keeps a RunningCovariance with it.
+class MetricAccumulators:
+
+    def __init__(self, metrics, control=None):
+        self.metrics = list(metrics)
+        self.stats = {}
+        for metric in self.metrics:
+            self.stats[metric] = RunningStats()
+        # metric -> name of its control metric
+        self.controls = {}
+        if isinstance(control, dict):
+            self.controls = dict(control)
+        elif control is not None:
+            for metric in self.metrics:
+                self.controls[metric] = control
+        self.covariances = {}
+        for metric in self.controls:
+            self.covariances[metric] = RunningCovariance()
+
+    def __getitem__(self, metric):
+        return self.stats[metric]
+
+    def count(self):
+        if len(self.metrics) == 0:
+            return 0
+        return self.stats[self.metrics[0]].count
+
+    def update(self, values):
+        for metric in self.metrics:
+            self.stats[metric].update(values[metric])
+        for metric in self.controls:
+            self.covariances[metric].update(values[self.controls[metric]], values[metric])
+
+    def merge(self, other):
+        for metric in self.metrics:
+            self.stats[metric].merge(other.stats[metric])
+        for metric in self.controls:
+            self.covariances[metric].merge(other.covariances[metric])
+
+    def control_variate_interval(self, metric, control_mean, Z):
+        return self.covariances[metric].control_variate_interval(control_mean, Z)
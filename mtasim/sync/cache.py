@@ -0,0 +1,78 @@
+import hashlib
+import json
+import time
+
+
+# On-disk cache of finished replications, in one SQLite file.
+#
+# A replication is stored under the key of everything that decides its results
+# (see syncprod.Station.cache_parameters) plus its replication index. So
+# reruns and repeated sweeps only simulate the replications they have not seen
+# before. The cache holds at most max_entries replications and evicts the least
+# recently used ones beyond that.
+class ResultCache:
+
+    def __init__(self, path="mtasim_cache.sqlite", max_entries=1000000):
+        self.path = path
+        self.max_entries = max_entries
+        # imported here so syncprod, which only needs replication_key, stays cheap to import
+        import sqlite3
+        self.connection = sqlite3.connect(path)
+        # commits are frequent and small, which write-ahead logging makes cheap
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS results ("
+                                "key TEXT NOT NULL, rep INTEGER NOT NULL, results TEXT NOT NULL, "
+                                "last_used REAL NOT NULL, PRIMARY KEY (key, rep))")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def get(self, key, rep):
+        return self.get_many(key, [rep]).get(rep)
+
+    def get_many(self, key, reps):
+        # rep -> results for every rep in reps that is in the cache
+        found = {}
+        reps = list(reps)
+        # SQLite limits the number of parameters in one statement
+        for start in range(0, len(reps), 500):
+            chunk = reps[start:start + 500]
+            rows = self.connection.execute("SELECT rep, results FROM results WHERE key = ? AND rep IN ("
+                                           + ",".join("?" * len(chunk)) + ")", [key] + chunk).fetchall()
+            for rep, results in rows:
+                found[rep] = json.loads(results)
+        if len(found) > 0:
+            now = time.time()
+            self.connection.executemany("UPDATE results SET last_used = ? WHERE key = ? AND rep = ?",
+                                        [(now, key, rep) for rep in found])
+            self.connection.commit()
+        return found
+
+    def put(self, key, rep, results):
+        self.put_many(key, {rep: results})
+
+    def put_many(self, key, results_by_rep):
+        now = time.time()
+        self.connection.executemany("INSERT OR REPLACE INTO results (key, rep, results, last_used) VALUES (?, ?, ?, ?)",
+                                    [(key, rep, json.dumps(results_by_rep[rep], default=float), now)
+                                     for rep in results_by_rep])
+        excess = len(self) - self.max_entries
+        if excess > 0:
+            self.connection.execute("DELETE FROM results WHERE rowid IN "
+                                    "(SELECT rowid FROM results ORDER BY last_used LIMIT ?)", (excess,))
+        self.connection.commit()
+
+    def clear(self):
+        self.connection.execute("DELETE FROM results")
+        self.connection.commit()
+
+
+def replication_key(parameters):
+    # key of the replications run with parameters, a dict of plain values
+    return hashlib.sha1(json.dumps(parameters, sort_keys=True, default=float).encode("utf-8")).hexdigest()
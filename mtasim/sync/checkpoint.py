@@ -0,0 +1,21 @@
+import os
+import pickle
+
+
+# Checkpoints of long runs, pickled to a local file.
+#
+# A checkpoint is a dict of whatever the run needs to carry on. It is written to
+# path + ".tmp" first and then moved over path, so a crash while writing leaves
+# the previous checkpoint intact.
+def save_checkpoint(path, state):
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary_path, path)
+
+
+def load_checkpoint(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
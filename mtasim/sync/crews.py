@@ -0,0 +1,440 @@
+import heapq
+import itertools
+import math
+import random
+from mtasim.eventlist import EventList
+from mtasim.sync import prodloss
+
+
+# A few cleaning crews shared by many stations that run the threshold policy.
+#
+# syncprod.Station cleans the moment the trash passes the threshold, as if there
+# were a crew on every platform. CrewNetwork sends every threshold cleaning, and
+# every fire repair, to a shared pool of num_crews crews instead. Every track bed
+# of every station has its own trash, at the station's ridership per track, and
+# calls for its own crew, so a station with four track beds makes four times the
+# calls of one with a single bed. A track bed that needs a crew joins the dispatch
+# queue; a free crew takes the track bed at the head of the queue, travels there
+# (its station's travel_time) and cleans it (minutes_per_cleaning) or repairs it
+# (minutes_per_fire_repair), then takes the next one. Trash keeps arriving while a
+# track bed waits for its crew, and so can more fires. The rates, costs and
+# productivity losses are those of syncprod.
+#
+# Repairs always go first. Among track beds that wait for the same kind of job
+# the priority rule decides: a function of (network, bed) whose value is smaller
+# for the track bed to serve first. PRIORITY_RULES has
+#     "fifo"    the one that has waited longest
+#     "trash"   the one with the most trash on its tracks
+#     "hazard"  the one with the highest fire rate by the time a crew can get there
+# and any other function of the same form can be passed instead. The queue is a
+# binary heap that, like EventList, leaves stale entries in place and skips them,
+# so joining the queue, moving in it when the trash changes and leaving it all take
+# O(log n) for n waiting track beds, and so does every event.
+#
+# Track beds only have to be followed trash arrival by trash arrival while they
+# wait for a crew. Between a cleaning and the end of its next cycle (a threshold
+# crossing or a fire) each track bed jumps straight to that end, like the
+# threshold policy of jumpsim.py, so a track bed costs one event per cycle plus
+# one per trash arrival while it waits. The trash on the tracks is taken away when
+# the crew arrives, and the cycle after that starts then.
+#
+# Costs are counted when they happen: a fire costs cost_of_track_cleaning_fire the
+# moment it breaks out (and resets the trash, like syncprod), a cleaning costs
+# cost_of_track_cleaning_fireless when the crew arrives. numpy is imported in the
+# functions that use it.
+CLEANING = "cleaning"
+REPAIR = "repair"
+
+# repairs are served before any cleaning
+URGENCY = {REPAIR: 0, CLEANING: 1}
+
+# per-track-bed values in bed_results, per station in station_results; year_results
+# adds them up
+STATION_METRICS = ["fires", "threshold_cleanings", "repairs", "requests", "maintenance_cost", "productivity_loss",
+                   "waiting_time"]
+
+# kinds of the next event of a station
+THRESHOLD = 0
+FIRE = 1
+TRASH = 2
+
+
+def fifo_priority(network, bed):
+    return network.request_times[bed]
+
+
+def trash_priority(network, bed):
+    return -network.trash[bed]
+
+
+def hazard_priority(network, bed):
+    # fire rate once a crew has travelled there, with the trash expected by then
+    return -network.fire_arrival_rate_scalar * (network.trash[bed]
+                                                + network.trash_arrival_rates[bed] * network.travel_times[bed])
+
+
+PRIORITY_RULES = {"fifo": fifo_priority, "trash": trash_priority, "hazard": hazard_priority}
+
+
+def log_survival(x, num_intervals):
+    # as JumpStation.log_survival, with x = fire_arrival_rate_scalar / trash_arrival_rate
+    m = num_intervals
+    if x * m < 1e-2:
+        s1 = m * (m + 1) / 2.0
+        s2 = m * (m + 1) * (2 * m + 1) / 6.0
+        s3 = s1 * s1
+        s4 = m * (m + 1) * (2 * m + 1) * (3 * m * m + 3 * m - 1) / 30.0
+        return x * s1 - x * x * s2 / 2 + x ** 3 * s3 / 3 - x ** 4 * s4 / 4
+    return math.lgamma(1.0 / x + m + 1) - math.lgamma(1.0 / x + 1) + m * math.log(x)
+
+
+class DispatchQueue:
+
+    def __init__(self):
+        # heap entries are (urgency, priority, count, bed)
+        self.heap = []
+        # track bed -> its live heap entry
+        self.entries = {}
+        self.counter = itertools.count()
+        # most track beds waiting at once since the last clear
+        self.max_length = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, bed):
+        return bed in self.entries
+
+    def clear(self):
+        self.heap = []
+        self.entries = {}
+        self.counter = itertools.count()
+        self.max_length = 0
+
+    def push(self, bed, urgency, priority):
+        # add a track bed, or move it if its urgency or priority changed
+        entry = self.entries.get(bed)
+        if entry is not None and entry[0] == urgency and entry[1] == priority:
+            return
+        count = next(self.counter)
+        entry = (urgency, priority, count, bed)
+        self.entries[bed] = entry
+        heapq.heappush(self.heap, entry)
+        self.max_length = max(self.max_length, len(self.entries))
+        if not count & 63 and len(self.heap) > 2 * len(self.entries) + 32:
+            self.compact()
+
+    def compact(self):
+        entries = self.entries
+        self.heap = [entry for entry in self.heap if entries.get(entry[3]) is entry]
+        heapq.heapify(self.heap)
+
+    def pop(self):
+        heap = self.heap
+        entries = self.entries
+        while heap:
+            entry = heapq.heappop(heap)
+            bed = entry[3]
+            if entries.get(bed) is entry:
+                del entries[bed]
+                return bed
+        raise IndexError("pop from an empty dispatch queue")
+
+
+class CrewNetwork:
+
+    def __init__(self, stations, num_crews, rule="fifo", travel_time=30.0, verbose=False):
+        # stations is a table like the one network.load_stations returns; a
+        # travel_time column, if there is one, overrides travel_time
+        self.names = list(stations["station"])
+        num_stations = len(self.names)
+        self.num_stations = num_stations
+        if num_crews < 1:
+            raise ValueError("MUST PROVIDE AT LEAST ONE CREW")
+        self.num_crews = num_crews
+        self.verbose = verbose
+        if isinstance(rule, str):
+            if rule not in PRIORITY_RULES:
+                raise ValueError("UNKNOWN PRIORITY RULE " + rule)
+            rule = PRIORITY_RULES[rule]
+        self.rule = rule
+        if "travel_time" in stations:
+            travel_time = stations["travel_time"]
+        if isinstance(travel_time, (int, float)):
+            travel_time = [travel_time] * num_stations
+        if len(travel_time) != num_stations:
+            raise ValueError("MUST PROVIDE ONE TRAVEL TIME PER STATION")
+
+        # every track bed of every station has its own trash and asks for its own
+        # crew; bed_station and bed_track give the station and track of each
+        self.bed_station = []
+        self.bed_track = []
+        for i in range(num_stations):
+            num_track_beds = int(stations["num_track_beds"][i])
+            self.bed_station = self.bed_station + [i] * num_track_beds
+            self.bed_track = self.bed_track + list(range(num_track_beds))
+        num_beds = len(self.bed_station)
+        self.num_beds = num_beds
+        self.travel_times = [float(travel_time[i]) for i in self.bed_station]
+
+        # rates and costs of syncprod.Station
+        self.trash_arrival_rate_scalar = 1.0/380
+        number_of_minutes_per_year = 525600
+        self.riders_per_minute_per_track = [float(stations["annual_ridership"][i]) / float(stations["num_track_beds"][i])
+                                            / number_of_minutes_per_year for i in self.bed_station]
+        self.trash_arrival_rates = [self.trash_arrival_rate_scalar * x for x in self.riders_per_minute_per_track]
+        self.fire_arrival_rate_scalar = 1.0/100000000
+        self.trash_thresholds = [int(stations["trash_threshold"][i]) for i in self.bed_station]
+        self.cost_of_track_cleaning_fireless = 10000.0
+        self.cost_of_track_cleaning_fire = 30000.0
+        self.wage_per_minute = 0.56667
+        self.minutes_per_cleaning = 90
+        self.minutes_per_fire_repair = 270
+
+        # one pending event per track bed and per crew
+        self.events = EventList()
+        self.queue = DispatchQueue()
+        self.random = random.Random()
+        self.numpy_random = None
+
+        # Units: minutes
+        self.time = 0.0
+        self.end_time = 0.0
+
+        # per track bed: trash on the tracks (kept up to date only while it waits),
+        # kind and trash of its next event, the job it waits for and since when,
+        # and the crew on its way to it
+        self.trash = [0] * num_beds
+        self.next_kind = [THRESHOLD] * num_beds
+        self.next_trash = [0] * num_beds
+        self.requests = [None] * num_beds
+        self.request_times = [0.0] * num_beds
+        self.crew_of = [None] * num_beds
+
+        # per crew: the track bed it is travelling to or working at, and whether it
+        # is working there yet
+        self.crew_bed = [None] * num_crews
+        self.crew_working = [False] * num_crews
+        self.idle_crews = []
+        self.crew_busy_time = 0.0
+        self.max_wait = 0.0
+
+        self.results = {}
+
+    def initialize_simulation(self, seed):
+        import numpy
+        self.time = 0.0
+        self.random.seed(seed)
+        self.numpy_random = numpy.random.RandomState(seed)
+        self.events.clear()
+        self.queue.clear()
+        num_beds = self.num_beds
+        self.trash = [0] * num_beds
+        self.requests = [None] * num_beds
+        self.request_times = [0.0] * num_beds
+        self.crew_of = [None] * num_beds
+        self.crew_bed = [None] * self.num_crews
+        self.crew_working = [False] * self.num_crews
+        self.idle_crews = list(range(self.num_crews - 1, -1, -1))
+        self.crew_busy_time = 0.0
+        self.max_wait = 0.0
+        self.results = {}
+        for metric in STATION_METRICS:
+            self.results[metric] = [0] * num_beds
+        for i in range(num_beds):
+            self.start_cycle(i)
+
+    def print_state(self):
+        year = self.year_results()
+        print("--------------------------------")
+        print("Current Time: " + str(self.time))
+        print("Number of stations: " + str(self.num_stations))
+        print("Number of track beds: " + str(self.num_beds))
+        print("Number of crews: " + str(self.num_crews))
+        for name in year:
+            print(name + ": " + str(year[name]))
+        print("--------------------------------\n\n")
+
+    def bed_name(self, bed):
+        return str(self.names[self.bed_station[bed]]) + " track " + str(self.bed_track[bed])
+
+    def add(self, metric, bed, amount):
+        self.results[metric][bed] = self.results[metric][bed] + amount
+
+    def start_cycle(self, bed):
+        # jump to the end of the cycle that starts with no trash now: a fire on the
+        # arrival of interval k, or the threshold cleaning after the last interval
+        rate = self.trash_arrival_rates[bed]
+        threshold = self.trash_thresholds[bed]
+        x = self.fire_arrival_rate_scalar / rate
+        hazard = self.random.expovariate(1.0)
+        if log_survival(x, threshold) <= hazard:
+            self.next_kind[bed] = THRESHOLD
+            num_intervals = threshold + 1
+        else:
+            low = 1
+            high = threshold
+            while low < high:
+                middle = (low + high) // 2
+                if log_survival(x, middle) > hazard:
+                    high = middle
+                else:
+                    low = middle + 1
+            self.next_kind[bed] = FIRE
+            num_intervals = low + 1
+        self.next_trash[bed] = num_intervals
+        self.trash[bed] = 0
+        mean_rate = rate + self.fire_arrival_rate_scalar * (num_intervals - 1) / 2.0
+        self.events.schedule(("bed", bed), self.time + self.random.gammavariate(num_intervals, 1.0 / mean_rate))
+
+    def schedule_waiting_step(self, bed):
+        # next trash arrival or fire of a track bed that waits for a crew
+        trash_rate = self.trash_arrival_rates[bed]
+        fire_rate = self.fire_arrival_rate_scalar * self.trash[bed]
+        total_rate = trash_rate + fire_rate
+        if self.random.random() * total_rate < fire_rate:
+            self.next_kind[bed] = FIRE
+        else:
+            self.next_kind[bed] = TRASH
+        self.events.schedule(("bed", bed), self.time + self.random.expovariate(total_rate))
+
+    def priority(self, bed):
+        return self.rule(self, bed)
+
+    def request_crew(self, bed, job):
+        if self.requests[bed] is None:
+            self.requests[bed] = job
+            self.request_times[bed] = self.time
+            self.add("requests", bed, 1)
+        elif job == REPAIR:
+            # a fire turns a cleaning the track bed already waits for into a repair
+            self.requests[bed] = REPAIR
+        else:
+            return
+        if self.crew_of[bed] is None:
+            self.queue.push(bed, URGENCY[self.requests[bed]], self.priority(bed))
+            self.dispatch()
+
+    def dispatch(self):
+        while self.idle_crews and len(self.queue) > 0:
+            bed = self.queue.pop()
+            crew = self.idle_crews.pop()
+            self.crew_bed[crew] = bed
+            self.crew_working[crew] = False
+            self.crew_of[bed] = crew
+            travel_time = self.travel_times[bed]
+            self.crew_busy_time = self.crew_busy_time + travel_time
+            self.events.schedule(("crew", crew), self.time + travel_time)
+
+    def handle_bed(self, bed):
+        kind = self.next_kind[bed]
+        if kind == TRASH:
+            self.trash[bed] = self.trash[bed] + 1
+            if bed in self.queue:
+                self.queue.push(bed, URGENCY[self.requests[bed]], self.priority(bed))
+        elif kind == THRESHOLD:
+            self.trash[bed] = self.next_trash[bed]
+            if self.verbose:
+                print(str(self.time) + ": threshold cleaning requested at " + self.bed_name(bed))
+            self.request_crew(bed, CLEANING)
+        else:
+            if self.requests[bed] is None:
+                self.trash[bed] = self.next_trash[bed] - 1
+            if self.verbose:
+                print(str(self.time) + ": fire at " + self.bed_name(bed) + " with trash "
+                      + str(self.trash[bed]))
+            self.add("fires", bed, 1)
+            self.add("maintenance_cost", bed, self.cost_of_track_cleaning_fire)
+            # like syncprod, the fire takes the trash with it
+            self.trash[bed] = 0
+            self.request_crew(bed, REPAIR)
+        # until a crew gets there, trash and fires come one by one
+        self.schedule_waiting_step(bed)
+
+    def handle_crew(self, crew):
+        bed = self.crew_bed[crew]
+        if self.crew_working[crew]:
+            self.crew_bed[crew] = None
+            self.idle_crews.append(crew)
+            self.dispatch()
+            return
+        # the crew gets to the track bed and takes its trash away
+        wait = self.time - self.request_times[bed]
+        self.add("waiting_time", bed, wait)
+        self.max_wait = max(self.max_wait, wait)
+        job = self.requests[bed]
+        if job == REPAIR:
+            duration = self.minutes_per_fire_repair
+            self.add("repairs", bed, 1)
+        else:
+            duration = self.minutes_per_cleaning
+            self.add("threshold_cleanings", bed, 1)
+            self.add("maintenance_cost", bed, self.cost_of_track_cleaning_fireless)
+        self.add("productivity_loss", bed,
+                 prodloss.productivity_loss(self.riders_per_minute_per_track[bed], duration, self.wage_per_minute,
+                                            self.numpy_random))
+        self.requests[bed] = None
+        self.crew_of[bed] = None
+        self.start_cycle(bed)
+        self.crew_working[crew] = True
+        self.crew_busy_time = self.crew_busy_time + duration
+        self.events.schedule(("crew", crew), self.time + duration)
+
+    def simulate(self, end_time, seed=None):
+        self.end_time = end_time
+        self.initialize_simulation(seed)
+        while True:
+            time, name = self.events.pop()
+            if time >= end_time:
+                break
+            self.time = time
+            if name[0] == "bed":
+                self.handle_bed(name[1])
+            else:
+                self.handle_crew(name[1])
+        self.time = end_time
+        return self.year_results()
+
+    def bed_results(self):
+        # metric -> its value at every track bed
+        return self.results
+
+    def station_results(self):
+        # metric -> its value at every station, over all of its track beds
+        results = {}
+        for metric in STATION_METRICS:
+            values = [0] * self.num_stations
+            for bed in range(self.num_beds):
+                station = self.bed_station[bed]
+                values[station] = values[station] + self.results[metric][bed]
+            results[metric] = values
+        return results
+
+    def year_results(self):
+        results = {}
+        for metric in STATION_METRICS:
+            results[metric] = sum(self.results[metric])
+        served = results["threshold_cleanings"] + results["repairs"]
+        results["mean_wait"] = results["waiting_time"] / served if served > 0 else 0.0
+        results["max_wait"] = self.max_wait
+        results["max_queue_length"] = self.queue.max_length
+        # travel and work started by the end of the year, over the crews' time
+        results["crew_utilization"] = self.crew_busy_time / (self.num_crews * self.end_time)
+        return results
+
+
+if __name__ == "__main__":
+    import numpy
+    print("Starting")
+    num_stations = 300
+    generator = numpy.random.RandomState(0)
+    stations = {"station": numpy.array(["station_" + str(i) for i in range(num_stations)], dtype=object),
+                "annual_ridership": generator.uniform(2000000, 25000000, num_stations),
+                "num_track_beds": generator.randint(1, 5, num_stations),
+                "trash_threshold": numpy.full(num_stations, 2150),
+                "travel_time": generator.uniform(15, 90, num_stations)}
+    for rule in PRIORITY_RULES:
+        s1 = CrewNetwork(stations, 4, rule)
+        s1.simulate(525600, seed=0)
+        print(rule)
+        s1.print_state()
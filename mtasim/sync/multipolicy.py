@@ -0,0 +1,341 @@
+import copy
+import functools
+import math
+import random
+from mtasim.eventlist import EventList
+from mtasim.sync.accumulators import MetricAccumulators
+from mtasim.sync import prodloss
+from mtasim.sync.streams import RandomStreams, StreamCursor
+
+
+# Any number of cleaning policies on one shared trash stream, in a single pass.
+#
+# syncprod.Station runs exactly two policies side by side (the periodic baseline
+# and the threshold alt). MultiStation runs a list of them, e.g.
+#     [periodic_policy(26280)] + [threshold_policy(t) for t in range(1000, 3000, 100)]
+# with the rates, costs and random number streams of syncprod, so every policy sees
+# the same trash arrivals, fire uniforms and productivity loss draws, and a pair of
+# a periodic and a threshold policy gives exactly syncprod's results.
+#
+# Policies whose state is identical are simulated as one PolicyGroup: every year
+# starts with all policies in one group, and a trash arrival, a fire or a cleaning
+# is processed once per group, not once per policy. A group is only copied when an
+# event treats some of its policies differently from the rest: a scheduled cleaning
+# or a threshold cleaning of some of them, or a fire in a group with both kinds of
+# policy (threshold policies also pay a cleaning's productivity loss for a fire, as
+# in syncprod). Policies that stay identical (the same threshold twice, say) never
+# split.
+#
+# The trash arrival is the only event that touches every group, and all it does
+# per group is a few additions; the next fire of every group comes from the one
+# fire uniform drawn per arrival, and only the earliest of them is on the event
+# list. So 20 thresholds and a periodic schedule cost far less than 20 runs of a
+# single policy.
+POLICY_METRICS = ["fires", "cleanings", "scheduled_cleanings", "threshold_cleanings", "maintenance_cost",
+                  "productivity_loss"]
+
+POLICIES = ["periodic", "threshold"]
+
+
+def periodic_policy(cleaning_rate, name=None):
+    if name is None:
+        name = "periodic_%g" % cleaning_rate
+    return {"name": name, "policy": "periodic", "cleaning_rate": cleaning_rate}
+
+
+def threshold_policy(trash_threshold, name=None):
+    if name is None:
+        name = "threshold_%g" % trash_threshold
+    return {"name": name, "policy": "threshold", "trash_threshold": trash_threshold}
+
+
+def metric_names(policies):
+    # year_results keys, in the order they are reported
+    names = []
+    for policy in policies:
+        for metric in POLICY_METRICS:
+            names.append(metric + "_" + policy["name"])
+    names.append("trash_arrivals")
+    return names
+
+
+class PolicyGroup:
+
+    def __init__(self, policies, pl_nofire, pl_fire):
+        # policy dicts with identical state
+        self.policies = policies
+        self.aggregate_trash = 0
+        self.fire_time = math.inf
+        self.num_fires = 0
+        self.num_cleanings = 0
+        self.num_scheduled_cleanings = 0
+        self.num_threshold_cleanings = 0
+        self.total_maintenance_cost = 0.0
+        self.total_productivity_loss = 0.0
+        # the k-th cleaning (or fire repair) of a policy costs the k-th draw, like in syncprod
+        self.pl_nofire = pl_nofire
+        self.pl_fire = pl_fire
+        self.update_policies()
+
+    def update_policies(self):
+        # smallest threshold of the group, and its kind of policy if it has only one
+        self.trash_threshold = math.inf
+        kinds = set()
+        for policy in self.policies:
+            kinds.add(policy["policy"])
+            if policy["policy"] == "threshold":
+                self.trash_threshold = min(self.trash_threshold, policy["trash_threshold"])
+        self.kind = kinds.pop() if len(kinds) == 1 else None
+
+    def split(self, policies):
+        # move policies out of this group into a copy of it
+        group = copy.copy(self)
+        group.policies = policies
+        group.pl_nofire = copy.copy(self.pl_nofire)
+        group.pl_fire = copy.copy(self.pl_fire)
+        self.policies = [policy for policy in self.policies if policy not in policies]
+        self.update_policies()
+        group.update_policies()
+        return group
+
+
+class MultiStation:
+
+    def __init__(self, annual_ridership, num_track_beds, policies, verbose=False):
+        if len(policies) == 0:
+            raise ValueError("MUST PROVIDE POLICIES")
+        names = set()
+        for policy in policies:
+            if policy["policy"] not in POLICIES:
+                raise ValueError("UNKNOWN POLICY " + str(policy["policy"]))
+            if policy["name"] in names:
+                raise ValueError("DUPLICATE POLICY NAME " + policy["name"])
+            names.add(policy["name"])
+        self.annual_ridership = annual_ridership
+        self.num_track_beds = num_track_beds
+        self.policies = list(policies)
+        self.verbose = verbose
+
+        # rates and costs of syncprod.Station
+        self.trash_arrival_rate_scalar = 1.0/380
+        number_of_minutes_per_year = 525600
+        self.riders_per_minute_per_track = ((annual_ridership/num_track_beds)/number_of_minutes_per_year)
+        self.trash_arrival_rate = self.trash_arrival_rate_scalar * self.riders_per_minute_per_track
+        self.fire_arrival_rate_scalar = 1.0/100000000
+        self.cost_of_track_cleaning_fireless = 10000.0
+        self.cost_of_track_cleaning_fire = 30000.0
+        self.wage_per_minute = 0.56667
+        self.minutes_per_cleaning = 90
+        self.minutes_per_fire_repair = 270
+
+        # one scheduled cleaning event per distinct cleaning rate
+        self.cleaning_rates = sorted(set(policy["cleaning_rate"] for policy in policies
+                                         if policy["policy"] == "periodic"))
+        # ties go to trash, then scheduled cleaning, then fire
+        priorities = {"trash": 0, "fire": 2}
+        self.handlers = {"trash": self.handle_trash_arrival, "fire": self.handle_fire}
+        for i in range(len(self.cleaning_rates)):
+            priorities["scheduled_cleaning_" + str(i)] = 1
+            self.handlers["scheduled_cleaning_" + str(i)] = functools.partial(self.handle_scheduled_cleaning, i)
+        self.events = EventList(priorities)
+
+        # random number streams, the same as syncprod's
+        self.seed_value = None
+        self.rep = 0
+        self.antithetic = False
+        self.streams = RandomStreams()
+        self.streams.add_stream("trash", self.generate_trash_interarrivals)
+        self.streams.add_stream("fire", self.generate_fire_uniforms)
+        self.streams.add_stream("prod_loss_nofire", self.generate_nofire_prod_losses, block_size=64)
+        self.streams.add_stream("prod_loss_fire", self.generate_fire_prod_losses, block_size=16)
+        self.trash_interarrivals = self.streams.cursor("trash")
+        self.fire_uniforms = self.streams.cursor("fire")
+
+        # Units: minutes
+        self.time = 0.0
+        self.end_time = 0.0
+        self.num_trash_arrivals = 0
+        self.groups = []
+        # groups copied this year, as policies diverged
+        self.num_copies = 0
+
+    def initialize_simulation(self):
+        self.time = 0.0
+        self.num_trash_arrivals = 0
+        self.num_copies = 0
+
+        # start the random number streams over
+        if self.seed_value is None:
+            self.streams.seed(random.getrandbits(32), 0)
+        else:
+            self.streams.seed(self.seed_value, self.rep, self.antithetic)
+            self.rep = self.rep + 1
+
+        # every policy starts the year with no trash, so they all share one group
+        self.groups = [PolicyGroup(list(self.policies), StreamCursor(self.streams.streams["prod_loss_nofire"], 0),
+                                   StreamCursor(self.streams.streams["prod_loss_fire"], 0))]
+        self.events.clear()
+        self.events.schedule("trash", self.trash_interarrivals.next())
+        for i in range(len(self.cleaning_rates)):
+            self.events.schedule("scheduled_cleaning_" + str(i), self.cleaning_rates[i])
+
+    def print_state(self):
+        print("--------------------------------")
+        print("Current Time: " + str(self.time))
+        print("Number of groups: " + str(len(self.groups)))
+        for group in self.groups:
+            print(", ".join(policy["name"] for policy in group.policies) + ": aggregate trash "
+                  + str(group.aggregate_trash) + ", cleanings " + str(group.num_cleanings) + ", fires "
+                  + str(group.num_fires))
+        print("--------------------------------\n\n")
+
+    def seed(self, seed, rep, antithetic=False):
+        # same as syncprod.Station.seed
+        self.seed_value = seed
+        self.rep = rep
+        self.antithetic = antithetic
+
+    def year_results(self):
+        results = {}
+        for group in self.groups:
+            values = {"fires": group.num_fires,
+                      "cleanings": group.num_cleanings,
+                      "scheduled_cleanings": group.num_scheduled_cleanings,
+                      "threshold_cleanings": group.num_threshold_cleanings,
+                      "maintenance_cost": group.total_maintenance_cost,
+                      "productivity_loss": group.total_productivity_loss}
+            for policy in group.policies:
+                for metric in POLICY_METRICS:
+                    results[metric + "_" + policy["name"]] = values[metric]
+        results["trash_arrivals"] = self.num_trash_arrivals
+        return results
+
+    def generate_trash_interarrivals(self, numpy_random, size):
+        return numpy_random.exponential(1.0 / self.trash_arrival_rate, size)
+
+    def generate_fire_uniforms(self, numpy_random, size):
+        return numpy_random.random_sample(size)
+
+    def generate_nofire_prod_losses(self, numpy_random, size):
+        return prodloss.sample_productivity_loss(self.riders_per_minute_per_track, self.minutes_per_cleaning,
+                                                 self.wage_per_minute, size, numpy_random)
+
+    def generate_fire_prod_losses(self, numpy_random, size):
+        return prodloss.sample_productivity_loss(self.riders_per_minute_per_track, self.minutes_per_fire_repair,
+                                                 self.wage_per_minute, size, numpy_random)
+
+    def diverge(self, group, policies):
+        # the group of policies, copied out of group unless they are all of it
+        if len(policies) == len(group.policies):
+            return group
+        diverged = group.split(policies)
+        self.groups.append(diverged)
+        self.num_copies = self.num_copies + 1
+        return diverged
+
+    def clean(self, group, fire):
+        group.num_cleanings = group.num_cleanings + 1
+        group.aggregate_trash = 0
+        group.fire_time = math.inf
+        if fire:
+            group.total_maintenance_cost = group.total_maintenance_cost + self.cost_of_track_cleaning_fire
+            group.total_productivity_loss = group.total_productivity_loss + group.pl_fire.next()
+            # like syncprod's clean_alt, a threshold policy also pays a cleaning's loss for a fire
+            if group.kind == "threshold":
+                group.total_productivity_loss = group.total_productivity_loss + group.pl_nofire.next()
+        else:
+            group.total_maintenance_cost = group.total_maintenance_cost + self.cost_of_track_cleaning_fireless
+            group.total_productivity_loss = group.total_productivity_loss + group.pl_nofire.next()
+        if self.verbose:
+            print(("Fire" if fire else "Cleaning") + " at " + str(self.time) + ": "
+                  + ", ".join(policy["name"] for policy in group.policies))
+
+    def schedule_next_fire(self):
+        next_fire = math.inf
+        for group in self.groups:
+            if group.fire_time < next_fire:
+                next_fire = group.fire_time
+        self.events.schedule("fire", next_fire)
+
+    def handle_trash_arrival(self):
+        self.events.schedule("trash", self.time + self.trash_interarrivals.next())
+        if self.time < self.end_time:
+            self.num_trash_arrivals = self.num_trash_arrivals + 1
+        # one uniform for the next fire of every group, as in syncprod
+        exposure = -math.log(1 - self.fire_uniforms.next()) / self.fire_arrival_rate_scalar
+        next_fire = math.inf
+        for group in list(self.groups):
+            group.aggregate_trash = group.aggregate_trash + 1
+            while group.aggregate_trash > group.trash_threshold:
+                policies = [policy for policy in group.policies
+                            if policy["policy"] == "threshold" and policy["trash_threshold"] < group.aggregate_trash]
+                cleaned = self.diverge(group, policies)
+                cleaned.num_threshold_cleanings = cleaned.num_threshold_cleanings + 1
+                self.clean(cleaned, False)
+                if cleaned is group:
+                    break
+            if group.aggregate_trash > 0:
+                group.fire_time = self.time + exposure / group.aggregate_trash
+                if group.fire_time < next_fire:
+                    next_fire = group.fire_time
+        self.events.schedule("fire", next_fire)
+
+    def handle_scheduled_cleaning(self, i):
+        cleaning_rate = self.cleaning_rates[i]
+        self.events.schedule("scheduled_cleaning_" + str(i), self.time + cleaning_rate)
+        for group in list(self.groups):
+            policies = [policy for policy in group.policies
+                        if policy["policy"] == "periodic" and policy["cleaning_rate"] == cleaning_rate]
+            if len(policies) > 0:
+                cleaned = self.diverge(group, policies)
+                cleaned.num_scheduled_cleanings = cleaned.num_scheduled_cleanings + 1
+                self.clean(cleaned, False)
+        self.schedule_next_fire()
+
+    def handle_fire(self):
+        for group in list(self.groups):
+            if group.fire_time != self.time:
+                continue
+            if group.kind is None:
+                # the two kinds of policy pay differently for a fire
+                burned = [group, self.diverge(group, [policy for policy in group.policies
+                                                      if policy["policy"] == "threshold"])]
+            else:
+                burned = [group]
+            for burned_group in burned:
+                burned_group.num_fires = burned_group.num_fires + 1
+                self.clean(burned_group, True)
+        self.schedule_next_fire()
+
+    def simulate(self, end_time):
+        self.end_time = end_time
+        self.initialize_simulation()
+        while self.time < end_time:
+            self.time, event = self.events.pop()
+            self.handlers[event]()
+
+
+def run_policies(annual_ridership, num_track_beds, policies, reps, seed=0, end_time=525600, verbose=True):
+    # reps years of every policy on common random numbers; the accumulators of
+    # metric_names(policies), with the trash arrival count as their control
+    s1 = MultiStation(annual_ridership, num_track_beds, policies)
+    metrics = metric_names(policies)
+    accumulators = MetricAccumulators(metrics, "trash_arrivals")
+    for rep in range(reps):
+        if seed is not None:
+            s1.seed(seed, rep)
+        s1.simulate(end_time)
+        accumulators.update(s1.year_results())
+    if verbose:
+        Z = 1.96
+        for policy in policies:
+            line = policy["name"] + ":"
+            for metric in ["fires", "cleanings", "maintenance_cost", "productivity_loss"]:
+                mean, stddev, ci = accumulators[metric + "_" + policy["name"]].confidence_interval(Z)
+                line = line + " " + metric + " " + str(round(mean, 3)) + " +/- " + str(round(ci, 3))
+            print(line)
+    return accumulators
+
+
+if __name__ == "__main__":
+    run_policies(25000000, 1, [periodic_policy(26280)] + [threshold_policy(t) for t in range(1000, 3000, 100)], 20)
@@ -0,0 +1,136 @@
+import concurrent.futures
+import csv
+import sys
+import numpy
+from mtasim.sync import syncprod
+from mtasim.sync.trackbeds import TrackBedStation
+
+
+# Runs a year of syncprod.Station for every station in the system.
+#
+# Stations come from a CSV with one row per station and the columns
+#     station, annual_ridership, num_track_beds[, trash_threshold, cleaning_rate]
+# The last two columns are optional per row; stations without them use the
+# trash_threshold and cleaning_rate passed to load_stations. The table is kept as
+# one numpy array per column, so a chunk of stations is just a list of indices.
+#
+# syncprod.Station simulates one track bed at the station's ridership per track, so
+# it only runs the stations with a single track bed. Stations with more run through
+# trackbeds.TrackBedStation, which gives every track bed its own trash and fire
+# clock and adds them up, so the spread of a station's results is that of
+# independent track beds. Neither uses importance sampling here, so both likelihood
+# ratios are 1.
+#
+# Station i is always seeded with (seed, i), and stations are handed to the
+# process pool busiest first so the long ones don't end up last. Results are put
+# back in station order, so a run gives the same numbers for any number of workers.
+COLUMNS = ["annual_ridership", "num_track_beds", "trash_threshold", "cleaning_rate"]
+
+
+def load_stations(path, trash_threshold=None, cleaning_rate=None):
+    names = []
+    columns = {}
+    for column in COLUMNS:
+        columns[column] = []
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            names.append(row["station"])
+            for column in COLUMNS:
+                value = row.get(column)
+                if value is None or value.strip() == "":
+                    if column == "trash_threshold":
+                        value = trash_threshold
+                    elif column == "cleaning_rate":
+                        value = cleaning_rate
+                if value is None:
+                    raise ValueError("MUST PROVIDE " + column.upper() + " FOR STATION " + row["station"])
+                columns[column].append(float(value))
+    stations = {"station": numpy.array(names, dtype=object)}
+    stations["annual_ridership"] = numpy.array(columns["annual_ridership"], dtype=numpy.float64)
+    stations["num_track_beds"] = numpy.array(columns["num_track_beds"], dtype=numpy.int64)
+    stations["trash_threshold"] = numpy.array(columns["trash_threshold"], dtype=numpy.int64)
+    stations["cleaning_rate"] = numpy.array(columns["cleaning_rate"], dtype=numpy.float64)
+    return stations
+
+
+def simulate_stations(annual_ridership, num_track_beds, trash_threshold, cleaning_rate, indices, seed, end_time):
+    # worker side: the parameter arrays only hold the stations in this chunk
+    results = []
+    for i in range(len(indices)):
+        if num_track_beds[i] == 1:
+            s1 = syncprod.Station(annual_ridership[i], num_track_beds[i], trash_threshold[i], cleaning_rate[i],
+                                  verbose=False)
+            s1.seed(seed, indices[i])
+            s1.simulate(end_time)
+            results.append(s1.year_results())
+        else:
+            s1 = TrackBedStation(annual_ridership[i], int(num_track_beds[i]), trash_threshold[i], cleaning_rate[i])
+            totals = s1.simulate(end_time, 1, seed=[seed, indices[i]])
+            year = {}
+            for metric in totals:
+                year[metric] = float(totals[metric][0])
+            year["likelihood_ratio_baseline"] = 1.0
+            year["likelihood_ratio_alt"] = 1.0
+            results.append(year)
+    return indices, results
+
+
+def run_network_simulation(stations, seed=0, num_workers=None, chunk_size=8, end_time=525600):
+    num_stations = len(stations["station"])
+    # results[metric][i] is the value of metric at station i
+    results = {}
+    for metric in syncprod.METRICS:
+        results[metric] = numpy.zeros(num_stations)
+    # riders per minute per track drives both the trash arrivals and the productivity loss
+    # draws, so it is a good measure of how long a station takes to simulate
+    order = numpy.argsort(-stations["annual_ridership"] / stations["num_track_beds"], kind="stable")
+    with concurrent.futures.ProcessPoolExecutor(max_workers=num_workers) as executor:
+        futures = []
+        for start in range(0, num_stations, chunk_size):
+            chunk = order[start:start + chunk_size]
+            futures.append(executor.submit(simulate_stations, stations["annual_ridership"][chunk],
+                                           stations["num_track_beds"][chunk], stations["trash_threshold"][chunk],
+                                           stations["cleaning_rate"][chunk], chunk.tolist(), seed, end_time))
+        for future in concurrent.futures.as_completed(futures):
+            indices, chunk_results = future.result()
+            for i in range(len(indices)):
+                for metric in syncprod.METRICS:
+                    results[metric][indices[i]] = chunk_results[i][metric]
+    return results
+
+
+def system_totals(results):
+    totals = {}
+    for metric in syncprod.METRICS:
+        totals[metric] = float(numpy.sum(results[metric]))
+    return totals
+
+
+def print_network_summary(stations, results):
+    totals = system_totals(results)
+    print("--------------------------------")
+    print("Number of stations: " + str(len(stations["station"])))
+    print("Number of track beds: " + str(numpy.sum(stations["num_track_beds"])))
+    print("System ridership: " + str(numpy.sum(stations["annual_ridership"])))
+    # totals over every track bed of every station
+    print("Baseline: Number of fires:" + str(totals["fires_baseline"]))
+    print("Baseline: Total Maintenance Cost:" + str(totals["maintenance_cost_baseline"]))
+    print("Baseline: Total Productivity Loss:" + str(totals["productivity_loss_baseline"]))
+    print("Alt: Number of fires:" + str(totals["fires_alt"]))
+    print("Alt: Total Maintenance Cost:" + str(totals["maintenance_cost_alt"]))
+    print("Alt: Total Productivity Loss:" + str(totals["productivity_loss_alt"]))
+    print("--------------------------------")
+
+
+if __name__ == "__main__":
+    # python -m mtasim.sync.network stations.csv [trash_threshold cleaning_rate]
+    if len(sys.argv) == 2:
+        stations = load_stations(sys.argv[1])
+    elif len(sys.argv) == 4:
+        stations = load_stations(sys.argv[1], int(sys.argv[2]), float(sys.argv[3]))
+    else:
+        print("MUST PROVIDE STATIONS CSV")
+        sys.exit(1)
+    print("Starting")
+    results = run_network_simulation(stations)
+    print_network_summary(stations, results)
@@ -0,0 +1,104 @@
+import concurrent.futures
+from mtasim.sync import syncprod
+from mtasim.sync.accumulators import MetricAccumulators
+from mtasim.sync.cache import replication_key
+
+
+# Runs year-long replications of syncprod.Station across a process pool.
+#
+# Replication rep is always seeded with (seed, rep), no matter which worker runs
+# it, and replications are handed out in fixed-size chunks whose results are put
+# back together in replication order. Each chunk also comes back summarized in a
+# MetricAccumulators, and those are merged in chunk order. So a run gives
+# bit-identical results for any number of workers. With antithetic=True each
+# replication is a year averaged with its mirror image, and with
+# fire_rate_inflation > 1 fires are importance sampled (see syncprod.run_simulations).
+def simulate_replications(annual_ridership, num_track_beds, trash_threshold, cleaning_rate, seed, reps, end_time,
+                          antithetic=False, fire_rate_inflation=1.0):
+    s1 = syncprod.Station(annual_ridership, num_track_beds, trash_threshold, cleaning_rate, verbose=False)
+    s1.set_fire_rate_inflation(fire_rate_inflation)
+    results = []
+    accumulators = MetricAccumulators(syncprod.METRICS, control="trash_arrivals")
+    for rep in reps:
+        if antithetic:
+            year = syncprod.simulate_antithetic_pair(s1, seed, rep, end_time)
+        else:
+            s1.seed(seed, rep)
+            s1.simulate(end_time)
+            year = s1.year_results()
+        results.append(year)
+        accumulators.update(year)
+    return results, accumulators
+
+
+def run_parallel_simulations(annual_ridership, num_track_beds, trash_threshold, cleaning_rate, num_reps,
+                             seed=0, num_workers=None, chunk_size=10, end_time=525600, antithetic=False,
+                             fire_rate_inflation=1.0, cache=None):
+    if cache is not None:
+        return run_cached_simulations(annual_ridership, num_track_beds, trash_threshold, cleaning_rate, num_reps,
+                                      seed, num_workers, chunk_size, end_time, antithetic, fire_rate_inflation, cache)
+    # results[metric][rep] is the value of metric in replication rep
+    results = {}
+    for metric in syncprod.METRICS:
+        results[metric] = []
+    accumulators = MetricAccumulators(syncprod.METRICS, control="trash_arrivals")
+    with concurrent.futures.ProcessPoolExecutor(max_workers=num_workers) as executor:
+        futures = []
+        for start in range(0, num_reps, chunk_size):
+            reps = range(start, min(start + chunk_size, num_reps))
+            futures.append(executor.submit(simulate_replications, annual_ridership, num_track_beds,
+                                           trash_threshold, cleaning_rate, seed, reps, end_time, antithetic,
+                                           fire_rate_inflation))
+        for future in futures:
+            chunk_results, chunk_accumulators = future.result()
+            for year in chunk_results:
+                for metric in syncprod.METRICS:
+                    results[metric].append(year[metric])
+            accumulators.merge(chunk_accumulators)
+    return results, accumulators
+
+
+def run_cached_simulations(annual_ridership, num_track_beds, trash_threshold, cleaning_rate, num_reps, seed,
+                           num_workers, chunk_size, end_time, antithetic, fire_rate_inflation, cache):
+    # like run_parallel_simulations, but only the replications missing from cache are
+    # simulated; the accumulators are then fed every replication in order, so they
+    # don't depend on which replications were cached
+    s1 = syncprod.Station(annual_ridership, num_track_beds, trash_threshold, cleaning_rate, verbose=False)
+    s1.set_fire_rate_inflation(fire_rate_inflation)
+    key = replication_key(s1.cache_parameters(seed, end_time, antithetic))
+    years = cache.get_many(key, range(num_reps))
+    missing = [rep for rep in range(num_reps) if rep not in years]
+    if len(missing) > 0:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=num_workers) as executor:
+            futures = []
+            for start in range(0, len(missing), chunk_size):
+                reps = missing[start:start + chunk_size]
+                futures.append(executor.submit(simulate_replications, annual_ridership, num_track_beds,
+                                               trash_threshold, cleaning_rate, seed, reps, end_time, antithetic,
+                                               fire_rate_inflation))
+            for i in range(len(futures)):
+                chunk_results, chunk_accumulators = futures[i].result()
+                reps = missing[i * chunk_size:(i + 1) * chunk_size]
+                new_years = {}
+                for j in range(len(reps)):
+                    new_years[reps[j]] = chunk_results[j]
+                cache.put_many(key, new_years)
+                years.update(new_years)
+    results = {}
+    for metric in syncprod.METRICS:
+        results[metric] = []
+    accumulators = MetricAccumulators(syncprod.METRICS, control="trash_arrivals")
+    for rep in range(num_reps):
+        for metric in syncprod.METRICS:
+            results[metric].append(years[rep][metric])
+        accumulators.update(years[rep])
+    return results, accumulators
+
+
+if __name__ == "__main__":
+    print("Starting")
+    results, accumulators = run_parallel_simulations(25000000, 1, 2150, 26280, 1500)
+    for metric in syncprod.METRICS:
+        print("\n" + metric)
+        print(accumulators[metric].mean)
+        print(accumulators[metric].stdev())
@@ -0,0 +1,58 @@
+# Productivity loss of one cleaning or fire repair that closes the tracks for
+# duration minutes: N ~ Poisson(rate * duration) riders are delayed, and each loses
+# wage_per_minute * duration * U minutes' worth of wages, U ~ Uniform(0, 1).
+#
+# Given N, the sum of the N uniforms has the Irwin-Hall distribution with mean N/2
+# and variance N/12. Counts below exact_limit are summed uniform by uniform (all
+# of them in one numpy call). Above it the sum is drawn as a normal with the same
+# mean and variance, clipped to [0, N]. The only difference from Irwin-Hall is
+# then the excess kurtosis of -6/(5N), i.e. below 0.005 at the default
+# exact_limit. For comparison, a 90 minute cleaning at 25M riders on one track
+# delays around 4300 riders.
+#
+# numpy is imported in the functions that use it, so importing this module (and
+# syncprod) does not pay for it until the first loss is drawn.
+EXACT_LIMIT = 256
+
+
+def uniform_sums(counts, numpy_random, exact_limit=EXACT_LIMIT):
+    # sums[i] is the sum of counts[i] independent Uniform(0, 1) draws
+    import numpy
+    counts = numpy.asarray(counts, dtype=numpy.int64)
+    sums = numpy.zeros(counts.shape)
+    exact = (counts > 0) & (counts < exact_limit)
+    if numpy.any(exact):
+        exact_counts = counts[exact]
+        uniforms = numpy_random.random_sample(int(numpy.sum(exact_counts)))
+        # start of each count's run of uniforms
+        starts = numpy.cumsum(exact_counts) - exact_counts
+        sums[exact] = numpy.add.reduceat(uniforms, starts)
+    large = counts >= exact_limit
+    if numpy.any(large):
+        large_counts = counts[large]
+        normals = numpy_random.standard_normal(len(large_counts))
+        sums[large] = numpy.clip(large_counts / 2.0 + numpy.sqrt(large_counts / 12.0) * normals, 0.0, large_counts)
+    return sums
+
+
+def productivity_loss(rate, duration, wage_per_minute, numpy_random, exact_limit=EXACT_LIMIT):
+    # one loss; same distribution as sample_productivity_loss without the array overhead
+    num_riders = numpy_random.poisson(rate * duration)
+    if num_riders == 0:
+        return 0.0
+    if num_riders < exact_limit:
+        total = float(numpy_random.random_sample(num_riders).sum())
+    else:
+        total = num_riders / 2.0 + (num_riders / 12.0) ** 0.5 * numpy_random.standard_normal()
+        total = min(max(total, 0.0), float(num_riders))
+    return wage_per_minute * duration * total
+
+
+def sample_productivity_loss(rate, duration, wage_per_minute, size, numpy_random, exact_limit=EXACT_LIMIT):
+    # size independent losses, as an array; rate and duration may also be arrays of
+    # length size to cost many different cleanings in one call
+    import numpy
+    rate = numpy.broadcast_to(rate, (size,))
+    duration = numpy.broadcast_to(duration, (size,))
+    num_riders = numpy_random.poisson(rate * duration)
+    return wage_per_minute * duration * uniform_sums(num_riders, numpy_random, exact_limit)
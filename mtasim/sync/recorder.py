@@ -0,0 +1,110 @@
+import os
+import struct
+
+
+# Binary event traces of single replications, for auditing a year after the fact.
+#
+# Every event is one row of a numpy structured array (EVENT_DTYPE, 18 bytes). Rows
+# are written into a preallocated chunk, and every full chunk is appended to a .npy
+# file whose header is rewritten with the final row count when the year ends. So a
+# trace loads with zero copy through load_trace, which memory-maps the file.
+#
+# Trash arrivals affect both sims and are recorded once, with policy BOTH and the
+# baseline's aggregate trash; the alt's follows from its cleanings. Cleanings and
+# fires are recorded per sim with the aggregate trash they cleared and their cost:
+# maintenance cost plus productivity loss.
+#
+# numpy is only imported once a trace is written or read, so syncprod can import
+# the event codes below for free. EVENT_DTYPE is built on first use.
+def event_dtype():
+    import numpy
+    return numpy.dtype([("time", "<f8"), ("aggregate_trash", "<u4"), ("cost", "<f4"),
+                        ("event", "u1"), ("policy", "u1")])
+
+
+def __getattr__(name):
+    if name == "EVENT_DTYPE":
+        return event_dtype()
+    raise AttributeError("module " + __name__ + " has no attribute " + name)
+
+
+# event codes
+TRASH = 0
+SCHEDULED_CLEANING = 1
+THRESHOLD_CLEANING = 2
+FIRE = 3
+
+# policy codes
+BASELINE = 0
+ALT = 1
+BOTH = 2
+
+# bytes reserved for the .npy magic string, version, header length and header
+HEADER_SIZE = 256
+
+
+def npy_header(num_rows):
+    import numpy.lib.format
+    header = ("{'descr': " + repr(numpy.lib.format.dtype_to_descr(event_dtype()))
+              + ", 'fortran_order': False, 'shape': (" + str(num_rows) + ",), }")
+    # format version 1.0: magic, version, little-endian header length, then the
+    # header padded with spaces and ending in a newline
+    header = header.ljust(HEADER_SIZE - 10 - 1) + "\n"
+    return b"\x93NUMPY\x01\x00" + struct.pack("<H", len(header)) + header.encode("latin1")
+
+
+class Recorder:
+
+    # path_pattern is formatted with the seed and replication index of each year,
+    # e.g. "traces/trace_{seed}_{rep}.npy", and with antithetic (1 for the mirror
+    # year of an antithetic pair, 0 otherwise). The mirror year has the same seed and
+    # replication index as the year it mirrors, so a pattern without {antithetic}
+    # gets "_antithetic" before its extension for the mirror year's trace.
+    def __init__(self, path_pattern, chunk_size=65536):
+        self.path_pattern = path_pattern
+        self.chunk_size = chunk_size
+        import numpy
+        self.buffer = numpy.zeros(chunk_size, dtype=event_dtype())
+        self.size = 0
+        self.num_rows = 0
+        self.file = None
+        self.path = None
+
+    def open(self, seed, rep, antithetic=False):
+        self.close()
+        self.path = self.path_pattern.format(seed=seed, rep=rep, antithetic=int(antithetic))
+        if antithetic and "{antithetic}" not in self.path_pattern:
+            root, extension = os.path.splitext(self.path)
+            self.path = root + "_antithetic" + extension
+        self.file = open(self.path, "wb")
+        self.file.write(npy_header(0))
+        self.size = 0
+        self.num_rows = 0
+
+    def record(self, time, event, policy, aggregate_trash, cost):
+        self.buffer[self.size] = (time, aggregate_trash, cost, event, policy)
+        self.size = self.size + 1
+        if self.size == self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self.size > 0:
+            self.buffer[:self.size].tofile(self.file)
+            self.num_rows = self.num_rows + self.size
+            self.size = 0
+
+    def close(self):
+        # finish the current trace: write what is left and fix up the row count
+        if self.file is None:
+            return
+        self.flush()
+        self.file.seek(0)
+        self.file.write(npy_header(self.num_rows))
+        self.file.close()
+        self.file = None
+
+
+def load_trace(path):
+    # memory-mapped, read-only view of a trace
+    import numpy
+    return numpy.load(path, mmap_mode="r")
@@ -0,0 +1,111 @@
+import bisect
+
+
+# Ridership that varies with the hour of the day, the day of the week and the
+# month, for trash arrivals as a non-homogeneous Poisson process.
+#
+# A RidershipProfile is a multiplier of the average trash arrival rate for every
+# hour of the year, the product of an hourly, a weekly and a monthly profile,
+# scaled so the multipliers average one and the annual ridership stays the same.
+# The year is 365 days and starts on a Monday at midnight, and the profile repeats
+# every year.
+#
+# Arrivals are generated by inverting the cumulative intensity. The station keeps
+# a clock that runs at the average rate, so its arrivals are the constant-rate
+# ones (and come from the same random number streams), and time_at maps clock
+# readings back to minutes through the table of the cumulative multiplier at the
+# start of every hour. Arrivals come in time order, so time_at usually finds the
+# hour by stepping from the hour of the last call, and otherwise by bisection.
+#
+# Results by time bucket index the hour of the year with bucket_indices: "hour" is
+# the hour of the day (24 buckets), "weekday" the day of the week (7, Monday
+# first) and "month" the month (12).
+MINUTES_PER_YEAR = 525600
+HOURS_PER_YEAR = 8760
+
+DAYS_PER_MONTH = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+
+BUCKETS = {"hour": 24, "weekday": 7, "month": 12}
+
+# illustrative shapes of subway ridership: morning and evening rush hours, quiet
+# nights, weekends at about two thirds and half of a weekday, and a summer dip
+SUBWAY_HOURLY = [0.15, 0.08, 0.05, 0.05, 0.12, 0.4, 1.1, 2.1, 2.4, 1.6, 1.05, 1.0,
+                 1.05, 1.05, 1.15, 1.45, 1.9, 2.2, 1.7, 1.15, 0.85, 0.7, 0.55, 0.35]
+SUBWAY_WEEKLY = [1.0, 1.05, 1.05, 1.05, 1.0, 0.65, 0.5]
+SUBWAY_MONTHLY = [0.95, 0.97, 1.02, 1.02, 1.03, 1.0, 0.94, 0.93, 1.02, 1.06, 1.02, 0.98]
+
+
+def month_of_day():
+    # month of every day of the year
+    months = []
+    for month in range(12):
+        months = months + [month] * DAYS_PER_MONTH[month]
+    return months
+
+
+class RidershipProfile:
+
+    def __init__(self, hourly=None, weekly=None, monthly=None):
+        self.hourly = [1.0] * 24 if hourly is None else list(hourly)
+        self.weekly = [1.0] * 7 if weekly is None else list(weekly)
+        self.monthly = [1.0] * 12 if monthly is None else list(monthly)
+        if len(self.hourly) != 24 or len(self.weekly) != 7 or len(self.monthly) != 12:
+            raise ValueError("MUST PROVIDE 24 HOURLY, 7 WEEKLY AND 12 MONTHLY VALUES")
+        months = month_of_day()
+        multipliers = []
+        for hour in range(HOURS_PER_YEAR):
+            day = hour // 24
+            multipliers.append(self.hourly[hour % 24] * self.weekly[day % 7] * self.monthly[months[day]])
+        mean = sum(multipliers) / HOURS_PER_YEAR
+        if mean <= 0.0 or min(multipliers) < 0.0:
+            raise ValueError("RIDERSHIP PROFILE MUST BE NONNEGATIVE AND NOT ALL ZERO")
+        # rate multiplier of every hour of the year, averaging one
+        self.multipliers = [multiplier / mean for multiplier in multipliers]
+        # clock reading at the start of every hour, and at the end of the year
+        self.clock_table = [0.0]
+        for multiplier in self.multipliers:
+            self.clock_table.append(self.clock_table[-1] + 60.0 * multiplier)
+        self.year_clock = self.clock_table[-1]
+        # so the search for the hour always stops
+        self.clock_table.append(float("inf"))
+        # hour of the last time_at
+        self.hour = 0
+
+    def multiplier(self, time):
+        # rate multiplier at time (minutes)
+        return self.multipliers[int(time // 60) % HOURS_PER_YEAR]
+
+    def time_at(self, clock):
+        # the minute at which the cumulative intensity reaches clock
+        year = 0
+        if clock >= self.year_clock:
+            year = int(clock // self.year_clock)
+            clock = clock - year * self.year_clock
+        table = self.clock_table
+        hour = self.hour
+        if clock < table[hour]:
+            hour = bisect.bisect_right(table, clock) - 1
+        # hours with no ridership take no clock time and are stepped over
+        while clock >= table[hour + 1]:
+            hour = hour + 1
+        self.hour = hour
+        return year * MINUTES_PER_YEAR + hour * 60 + (clock - table[hour]) / self.multipliers[hour]
+
+    def cache_parameters(self):
+        return {"hourly": self.hourly, "weekly": self.weekly, "monthly": self.monthly}
+
+
+def bucket_indices(bucket):
+    # bucket of every hour of the year
+    if bucket == "hour":
+        return [hour % 24 for hour in range(HOURS_PER_YEAR)]
+    if bucket == "weekday":
+        return [(hour // 24) % 7 for hour in range(HOURS_PER_YEAR)]
+    if bucket == "month":
+        months = month_of_day()
+        return [months[hour // 24] for hour in range(HOURS_PER_YEAR)]
+    raise ValueError("UNKNOWN BUCKET " + str(bucket))
+
+
+def subway_profile():
+    return RidershipProfile(SUBWAY_HOURLY, SUBWAY_WEEKLY, SUBWAY_MONTHLY)
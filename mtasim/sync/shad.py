@@ -212,83 +212,84 @@ class Station:
                 print("FIRE ALT")
                 self.clean_alt(True)
 
-print("Starting")
-# s1 = Station(40000000, 2, 6000, 30240)
-# s1 = Station(200000, 1, 6000, 30240)
-# s1 = Station(20000000, 1, 10000, 60000)
-s1 = Station(20000000, 1, 5700, 30240)
-# s1 = Station(40000000, 1, 6000, 60000)
-num_reps = 50
-
-fires_baseline = []
-fires_alt = []
-cleanings_baseline = []
-cleanings_alt = []
-maintenance_cost_baseline = []
-maintenance_cost_alt = []
-
-
-#currently being used to calculate confidence intervals for number of fires
-#can be edited or appended to later to account for cleanings, maintenance etc
-sample_average_baseline = 0.0
-sample_deviation_baseline = 0.0
-sample_average_alt = 0.0
-sample_deviation_alt = 0.0
-Z = 1.96 #z-value for interval formula
-
-
-for i in range(num_reps):
-    s1.simulate(525600)
-    s1.print_year_simulation_summary()
-    fires_baseline.append(s1.num_fires_baseline)
-    print("BASELINE SAMPLE AVERAGE OF FIRES AFTER " + str(i+1) + " RUNS " + str(sum(fires_baseline)/(i+1)))
-    if (len(fires_baseline) >2):
-        print("SAMPLE DEVIATION OF FIRES AFTER " + str(i+1)+ " RUNS " + str(statistics.stdev(fires_baseline)))
-        base_interval = Z*(statistics.stdev(fires_baseline)/math.sqrt(i+1))
-        print("We can say with 95% confidence that the population mean of fires lies between " + str(sum(fires_baseline)/(i+1) - base_interval) + " and " + str(sum(fires_baseline)/(i+1) + base_interval))
-    fires_alt.append(s1.num_fires_alt)
-    print("ALT SAMPLE AVERAGE OF FIRES AFTER " + str(i+1) + " RUNS " + str(sum(fires_alt)/(i+1)))
-    if (len(fires_alt) >2):
-        print("SAMPLE DEVIATION OF FIRES AFTER " + str(i+1)+ " RUNS " + str(statistics.stdev(fires_alt)))
-        alt_interval = Z*(statistics.stdev(fires_alt)/math.sqrt(i+1))
-        print("We can say with 95% confidence that the population mean of fires lies between " + str(sum(fires_alt)/(i+1) - alt_interval) + " and " + str(sum(fires_alt)/(i+1) + alt_interval))
-    cleanings_baseline.append(s1.num_cleanings_baseline)
-    cleanings_alt.append(s1.num_cleanings_alt)
-    maintenance_cost_baseline.append(s1.total_maintenance_cost_baseline)
-    maintenance_cost_alt.append(s1.total_maintenance_cost_alt)
-
-print("\nFires baseline")
-print(fires_baseline)
-print(sum(fires_baseline)/len(fires_baseline))
-print(statistics.stdev(fires_baseline))
-
-print("\nFires alt")
-print(fires_alt)
-print(sum(fires_alt)/len(fires_alt))
-print(statistics.stdev(fires_alt))
-
-
-
-
-print("\nCleanings baseline")
-print(cleanings_baseline)
-print(sum(cleanings_baseline)/len(cleanings_baseline))
-print(statistics.stdev(cleanings_baseline))
-
-print("\nCleanings alt")
-print(cleanings_alt)
-print(sum(cleanings_alt)/len(cleanings_alt))
-print(statistics.stdev(cleanings_alt))
-
-print("\nMaintenance baseline")
-print(maintenance_cost_baseline)
-print(sum(maintenance_cost_baseline)/len(maintenance_cost_baseline))
-print(statistics.stdev(maintenance_cost_baseline))
-
-print("\nMaintenance alt")
-print(maintenance_cost_alt)
-print(sum(maintenance_cost_alt)/len(maintenance_cost_alt))
-print(statistics.stdev(maintenance_cost_alt))
+if __name__ == "__main__":
+    print("Starting")
+    # s1 = Station(40000000, 2, 6000, 30240)
+    # s1 = Station(200000, 1, 6000, 30240)
+    # s1 = Station(20000000, 1, 10000, 60000)
+    s1 = Station(20000000, 1, 5700, 30240)
+    # s1 = Station(40000000, 1, 6000, 60000)
+    num_reps = 50
+
+    fires_baseline = []
+    fires_alt = []
+    cleanings_baseline = []
+    cleanings_alt = []
+    maintenance_cost_baseline = []
+    maintenance_cost_alt = []
+
+
+    #currently being used to calculate confidence intervals for number of fires
+    #can be edited or appended to later to account for cleanings, maintenance etc
+    sample_average_baseline = 0.0
+    sample_deviation_baseline = 0.0
+    sample_average_alt = 0.0
+    sample_deviation_alt = 0.0
+    Z = 1.96 #z-value for interval formula
+
+
+    for i in range(num_reps):
+        s1.simulate(525600)
+        s1.print_year_simulation_summary()
+        fires_baseline.append(s1.num_fires_baseline)
+        print("BASELINE SAMPLE AVERAGE OF FIRES AFTER " + str(i+1) + " RUNS " + str(sum(fires_baseline)/(i+1)))
+        if (len(fires_baseline) >2):
+            print("SAMPLE DEVIATION OF FIRES AFTER " + str(i+1)+ " RUNS " + str(statistics.stdev(fires_baseline)))
+            base_interval = Z*(statistics.stdev(fires_baseline)/math.sqrt(i+1))
+            print("We can say with 95% confidence that the population mean of fires lies between " + str(sum(fires_baseline)/(i+1) - base_interval) + " and " + str(sum(fires_baseline)/(i+1) + base_interval))
+        fires_alt.append(s1.num_fires_alt)
+        print("ALT SAMPLE AVERAGE OF FIRES AFTER " + str(i+1) + " RUNS " + str(sum(fires_alt)/(i+1)))
+        if (len(fires_alt) >2):
+            print("SAMPLE DEVIATION OF FIRES AFTER " + str(i+1)+ " RUNS " + str(statistics.stdev(fires_alt)))
+            alt_interval = Z*(statistics.stdev(fires_alt)/math.sqrt(i+1))
+            print("We can say with 95% confidence that the population mean of fires lies between " + str(sum(fires_alt)/(i+1) - alt_interval) + " and " + str(sum(fires_alt)/(i+1) + alt_interval))
+        cleanings_baseline.append(s1.num_cleanings_baseline)
+        cleanings_alt.append(s1.num_cleanings_alt)
+        maintenance_cost_baseline.append(s1.total_maintenance_cost_baseline)
+        maintenance_cost_alt.append(s1.total_maintenance_cost_alt)
+
+    print("\nFires baseline")
+    print(fires_baseline)
+    print(sum(fires_baseline)/len(fires_baseline))
+    print(statistics.stdev(fires_baseline))
+
+    print("\nFires alt")
+    print(fires_alt)
+    print(sum(fires_alt)/len(fires_alt))
+    print(statistics.stdev(fires_alt))
+
+
+
+
+    print("\nCleanings baseline")
+    print(cleanings_baseline)
+    print(sum(cleanings_baseline)/len(cleanings_baseline))
+    print(statistics.stdev(cleanings_baseline))
+
+    print("\nCleanings alt")
+    print(cleanings_alt)
+    print(sum(cleanings_alt)/len(cleanings_alt))
+    print(statistics.stdev(cleanings_alt))
+
+    print("\nMaintenance baseline")
+    print(maintenance_cost_baseline)
+    print(sum(maintenance_cost_baseline)/len(maintenance_cost_baseline))
+    print(statistics.stdev(maintenance_cost_baseline))
+
+    print("\nMaintenance alt")
+    print(maintenance_cost_alt)
+    print(sum(maintenance_cost_alt)/len(maintenance_cost_alt))
+    print(statistics.stdev(maintenance_cost_alt))
 
 
 
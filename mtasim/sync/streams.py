@@ -0,0 +1,206 @@
+import math
+import zlib
+
+
+# Named random number streams for running several policies on common random
+# numbers.
+#
+# A stream is a sequence of draws indexed by position. Draw k of stream name lives
+# in block k // block_size, and every block is generated on its own from a
+# RandomState seeded with (seed, rep, crc32(name), key, block). So any draw can be
+# reproduced from its position alone and no two streams share random numbers.
+# Each policy reads a stream through its own StreamCursor: in a common stream every
+# policy gets the same k-th draw, and in a per-policy stream the policy index goes
+# into the seed, so the policies get independent draws.
+#
+# Streams keep only their last few blocks. A cursor that falls further behind
+# regenerates the block it needs, which gives the same values again, so memory
+# does not grow with how far apart the policies drift.
+#
+# Every draw is made by inversion from one uniform (see UniformRandomState), so
+# seeding with antithetic=True replays the same streams with 1 - U in place of
+# every U.
+#
+# numpy is imported where it is used, when the first block is generated, so that
+# importing the simulations stays cheap.
+class RandomStream:
+
+    def __init__(self, streams, name, generate, block_size, common, max_blocks):
+        self.streams = streams
+        self.name = name
+        self.name_key = zlib.crc32(name.encode("utf-8"))
+        # generate(numpy_random, size) returns size draws
+        self.generate = generate
+        self.block_size = block_size
+        self.common = common
+        self.max_blocks = max_blocks
+        # (key, block index) -> list of draws, oldest first
+        self.blocks = {}
+
+    def clear(self):
+        self.blocks = {}
+
+    def block(self, key, block_index):
+        values = self.blocks.get((key, block_index))
+        if values is None:
+            import numpy
+            numpy_random = UniformRandomState(numpy.random.RandomState([self.streams.seed_value, self.streams.rep,
+                                                                        self.name_key, key, block_index]),
+                                              self.streams.antithetic)
+            # plain Python floats, which are much cheaper to do arithmetic on than numpy scalars
+            values = numpy.asarray(self.generate(numpy_random, self.block_size)).tolist()
+            if len(self.blocks) >= self.max_blocks:
+                del self.blocks[next(iter(self.blocks))]
+            self.blocks[(key, block_index)] = values
+        return values
+
+    def draw(self, position, policy=0):
+        key = 0 if self.common else policy
+        return self.block(key, position // self.block_size)[position % self.block_size]
+
+
+# The subset of numpy.random.RandomState the stream generators use, with every
+# variate computed by inversion from a single uniform so that antithetic=True
+# mirrors all of them at once.
+class UniformRandomState:
+
+    # lambda -> (first count in the table, cumulative probabilities)
+    poisson_tables = {}
+
+    def __init__(self, numpy_random, antithetic=False):
+        self.numpy_random = numpy_random
+        self.antithetic = antithetic
+
+    def random_sample(self, size=None):
+        u = self.numpy_random.random_sample(size)
+        if self.antithetic:
+            return 1.0 - u
+        return u
+
+    def exponential(self, scale=1.0, size=None):
+        import numpy
+        return -scale * numpy.log1p(-self.random_sample(size))
+
+    def standard_normal(self, size=None):
+        return inverse_normal_cdf(self.random_sample(size))
+
+    def poisson(self, lam=1.0, size=None):
+        import numpy
+        lam = numpy.asarray(lam, dtype=numpy.float64)
+        if size is None:
+            size = lam.shape
+        u = self.random_sample(size)
+        lam = numpy.broadcast_to(lam, u.shape)
+        counts = numpy.zeros(u.shape, dtype=numpy.int64)
+        for value in numpy.unique(lam):
+            where = lam == value
+            start, cdf = self.poisson_table(float(value))
+            counts[where] = start + numpy.minimum(numpy.searchsorted(cdf, u[where], side="right"), len(cdf) - 1)
+        return counts
+
+    def poisson_table(self, lam):
+        table = self.poisson_tables.get(lam)
+        if table is None:
+            import numpy
+            if len(self.poisson_tables) >= 1024:
+                self.poisson_tables.clear()
+            # everything more than 12 standard deviations from the mean has
+            # probability below 1e-30 and is left out
+            spread = 12.0 * math.sqrt(lam) + 10
+            start = max(0, int(lam - spread))
+            stop = int(lam + spread) + 1
+            if lam == 0.0:
+                log_pmf = [0.0]
+            else:
+                log_pmf = [k * math.log(lam) - lam - math.lgamma(k + 1) for k in range(start, stop)]
+            cdf = numpy.cumsum(numpy.exp(log_pmf))
+            table = (start, cdf / cdf[-1])
+            self.poisson_tables[lam] = table
+        return table
+
+
+def inverse_normal_cdf(u):
+    # Acklam's rational approximation, relative error below 1.2e-9
+    import numpy
+    a = [-3.969683028665376e+01, 2.209460984245205e+02, -2.759285104469687e+02,
+         1.383577518672690e+02, -3.066479806614716e+01, 2.506628277459239e+00]
+    b = [-5.447609879822406e+01, 1.615858368580409e+02, -1.556989798598866e+02,
+         6.680131188771972e+01, -1.328068155288572e+01]
+    c = [-7.784894002430293e-03, -3.223964580411365e-01, -2.400758277161838e+00,
+         -2.549732539343734e+00, 4.374664141464968e+00, 2.938163982698783e+00]
+    d = [7.784695709041462e-03, 3.224671290700398e-01, 2.445134137142996e+00, 3.754408661907416e+00]
+    u = numpy.clip(numpy.asarray(u, dtype=numpy.float64), 1e-300, 1.0 - 1e-16)
+    low = 0.02425
+    # central region, then both tails (the upper tail by symmetry)
+    q = u - 0.5
+    r = q * q
+    z = ((((((a[0] * r + a[1]) * r + a[2]) * r + a[3]) * r + a[4]) * r + a[5]) * q /
+         (((((b[0] * r + b[1]) * r + b[2]) * r + b[3]) * r + b[4]) * r + 1))
+    tail = numpy.minimum(u, 1.0 - u)
+    in_tail = tail < low
+    if numpy.any(in_tail):
+        t = numpy.sqrt(-2.0 * numpy.log(tail[in_tail]))
+        x = ((((((c[0] * t + c[1]) * t + c[2]) * t + c[3]) * t + c[4]) * t + c[5]) /
+             ((((d[0] * t + d[1]) * t + d[2]) * t + d[3]) * t + 1))
+        z[in_tail] = numpy.where(u[in_tail] < 0.5, x, -x)
+    return z
+
+
+class StreamCursor:
+
+    def __init__(self, stream, policy):
+        self.stream = stream
+        self.policy = policy
+        self.key = 0 if stream.common else policy
+        self.reset()
+
+    def reset(self):
+        self.block_index = -1
+        self.values = []
+        self.offset = 0
+
+    def position(self):
+        # number of draws made so far
+        return max(0, self.block_index * self.stream.block_size + self.offset)
+
+    def next(self):
+        if self.offset == len(self.values):
+            self.block_index = self.block_index + 1
+            self.values = self.stream.block(self.key, self.block_index)
+            self.offset = 0
+        value = self.values[self.offset]
+        self.offset = self.offset + 1
+        return value
+
+
+class RandomStreams:
+
+    def __init__(self, seed_value=0, rep=0, antithetic=False):
+        self.seed_value = seed_value
+        self.rep = rep
+        self.antithetic = antithetic
+        # name -> RandomStream
+        self.streams = {}
+        self.cursors = []
+
+    def add_stream(self, name, generate, block_size=1024, common=True, max_blocks=4):
+        self.streams[name] = RandomStream(self, name, generate, block_size, common, max_blocks)
+        return self.streams[name]
+
+    def cursor(self, name, policy=0):
+        cursor = StreamCursor(self.streams[name], policy)
+        self.cursors.append(cursor)
+        return cursor
+
+    def draw(self, name, position, policy=0):
+        return self.streams[name].draw(position, policy)
+
+    def seed(self, seed_value, rep=0, antithetic=False):
+        # start every stream over from position 0 with new random numbers
+        self.seed_value = seed_value
+        self.rep = rep
+        self.antithetic = antithetic
+        for name in self.streams:
+            self.streams[name].clear()
+        for cursor in self.cursors:
+            cursor.reset()
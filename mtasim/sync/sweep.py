@@ -0,0 +1,134 @@
+import concurrent.futures
+import csv
+import itertools
+from mtasim.sync import syncprod
+from mtasim.sync.accumulators import MetricAccumulators
+from mtasim.sync.cache import replication_key
+
+
+# Parameter sweeps of syncprod.Station across a process pool.
+#
+# A grid maps parameter names to a value or a list of values, and every
+# combination is one grid point, e.g.
+#     run_sweep({"annual_ridership": 25000000, "num_track_beds": 1,
+#                "trash_threshold": [1500, 2000, 2500], "cleaning_rate": [20160, 26280, 30240]}, 200)
+# Replication rep of every grid point is seeded with the same (seed, rep), and all
+# draws are made by inversion from the same streams, so neighbouring grid points
+# see common random numbers and their differences are not swamped by noise.
+#
+# The result is a tidy table: one row (a dict) per grid point with its parameters
+# and the mean, standard deviation and confidence interval of every metric.
+PARAMETERS = ["annual_ridership", "num_track_beds", "trash_threshold", "cleaning_rate",
+              "cost_of_track_cleaning_fireless", "cost_of_track_cleaning_fire", "wage_per_minute"]
+
+
+def grid_points(grid):
+    for parameter in grid:
+        if parameter not in PARAMETERS:
+            raise ValueError("UNKNOWN SWEEP PARAMETER " + parameter)
+    for parameter in PARAMETERS[:4]:
+        if parameter not in grid:
+            raise ValueError("MUST PROVIDE " + parameter.upper())
+    names = [parameter for parameter in PARAMETERS if parameter in grid]
+    values = []
+    for name in names:
+        value = grid[name]
+        if isinstance(value, (list, tuple, range)):
+            values.append(list(value))
+        else:
+            values.append([value])
+    points = []
+    for combination in itertools.product(*values):
+        points.append(dict(zip(names, combination)))
+    return points
+
+
+def point_station(point, fire_rate_inflation):
+    s1 = syncprod.Station(point["annual_ridership"], point["num_track_beds"], point["trash_threshold"],
+                          point["cleaning_rate"], verbose=False)
+    for parameter in PARAMETERS[4:]:
+        if parameter in point:
+            setattr(s1, parameter, point[parameter])
+    s1.set_fire_rate_inflation(fire_rate_inflation)
+    return s1
+
+
+def simulate_point(point, seed, reps, end_time, antithetic, fire_rate_inflation):
+    s1 = point_station(point, fire_rate_inflation)
+    results = []
+    for rep in reps:
+        if antithetic:
+            year = syncprod.simulate_antithetic_pair(s1, seed, rep, end_time)
+        else:
+            s1.seed(seed, rep)
+            s1.simulate(end_time)
+            year = s1.year_results()
+        results.append(year)
+    return results
+
+
+# With a cache (a cache.ResultCache) only the replications it does not already hold
+# are simulated, so rerunning or extending a sweep costs just the new points and reps.
+def run_sweep(grid, num_reps, seed=0, num_workers=None, chunk_size=10, end_time=525600, antithetic=False,
+              fire_rate_inflation=1.0, Z=1.96, cache=None):
+    points = grid_points(grid)
+    # years[i] maps replication index to results for grid point i
+    years = []
+    keys = []
+    for point in points:
+        if cache is None:
+            keys.append(None)
+            years.append({})
+        else:
+            s1 = point_station(point, fire_rate_inflation)
+            keys.append(replication_key(s1.cache_parameters(seed, end_time, antithetic)))
+            years.append(cache.get_many(keys[-1], range(num_reps)))
+    with concurrent.futures.ProcessPoolExecutor(max_workers=num_workers) as executor:
+        # (grid point, replications, future) for every chunk still to simulate
+        chunks = []
+        for i in range(len(points)):
+            missing = [rep for rep in range(num_reps) if rep not in years[i]]
+            for start in range(0, len(missing), chunk_size):
+                reps = missing[start:start + chunk_size]
+                chunks.append((i, reps, executor.submit(simulate_point, points[i], seed, reps, end_time,
+                                                        antithetic, fire_rate_inflation)))
+        for i, reps, future in chunks:
+            new_years = {}
+            chunk_results = future.result()
+            for j in range(len(reps)):
+                new_years[reps[j]] = chunk_results[j]
+            if cache is not None:
+                cache.put_many(keys[i], new_years)
+            years[i].update(new_years)
+    rows = []
+    for i in range(len(points)):
+        accumulators = MetricAccumulators(syncprod.METRICS, control="trash_arrivals")
+        for rep in range(num_reps):
+            accumulators.update(years[i][rep])
+        row = dict(points[i])
+        row["reps"] = accumulators.count()
+        for metric in syncprod.METRICS:
+            mean, stddev, ci_plus_minus = accumulators[metric].confidence_interval(Z)
+            row[metric + "_mean"] = mean
+            row[metric + "_stdev"] = stddev
+            row[metric + "_ci"] = ci_plus_minus
+        rows.append(row)
+    return rows
+
+
+def write_table(rows, path):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+
+
+if __name__ == "__main__":
+    print("Starting")
+    rows = run_sweep({"annual_ridership": 25000000, "num_track_beds": 1,
+                      "trash_threshold": [1500, 2150, 2500], "cleaning_rate": [20160, 26280, 30240]}, 100)
+    for row in rows:
+        print(str(row["trash_threshold"]) + " " + str(row["cleaning_rate"]) + ": "
+              + "maintenance baseline " + str(row["maintenance_cost_baseline_mean"])
+              + " alt " + str(row["maintenance_cost_alt_mean"]))
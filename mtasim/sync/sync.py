@@ -318,8 +318,9 @@ def run_simulations(annual_ridership, num_track_beds, trash_threshold, cleaning_
     print(statistics.stdev(maintenance_cost_alt))
 
 
-# run_simulations(20000000, 1, 2500, 30240, "fires", 50)
-run_simulations(20000000, 1, 2500, 30240, "maintenance")
+if __name__ == "__main__":
+    # run_simulations(20000000, 1, 2500, 30240, "fires", 50)
+    run_simulations(20000000, 1, 2500, 30240, "maintenance")
 
 
 
@@ -196,45 +196,46 @@ class Station:
                 print("FIRE ALT")
                 self.clean_alt(True)
 
-print("Starting")
-# s1 = Station(40000000, 2, 6000, 30240)
-# s1 = Station(200000, 1, 6000, 30240)
-# s1 = Station(20000000, 1, 10000, 60000)
-s1 = Station(20000000, 1, 6000, 30240)
-# s1 = Station(40000000, 1, 6000, 60000)
-num_reps = 50
-
-fires_baseline = []
-fires_alt = []
-cleanings_baseline = []
-cleanings_alt = []
-for i in range(num_reps):
-    s1.simulate(525600)
-    s1.print_year_simulation_summary()
-    fires_baseline.append(s1.num_fires_baseline)
-    fires_alt.append(s1.num_fires_alt)
-    cleanings_baseline.append(s1.num_cleanings_baseline)
-    cleanings_alt.append(s1.num_cleanings_alt)
-
-print("\nFires baseline")
-print(fires_baseline)
-print(sum(fires_baseline)/len(fires_baseline))
-print(statistics.stdev(fires_baseline))
-
-print("\nFires alt")
-print(fires_alt)
-print(sum(fires_alt)/len(fires_alt))
-print(statistics.stdev(fires_alt))
-
-print("\nCleanings baseline")
-print(cleanings_baseline)
-print(sum(cleanings_baseline)/len(cleanings_baseline))
-print(statistics.stdev(cleanings_baseline))
-
-print("\nCleanings alt")
-print(cleanings_alt)
-print(sum(cleanings_alt)/len(cleanings_alt))
-print(statistics.stdev(cleanings_alt))
+if __name__ == "__main__":
+    print("Starting")
+    # s1 = Station(40000000, 2, 6000, 30240)
+    # s1 = Station(200000, 1, 6000, 30240)
+    # s1 = Station(20000000, 1, 10000, 60000)
+    s1 = Station(20000000, 1, 6000, 30240)
+    # s1 = Station(40000000, 1, 6000, 60000)
+    num_reps = 50
+
+    fires_baseline = []
+    fires_alt = []
+    cleanings_baseline = []
+    cleanings_alt = []
+    for i in range(num_reps):
+        s1.simulate(525600)
+        s1.print_year_simulation_summary()
+        fires_baseline.append(s1.num_fires_baseline)
+        fires_alt.append(s1.num_fires_alt)
+        cleanings_baseline.append(s1.num_cleanings_baseline)
+        cleanings_alt.append(s1.num_cleanings_alt)
+
+    print("\nFires baseline")
+    print(fires_baseline)
+    print(sum(fires_baseline)/len(fires_baseline))
+    print(statistics.stdev(fires_baseline))
+
+    print("\nFires alt")
+    print(fires_alt)
+    print(sum(fires_alt)/len(fires_alt))
+    print(statistics.stdev(fires_alt))
+
+    print("\nCleanings baseline")
+    print(cleanings_baseline)
+    print(sum(cleanings_baseline)/len(cleanings_baseline))
+    print(statistics.stdev(cleanings_baseline))
+
+    print("\nCleanings alt")
+    print(cleanings_alt)
+    print(sum(cleanings_alt)/len(cleanings_alt))
+    print(statistics.stdev(cleanings_alt))
 
 
 
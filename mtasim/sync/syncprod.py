@@ -1,13 +1,44 @@
 import math
+import os
 import random
-import statistics
 from collections import deque
-import numpy
+from mtasim.eventlist import EventList
+from mtasim.sync.accumulators import MetricAccumulators
+from mtasim.sync import prodloss
+from mtasim.sync.streams import RandomStreams
+from mtasim.sync.cache import replication_key
+from mtasim.sync.checkpoint import save_checkpoint, load_checkpoint
+from mtasim.sync import tracing
+from mtasim.sync import recorder as event_recorder
+from mtasim.sync import profiling
+from mtasim.sync import ridership
+from mtasim import renewal
+
+
+# per-replication values collected by run_simulations, in the order they are reported
+METRICS = ["fires_baseline", "fires_alt", "cleanings_baseline", "scheduled_cleanings", "cleanings_alt",
+           "threshold_cleanings", "maintenance_cost_baseline", "maintenance_cost_alt",
+           "productivity_loss_baseline", "productivity_loss_alt", "trash_arrivals",
+           "likelihood_ratio_baseline", "likelihood_ratio_alt"]
+
+# bump whenever a change to the model or its random number streams changes the
+# results of a seeded replication; cached results of older versions are ignored
+ENGINE_VERSION = 1
+
+# metrics of each sim, weighted by that sim's likelihood ratio under importance sampling
+BASELINE_METRICS = ["fires_baseline", "cleanings_baseline", "scheduled_cleanings", "maintenance_cost_baseline",
+                    "productivity_loss_baseline"]
+ALT_METRICS = ["fires_alt", "cleanings_alt", "threshold_cleanings", "maintenance_cost_alt", "productivity_loss_alt"]
+
+# metrics that year_bucket_results breaks down by time bucket
+BUCKET_METRICS = ["fires_baseline", "fires_alt", "cleanings_baseline", "cleanings_alt", "maintenance_cost_baseline",
+                  "maintenance_cost_alt", "productivity_loss_baseline", "productivity_loss_alt", "trash_arrivals"]
 
 
 class Station:
 
-    def __init__(self, annual_ridership, num_track_beds, trash_threshold, cleaning_rate):
+    def __init__(self, annual_ridership, num_track_beds, trash_threshold, cleaning_rate, verbose=True, tracer=None,
+                 recorder=None, profiler=None, ridership_profile=None, bucket=None):
         # SHARED
         self.annual_ridership = annual_ridership
         self.num_track_beds = num_track_beds
@@ -17,7 +48,6 @@ class Station:
 
         # SPECIFIC: baseline sim
         self.cleaning_rate = cleaning_rate
-        self.next_scheduled_cleaning = 0.0
 
         # SHARED
         # (1.0/100000000) chosen to yield rate of approximately 1/5
@@ -29,14 +59,62 @@ class Station:
         self.trash_arrival_rate = self.trash_arrival_rate_scalar * self.riders_per_minute_per_track
         # Choose fire_arrival_rate_scalar to yield approximately two fires per year at the busiest stations
         self.fire_arrival_rate_scalar = 1.0/100000000
+        # Importance sampling for rare fires: each sim samples its fires at
+        # fire_rate_inflation times their real rate and weights its year by its
+        # likelihood ratio, which needs the integral of aggregate trash over time
+        # (the fire exposure). See set_fire_rate_inflation.
+        self.fire_rate_inflation_baseline = 1.0
+        self.fire_rate_inflation_alt = 1.0
+        self.fire_exposure_baseline = 0.0
+        self.fire_exposure_alt = 0.0
 
         # SHARED
         self.next_fire_arrival_uniform = 0.0
-        self.next_trash_arrival = 0.0
+        # future event list; ties go to trash, then scheduled cleaning, then baseline fire, then alt fire
+        self.events = EventList({"trash": 0, "scheduled_cleaning": 1, "fire_baseline": 2, "fire_alt": 3})
+        self.handlers = {"trash": self.handle_trash_arrival,
+                         "scheduled_cleaning": self.handle_scheduled_cleaning,
+                         "fire_baseline": self.handle_fire_baseline,
+                         "fire_alt": self.handle_fire_alt}
+
+        # SHARED
+        # random number streams, shared by both sims; until seed() is called each
+        # year gets a fresh random seed
+        self.seed_value = None
+        self.rep = 0
+        # replay the streams with 1 - U for every uniform U
+        self.antithetic = False
+        self.streams = RandomStreams()
+        self.streams.add_stream("trash", self.generate_trash_interarrivals)
+        self.streams.add_stream("fire", self.generate_fire_uniforms)
+        self.streams.add_stream("prod_loss_nofire", self.generate_nofire_prod_losses, block_size=64)
+        self.streams.add_stream("prod_loss_fire", self.generate_fire_prod_losses, block_size=16)
+        self.trash_interarrivals = self.streams.cursor("trash")
+        self.fire_uniforms = self.streams.cursor("fire")
+        # trace every cleaning, fire and productivity loss increment (see tracing.py);
+        # verbose=False without a tracer traces nothing
+        if tracer is None:
+            tracer = tracing.Tracer(tracing.DETAIL if verbose else tracing.SILENT)
+        self.tracer = tracer
+        # optional recorder.Recorder that keeps a binary trace of every event of every year
+        self.recorder = recorder
+        # optional ridership.RidershipProfile: trash arrivals follow it as a non-homogeneous
+        # Poisson process, read off a clock that runs at the average trash arrival rate
+        # (see ridership.py), and productivity losses scale with the ridership of the hour
+        self.ridership_profile = ridership_profile
+        self.trash_clock = 0.0
+        # optional "hour", "weekday" or "month": year_bucket_results breaks the year's
+        # results down by that time bucket
+        self.bucket = bucket
+        self.bucket_indices = None if bucket is None else ridership.bucket_indices(bucket)
+        self.bucket_results = {}
 
         # SHARED
         # Units: minutes
         self.time = 0.0
+        self.end_time = 0.0
+        # trash arrivals before end_time; Poisson with mean trash_arrival_rate * end_time
+        self.num_trash_arrivals = 0
 
         # Shared
         self.maintenance_delay = 0.0
@@ -47,10 +125,11 @@ class Station:
         self.wage_per_minute = 0.56667  # dollars - equivalent to $34/hr
         self.minutes_per_cleaning = 90
         self.minutes_per_fire_repair = 270
-        self.pl_nofire_baseline = []
-        self.pl_nofire_alt = []
-        self.pl_fire_baseline = []
-        self.pl_fire_alt = []
+        # the k-th cleaning (or fire repair) of each sim costs the k-th productivity loss draw
+        self.pl_nofire_baseline = self.streams.cursor("prod_loss_nofire", 0)
+        self.pl_nofire_alt = self.streams.cursor("prod_loss_nofire", 1)
+        self.pl_fire_baseline = self.streams.cursor("prod_loss_fire", 0)
+        self.pl_fire_alt = self.streams.cursor("prod_loss_fire", 1)
         ######## /Productivity Loss
 
         # SPECIFIC: baseline sim
@@ -58,7 +137,6 @@ class Station:
         self.num_cleanings_baseline = 0
         self.num_scheduled_cleanings = 0
         self.num_fires_baseline = 0
-        self.next_fire_arrival_baseline = 0.0
         self.fire_arrival_rate_baseline = 0.0
         self.total_maintenance_cost_baseline = 0.0
         self.total_productivity_loss_baseline = 0.0
@@ -68,14 +146,24 @@ class Station:
         self.num_cleanings_alt = 0
         self.num_threshold_cleanings = 0
         self.num_fires_alt = 0
-        self.next_fire_arrival_alt = 0.0
         self.fire_arrival_rate_alt = 0.0
         self.total_maintenance_cost_alt = 0.0
         self.total_productivity_loss_alt = 0.0
 
+        # optional profiling.Profiler, or the one of an enclosing profiling block;
+        # it wraps this station's handlers and streams, so without one nothing changes
+        if profiler is None:
+            profiler = profiling.active
+        self.profiler = profiler
+        if profiler is not None:
+            profiler.attach(self)
+
     def initialize_simulation(self):
         # initialize time
         self.time = 0.0
+        self.num_trash_arrivals = 0
+        self.fire_exposure_baseline = 0.0
+        self.fire_exposure_alt = 0.0
 
         # initialize values for baseline sim
         self.aggregate_trash_baseline = 0
@@ -93,29 +181,38 @@ class Station:
         self.total_maintenance_cost_alt = 0.0
         self.total_productivity_loss_alt = 0.0
 
-        ######## Productivity Loss
-        self.pl_nofire_baseline = []
-        self.pl_nofire_alt = []
-        self.pl_fire_baseline = []
-        self.pl_fire_alt = []
-        ######## /Productivity Loss
+        # start the random number streams over
+        if self.seed_value is None:
+            self.streams.seed(random.getrandbits(32), 0)
+        else:
+            self.streams.seed(self.seed_value, self.rep, self.antithetic)
+            self.rep = self.rep + 1
+        if self.recorder is not None:
+            self.recorder.open(self.streams.seed_value, self.streams.rep, self.streams.antithetic)
 
         # to be used for fire_arrivals
         self.next_fire_arrival_uniform = 0.0
-        # initialize residual clocks
-        self.next_trash_arrival = random.expovariate(self.trash_arrival_rate)
-        self.next_fire_arrival_baseline = math.inf
-        self.next_fire_arrival_alt = math.inf
-        self.next_scheduled_cleaning = self.cleaning_rate
+        # initialize future event list
+        self.events.clear()
+        if self.ridership_profile is None:
+            self.events.schedule("trash", self.trash_interarrivals.next())
+        else:
+            self.trash_clock = self.trash_interarrivals.next()
+            self.ridership_profile.hour = 0
+            self.events.schedule("trash", self.ridership_profile.time_at(self.trash_clock))
+        self.events.schedule("scheduled_cleaning", self.cleaning_rate)
+        if self.bucket is not None:
+            for metric in BUCKET_METRICS:
+                self.bucket_results[metric] = [0] * ridership.BUCKETS[self.bucket]
 
     def print_state(self):
         # TODO: Add alt stuff
         print("--------------------------------")
         print("Current Time: " + str(self.time))
         print("Aggregate Trash: " + str(self.aggregate_trash_baseline))
-        print("Time until next trash: " + str(self.next_trash_arrival))
-        print("Time until next cleaning: " + str(self.next_scheduled_cleaning))
-        print("Time until next fire: " + str(self.next_fire_arrival_baseline))
+        print("Time until next trash: " + str(self.events.time_of("trash") - self.time))
+        print("Time until next cleaning: " + str(self.events.time_of("scheduled_cleaning") - self.time))
+        print("Time until next fire: " + str(self.events.time_of("fire_baseline") - self.time))
         print("\nFire arrival rate: " + str(self.fire_arrival_rate_baseline))
         print("\nNumber of cleanings to date:" + str(self.num_cleanings_baseline))
         print("Number of scheduled cleanings to date:" + str(self.num_scheduled_cleanings))
@@ -133,69 +230,193 @@ class Station:
         print("Alt: Number of threshold cleanings to date:" + str(self.num_threshold_cleanings))
         print("Alt: Number of fires to date:" + str(self.num_fires_alt))
         print("Alt: Total Maintenance Cost:" + str(self.total_maintenance_cost_alt))
+        if self.fire_rate_inflation_baseline != 1.0:
+            print("Baseline: Likelihood ratio:" + str(self.likelihood_ratio(self.fire_rate_inflation_baseline, self.num_fires_baseline, self.fire_exposure_baseline)))
+        if self.fire_rate_inflation_alt != 1.0:
+            print("Alt: Likelihood ratio:" + str(self.likelihood_ratio(self.fire_rate_inflation_alt, self.num_fires_alt, self.fire_exposure_alt)))
         print("--------------------------------")
 
+    def seed(self, seed, rep, antithetic=False):
+        # give replication rep of a run its own deterministic random number streams;
+        # later years without another seed() call go on to rep + 1, rep + 2, ...
+        self.seed_value = seed
+        self.rep = rep
+        self.antithetic = antithetic
+
+    def expected_fires_per_year(self, cycle_length):
+        # rough number of fires in a year of cleaning cycles of cycle_length minutes,
+        # when fires are rare enough to hardly ever cut a cycle short
+        cycle_length = min(cycle_length, 525600)
+        return self.fire_arrival_rate_scalar * self.trash_arrival_rate * cycle_length * 525600 / 2.0
+
+    def set_fire_rate_inflation(self, fire_rate_inflation):
+        # a number inflates both sims' fire rates by that factor; "auto" inflates
+        # each sim just enough to expect about one fire a year, and leaves sims that
+        # already have that many alone
+        if fire_rate_inflation == "auto":
+            baseline_fires = self.expected_fires_per_year(self.cleaning_rate)
+            alt_fires = self.expected_fires_per_year(self.trash_threshold / self.trash_arrival_rate)
+            self.fire_rate_inflation_baseline = max(1.0, 1.0 / baseline_fires)
+            self.fire_rate_inflation_alt = max(1.0, 1.0 / alt_fires)
+        else:
+            self.fire_rate_inflation_baseline = fire_rate_inflation
+            self.fire_rate_inflation_alt = fire_rate_inflation
+
+    def cache_parameters(self, seed, end_time, antithetic=False):
+        # everything that decides the results of replications run with seed
+        parameters = {"engine_version": ENGINE_VERSION,
+                "annual_ridership": self.annual_ridership,
+                "num_track_beds": self.num_track_beds,
+                "trash_threshold": self.trash_threshold,
+                "cleaning_rate": self.cleaning_rate,
+                "cost_of_track_cleaning_fireless": self.cost_of_track_cleaning_fireless,
+                "cost_of_track_cleaning_fire": self.cost_of_track_cleaning_fire,
+                "wage_per_minute": self.wage_per_minute,
+                "minutes_per_cleaning": self.minutes_per_cleaning,
+                "minutes_per_fire_repair": self.minutes_per_fire_repair,
+                "fire_rate_inflation_baseline": self.fire_rate_inflation_baseline,
+                "fire_rate_inflation_alt": self.fire_rate_inflation_alt,
+                "end_time": end_time,
+                "seed": seed,
+                "antithetic": antithetic}
+        if self.ridership_profile is not None:
+            parameters["ridership_profile"] = self.ridership_profile.cache_parameters()
+        return parameters
+
+    def likelihood_ratio(self, fire_rate_inflation, num_fires, fire_exposure):
+        # probability of the simulated fires at the real fire rate over their probability
+        # at the inflated rate
+        if fire_rate_inflation == 1.0:
+            return 1.0
+        return math.exp((fire_rate_inflation - 1.0) * self.fire_arrival_rate_scalar * fire_exposure
+                        - num_fires * math.log(fire_rate_inflation))
+
+    def year_results(self):
+        results = self.unweighted_year_results()
+        if self.fire_rate_inflation_baseline != 1.0:
+            for metric in BASELINE_METRICS:
+                results[metric] = results[metric] * results["likelihood_ratio_baseline"]
+        if self.fire_rate_inflation_alt != 1.0:
+            for metric in ALT_METRICS:
+                results[metric] = results[metric] * results["likelihood_ratio_alt"]
+        return results
+
+    def unweighted_year_results(self):
+        return {"fires_baseline": self.num_fires_baseline,
+                "fires_alt": self.num_fires_alt,
+                "cleanings_baseline": self.num_cleanings_baseline,
+                "scheduled_cleanings": self.num_scheduled_cleanings,
+                "cleanings_alt": self.num_cleanings_alt,
+                "threshold_cleanings": self.num_threshold_cleanings,
+                "maintenance_cost_baseline": self.total_maintenance_cost_baseline,
+                "maintenance_cost_alt": self.total_maintenance_cost_alt,
+                "productivity_loss_baseline": self.total_productivity_loss_baseline,
+                "productivity_loss_alt": self.total_productivity_loss_alt,
+                "trash_arrivals": self.num_trash_arrivals,
+                "likelihood_ratio_baseline": self.likelihood_ratio(self.fire_rate_inflation_baseline,
+                                                                   self.num_fires_baseline, self.fire_exposure_baseline),
+                "likelihood_ratio_alt": self.likelihood_ratio(self.fire_rate_inflation_alt,
+                                                              self.num_fires_alt, self.fire_exposure_alt)}
+
+    def year_bucket_results(self):
+        # metric -> its total in every time bucket of the year
+        return self.bucket_results
+
+    def add_to_bucket(self, metric, amount):
+        bucket = self.bucket_indices[int(self.time // 60) % ridership.HOURS_PER_YEAR]
+        self.bucket_results[metric][bucket] = self.bucket_results[metric][bucket] + amount
+
+    def expected_year_results(self, end_time=525600):
+        # expected value of every metric of year_results, from renewal theory (see
+        # renewal.py) instead of simulation; a fast screen of policies, and a check
+        # on the simulation. Importance sampling does not change the expectations.
+        baseline = renewal.expected_results(self.trash_arrival_rate, self.fire_arrival_rate_scalar, self.trash_threshold,
+                                            self.cleaning_rate, end_time, "periodic")
+        alt = renewal.expected_results(self.trash_arrival_rate, self.fire_arrival_rate_scalar, self.trash_threshold,
+                                       self.cleaning_rate, end_time, "threshold")
+        # N ~ Poisson(rate * duration) riders each lose a uniform share of the duration
+        prod_loss_nofire = 0.5 * self.riders_per_minute_per_track * self.wage_per_minute * self.minutes_per_cleaning ** 2
+        prod_loss_fire = 0.5 * self.riders_per_minute_per_track * self.wage_per_minute * self.minutes_per_fire_repair ** 2
+        return {"fires_baseline": baseline["fires"],
+                "fires_alt": alt["fires"],
+                "cleanings_baseline": baseline["cleanings"],
+                "scheduled_cleanings": baseline["scheduled_cleanings"],
+                "cleanings_alt": alt["cleanings"],
+                "threshold_cleanings": alt["threshold_cleanings"],
+                "maintenance_cost_baseline": (baseline["scheduled_cleanings"] * self.cost_of_track_cleaning_fireless
+                                              + baseline["fires"] * self.cost_of_track_cleaning_fire),
+                "maintenance_cost_alt": (alt["threshold_cleanings"] * self.cost_of_track_cleaning_fireless
+                                         + alt["fires"] * self.cost_of_track_cleaning_fire),
+                "productivity_loss_baseline": (baseline["scheduled_cleanings"] * prod_loss_nofire
+                                               + baseline["fires"] * prod_loss_fire),
+                # like clean_alt, every alt cleaning costs a cleaning's loss and a fire a repair's on top
+                "productivity_loss_alt": alt["cleanings"] * prod_loss_nofire + alt["fires"] * prod_loss_fire,
+                "trash_arrivals": self.trash_arrival_rate * end_time,
+                "likelihood_ratio_baseline": 1.0,
+                "likelihood_ratio_alt": 1.0}
+
     def recalculate_next_fire_arrival(self):
         # set fire arrival rate based on aggregate trash
-        self.fire_arrival_rate_baseline = self.fire_arrival_rate_scalar * self.aggregate_trash_baseline
-        self.fire_arrival_rate_alt = self.fire_arrival_rate_scalar * self.aggregate_trash_alt
+        self.fire_arrival_rate_baseline = self.fire_arrival_rate_scalar * self.fire_rate_inflation_baseline * self.aggregate_trash_baseline
+        self.fire_arrival_rate_alt = self.fire_arrival_rate_scalar * self.fire_rate_inflation_alt * self.aggregate_trash_alt
         # generate one uniform random variable that will be used to calc the exponential for both sims
-        self.next_fire_arrival_uniform = numpy.random.uniform(0.0,1.0)
+        self.next_fire_arrival_uniform = self.fire_uniforms.next()
         # set both sims next fire based on the uniform and their respective levels of aggregate trash
         # or set them to infinity if there is no trash in their station
         if self.aggregate_trash_baseline == 0:
-            self.next_fire_arrival_baseline = math.inf
+            self.events.cancel("fire_baseline")
         else:
-            self.next_fire_arrival_baseline = (-1.0 / self.fire_arrival_rate_baseline) * math.log(1 - self.next_fire_arrival_uniform)
+            self.events.schedule("fire_baseline", self.time + (-1.0 / self.fire_arrival_rate_baseline) * math.log(1 - self.next_fire_arrival_uniform))
         if self.aggregate_trash_alt == 0:
-            self.next_fire_arrival_alt = math.inf
+            self.events.cancel("fire_alt")
         else:
-            self.next_fire_arrival_alt = (-1.0 / self.fire_arrival_rate_alt) * math.log(1 - self.next_fire_arrival_uniform)
+            self.events.schedule("fire_alt", self.time + (-1.0 / self.fire_arrival_rate_alt) * math.log(1 - self.next_fire_arrival_uniform))
+
+    def generate_trash_interarrivals(self, numpy_random, size):
+        return numpy_random.exponential(1.0 / self.trash_arrival_rate, size)
+
+    def generate_fire_uniforms(self, numpy_random, size):
+        return numpy_random.random_sample(size)
 
-    def generate_random_prod_loss(self, rate, duration):
-        num_riders = numpy.random.poisson(rate * duration, 1)[0]
-        loss = 0.0
-        for i in range(num_riders):
-            additional = self.wage_per_minute * duration * random.random()
-            loss = loss + additional
-        return loss
+    def generate_nofire_prod_losses(self, numpy_random, size):
+        return prodloss.sample_productivity_loss(self.riders_per_minute_per_track, self.minutes_per_cleaning,
+                                                 self.wage_per_minute, size, numpy_random)
+
+    def generate_fire_prod_losses(self, numpy_random, size):
+        return prodloss.sample_productivity_loss(self.riders_per_minute_per_track, self.minutes_per_fire_repair,
+                                                 self.wage_per_minute, size, numpy_random)
 
     def increase_productivity_loss(self, baseline, fire):
         if baseline:
-            prod_loss = 0.0
             if fire:
-                if len(self.pl_fire_alt) > 0:
-                    prod_loss = self.pl_fire_alt.pop(0)
-                else:
-                    prod_loss = self.generate_random_prod_loss(self.riders_per_minute_per_track, self.minutes_per_fire_repair)
-                    self.pl_fire_baseline.append(prod_loss)
+                prod_loss = self.pl_fire_baseline.next()
             else:
-                if len(self.pl_nofire_alt) > 0:
-                    prod_loss = self.pl_nofire_alt.pop(0)
-                else:
-                    prod_loss = self.generate_random_prod_loss(self.riders_per_minute_per_track, self.minutes_per_cleaning)
-                    self.pl_nofire_baseline.append(prod_loss)
+                prod_loss = self.pl_nofire_baseline.next()
+            if self.ridership_profile is not None:
+                prod_loss = prod_loss * self.ridership_profile.multiplier(self.time)
             self.total_productivity_loss_baseline = self.total_productivity_loss_baseline + prod_loss
-            print("******** Increasing Baseline Prod Loss by: " + str(prod_loss))
+            if self.tracer.active["productivity_loss_baseline"]:
+                self.tracer.emit("productivity_loss_baseline", self.time, amount=prod_loss, fire=fire)
+            if self.bucket is not None:
+                self.add_to_bucket("productivity_loss_baseline", prod_loss)
         else:
-            prod_loss = 0.0
             if fire:
-                if len(self.pl_fire_baseline) > 0:
-                    prod_loss = self.pl_fire_baseline.pop(0)
-                else:
-                    prod_loss = self.generate_random_prod_loss(self.riders_per_minute_per_track, self.minutes_per_fire_repair)
-                    self.pl_fire_alt.append(prod_loss)
+                prod_loss = self.pl_fire_alt.next()
             else:
-                if len(self.pl_nofire_baseline) > 0:
-                    prod_loss = self.pl_nofire_baseline.pop(0)
-                else:
-                    prod_loss = self.generate_random_prod_loss(self.riders_per_minute_per_track, self.minutes_per_cleaning)
-                    self.pl_nofire_alt.append(prod_loss)
+                prod_loss = self.pl_nofire_alt.next()
+            if self.ridership_profile is not None:
+                prod_loss = prod_loss * self.ridership_profile.multiplier(self.time)
             self.total_productivity_loss_alt = self.total_productivity_loss_alt + prod_loss
-            print("******** Increasing Alt Prod Loss by: " + str(prod_loss))
+            if self.tracer.active["productivity_loss_alt"]:
+                self.tracer.emit("productivity_loss_alt", self.time, amount=prod_loss, fire=fire)
+            if self.bucket is not None:
+                self.add_to_bucket("productivity_loss_alt", prod_loss)
 
 
     def clean_baseline(self, fire):
+        if self.recorder is not None:
+            aggregate_trash = self.aggregate_trash_baseline
+            cost = self.total_maintenance_cost_baseline + self.total_productivity_loss_baseline
         self.num_cleanings_baseline = self.num_cleanings_baseline + 1
         self.aggregate_trash_baseline = 0
         # Include some time delay for the cleaning and add to productivity loss
@@ -210,9 +431,21 @@ class Station:
             self.num_scheduled_cleanings = self.num_scheduled_cleanings + 1
             # increment productivity loss
             self.increase_productivity_loss(True, False)
-        self.next_fire_arrival_baseline = math.inf
+        self.events.cancel("fire_baseline")
+        if self.bucket is not None:
+            self.add_to_bucket("cleanings_baseline", 1)
+            self.add_to_bucket("fires_baseline", 1 if fire else 0)
+            self.add_to_bucket("maintenance_cost_baseline",
+                               self.cost_of_track_cleaning_fire if fire else self.cost_of_track_cleaning_fireless)
+        if self.recorder is not None:
+            cost = self.total_maintenance_cost_baseline + self.total_productivity_loss_baseline - cost
+            event = event_recorder.FIRE if fire else event_recorder.SCHEDULED_CLEANING
+            self.recorder.record(self.time, event, event_recorder.BASELINE, aggregate_trash, cost)
 
     def clean_alt(self, fire):
+        if self.recorder is not None:
+            aggregate_trash = self.aggregate_trash_alt
+            cost = self.total_maintenance_cost_alt + self.total_productivity_loss_alt
         self.num_cleanings_alt = self.num_cleanings_alt + 1
         self.aggregate_trash_alt = 0
         # Include some time delay for the cleaning and add to productivity loss
@@ -227,74 +460,168 @@ class Station:
             self.num_threshold_cleanings = self.num_threshold_cleanings + 1
             # increment productivity loss
         self.increase_productivity_loss(False, False)
-        self.next_fire_arrival_alt = math.inf
+        self.events.cancel("fire_alt")
+        if self.bucket is not None:
+            self.add_to_bucket("cleanings_alt", 1)
+            self.add_to_bucket("fires_alt", 1 if fire else 0)
+            self.add_to_bucket("maintenance_cost_alt",
+                               self.cost_of_track_cleaning_fire if fire else self.cost_of_track_cleaning_fireless)
+        if self.recorder is not None:
+            cost = self.total_maintenance_cost_alt + self.total_productivity_loss_alt - cost
+            event = event_recorder.FIRE if fire else event_recorder.THRESHOLD_CLEANING
+            self.recorder.record(self.time, event, event_recorder.ALT, aggregate_trash, cost)
+
+    def handle_trash_arrival(self):
+        if self.ridership_profile is None:
+            self.events.schedule("trash", self.time + self.trash_interarrivals.next())
+        else:
+            self.trash_clock = self.trash_clock + self.trash_interarrivals.next()
+            self.events.schedule("trash", self.ridership_profile.time_at(self.trash_clock))
+        if self.time < self.end_time:
+            self.num_trash_arrivals = self.num_trash_arrivals + 1
+            if self.bucket is not None:
+                self.add_to_bucket("trash_arrivals", 1)
+        if self.tracer.active["trash_arrival"]:
+            self.tracer.emit("trash_arrival", self.time, aggregate_trash_baseline=self.aggregate_trash_baseline + 1,
+                             aggregate_trash_alt=self.aggregate_trash_alt + 1)
+        # TODO: In future, add check for if station is being cleaned before incrementing aggregate trash
+        self.aggregate_trash_baseline = self.aggregate_trash_baseline + 1
+        self.aggregate_trash_alt = self.aggregate_trash_alt + 1
+        if self.recorder is not None:
+            self.recorder.record(self.time, event_recorder.TRASH, event_recorder.BOTH, self.aggregate_trash_baseline, 0.0)
+        if self.aggregate_trash_alt > self.trash_threshold:
+            if self.tracer.active["threshold_cleaning"]:
+                self.tracer.emit("threshold_cleaning", self.time, aggregate_trash=self.aggregate_trash_alt)
+            self.clean_alt(False)
+        # We ALWAYS need to recalculate next fire arrival upon trash arrival
+        self.recalculate_next_fire_arrival()
+
+    def handle_scheduled_cleaning(self):
+        self.events.schedule("scheduled_cleaning", self.time + self.cleaning_rate)
+        if self.tracer.active["scheduled_cleaning"]:
+            self.tracer.emit("scheduled_cleaning", self.time, aggregate_trash=self.aggregate_trash_baseline)
+        self.clean_baseline(False)
+
+    def handle_fire_baseline(self):
+        if self.tracer.active["fire_baseline"]:
+            self.tracer.emit("fire_baseline", self.time, aggregate_trash=self.aggregate_trash_baseline)
+        self.num_fires_baseline = self.num_fires_baseline + 1
+        self.clean_baseline(True)
+        # when both sims have the same aggregate trash their fires are syncd; the alt
+        # fire is handled here too, so a syncd fire at or past end_time still burns
+        # both sims before simulate stops; it goes through handlers so a profiler
+        # (or anything else that wraps them) sees it as a fire_alt event
+        if self.events.time_of("fire_alt") == self.time:
+            self.events.cancel("fire_alt")
+            self.handlers["fire_alt"]()
+
+    def handle_fire_alt(self):
+        if self.tracer.active["fire_alt"]:
+            self.tracer.emit("fire_alt", self.time, aggregate_trash=self.aggregate_trash_alt)
+        self.num_fires_alt = self.num_fires_alt + 1
+        self.clean_alt(True)
 
     def simulate(self, end_time):
         # initialize start of simulation
+        self.end_time = end_time
         self.initialize_simulation()
-        while self.time < end_time:
-            smallest_residual = min(self.next_trash_arrival, self.next_scheduled_cleaning,
-                                    self.next_fire_arrival_baseline, self.next_fire_arrival_alt)
-            if self.next_trash_arrival == smallest_residual:
-                time_elapsed = self.next_trash_arrival
-                self.next_scheduled_cleaning = self.next_scheduled_cleaning - time_elapsed
-                self.next_trash_arrival = random.expovariate(self.trash_arrival_rate)
-                self.time = self.time + time_elapsed
-                # TODO: In future, add check for if station is being cleaned before incrementing aggregate trash
-                self.aggregate_trash_baseline = self.aggregate_trash_baseline + 1
-                self.aggregate_trash_alt = self.aggregate_trash_alt + 1
-                if self.aggregate_trash_alt > self.trash_threshold:
-                    print("tct: " + str(self.time))
-                    self.clean_alt(False)
-                # We ALWAYS need to recalculate next fire arrival upon trash arrival
-                self.recalculate_next_fire_arrival()
-            elif self.next_scheduled_cleaning == smallest_residual:
-                time_elapsed = self.next_scheduled_cleaning
-                self.next_trash_arrival = self.next_trash_arrival - time_elapsed
-                self.next_fire_arrival_alt = self.next_fire_arrival_alt - time_elapsed
-                self.next_scheduled_cleaning = self.cleaning_rate
-                self.time = self.time + time_elapsed
-                print("scat: " + str(self.aggregate_trash_baseline))
-                self.clean_baseline(False)
-            elif self.next_fire_arrival_baseline == smallest_residual:
-                nfab = self.next_fire_arrival_baseline
-                nfaa = self.next_fire_arrival_alt
-                time_elapsed = self.next_fire_arrival_baseline
-                self.next_scheduled_cleaning = self.next_scheduled_cleaning - time_elapsed
-                self.next_trash_arrival = self.next_trash_arrival - time_elapsed
-                self.time = self.time + time_elapsed
-                print("FIRE BASELINE")
-                self.num_fires_baseline = self.num_fires_baseline + 1
-                self.clean_baseline(True)  # Note: that this changes self.next_fire_arrival_baseline to infinity
-                if nfab == nfaa:
-                    # syncd: fire arrives at both stations
-                    print("FIRE ALT")
-                    self.num_fires_alt = self.num_fires_alt + 1
-                    self.clean_alt(True)
-                else:
-                    # not syncd: fire arrives only at baseline station
-                    self.next_fire_arrival_alt = self.next_fire_arrival_alt - time_elapsed
-            else: # self.next_fire_arrival_alt alone is the min
-                time_elapsed = self.next_fire_arrival_alt
-                self.next_scheduled_cleaning = self.next_scheduled_cleaning - time_elapsed
-                self.next_trash_arrival = self.next_trash_arrival - time_elapsed
-                self.next_fire_arrival_baseline = self.next_fire_arrival_baseline - time_elapsed
-                self.time = self.time + time_elapsed
-                self.num_fires_alt = self.num_fires_alt + 1
-                print("FIRE ALT")
-                self.clean_alt(True)
-
-
-def calculate_confidence_intervals(data, num_reps, Z):
-    sample_mean = sum(data)/float(len(data))
-    stddev = statistics.stdev(data)
-    ci_plus_minus = (Z * stddev) / math.sqrt(num_reps)
-    return sample_mean, stddev, ci_plus_minus
-
-
-def run_simulations(annual_ridership, num_track_beds, trash_threshold, cleaning_rate, comparison_var, limit = None):
+        if self.fire_rate_inflation_baseline == 1.0 and self.fire_rate_inflation_alt == 1.0:
+            while self.time < end_time:
+                self.time, event = self.events.pop()
+                self.handlers[event]()
+        else:
+            while self.time < end_time:
+                previous_time = self.time
+                self.time, event = self.events.pop()
+                # aggregate trash is constant between events
+                self.fire_exposure_baseline = self.fire_exposure_baseline + self.aggregate_trash_baseline * (self.time - previous_time)
+                self.fire_exposure_alt = self.fire_exposure_alt + self.aggregate_trash_alt * (self.time - previous_time)
+                self.handlers[event]()
+        if self.recorder is not None:
+            self.recorder.close()
+
+
+def calculate_confidence_intervals(stats, Z):
+    return stats.confidence_interval(Z)
+
+
+def metric_confidence_interval(accumulators, metric, Z, control_mean=None):
+    # plain interval, or the control variate interval when the known mean of the
+    # control (the trash arrival count) is given
+    if control_mean is None:
+        return calculate_confidence_intervals(accumulators[metric], Z)
+    return accumulators.control_variate_interval(metric, control_mean, Z)
+
+
+def add_bucket_totals(bucket_totals, s1):
+    # add the year's results by time bucket to bucket_totals
+    year = s1.year_bucket_results()
+    for metric in year:
+        if metric not in bucket_totals:
+            bucket_totals[metric] = [0] * len(year[metric])
+        for bucket in range(len(year[metric])):
+            bucket_totals[metric][bucket] = bucket_totals[metric][bucket] + year[metric][bucket]
+
+
+def simulate_antithetic_pair(s1, seed, rep, end_time, bucket_totals=None):
+    # replication rep and its mirror image (1 - U for every uniform), averaged into
+    # one observation
+    s1.seed(seed, rep)
+    s1.simulate(end_time)
+    year = s1.year_results()
+    if bucket_totals is not None:
+        add_bucket_totals(bucket_totals, s1)
+    s1.seed(seed, rep, antithetic=True)
+    s1.simulate(end_time)
+    mirror = s1.year_results()
+    if bucket_totals is not None:
+        add_bucket_totals(bucket_totals, s1)
+    pair = {}
+    for metric in METRICS:
+        pair[metric] = (year[metric] + mirror[metric]) / 2.0
+    return pair
+
+
+# With antithetic=True every replication is a year and its mirror image, and the
+# confidence intervals (and limit) count pairs, not years. With control_variate=True
+# the intervals and the stopping rule use estimates adjusted by the realized number
+# of trash arrivals, whose mean is known. With fire_rate_inflation > 1 (or "auto")
+# fires are importance sampled: each year is simulated with inflated fire rates and
+# each sim's results are weighted by its likelihood ratio, which keeps every
+# estimate unbiased and gives quiet stations far more fires to learn from. With a
+# cache (a cache.ResultCache) replications that were run before are loaded instead
+# of simulated again. With a checkpoint path the accumulators, the replication count
+# and the seed are saved there every checkpoint_every replications (and at the end),
+# and resume=True carries on from that file. Replication rep always runs on the
+# streams of (seed, rep), so a resumed run ends exactly where an uninterrupted one
+# would have. Each replication's results are traced as a year_summary event; pass
+# a tracing.Tracer to trace more or less than that, or to send it to a file or ring
+# buffer instead of the screen. With profile=True (or a profiling.Profiler, or inside
+# a profiling block) events, random draws and the time spent in every handler and
+# in the confidence interval math are counted, and reported at the end. With a
+# ridership_profile (a ridership.RidershipProfile) trash arrives faster in busy
+# hours and slower in quiet ones, and with bucket ("hour", "weekday" or "month")
+# the average of every year simulated (not loaded from the cache) is also reported
+# by time bucket.
+def run_simulations(annual_ridership, num_track_beds, trash_threshold, cleaning_rate, comparison_var, limit = None,
+                    seed = None, antithetic = False, control_variate = False, fire_rate_inflation = 1.0,
+                    cache = None, checkpoint = None, checkpoint_every = 10, resume = False, tracer = None,
+                    profile = False, ridership_profile = None, bucket = None):
     print("Starting")
-    s1 = Station(annual_ridership, num_track_beds, trash_threshold, cleaning_rate)
+    if tracer is None:
+        tracer = tracing.Tracer(tracing.SUMMARY)
+    if profile is True:
+        profiler = profiling.Profiler()
+    elif profile:
+        profiler = profile
+    else:
+        profiler = profiling.active
+    if profiler is not None:
+        started_profiler = not profiler.started
+        profiler.start()
+    s1 = Station(annual_ridership, num_track_beds, trash_threshold, cleaning_rate, tracer=tracer, profiler=profiler,
+                 ridership_profile=ridership_profile, bucket=bucket)
+    s1.set_fire_rate_inflation(fire_rate_inflation)
     print()
     print("Annual ridership: " + str(s1.annual_ridership))
     print("Number of Track Beds: " + str(s1.num_track_beds))
@@ -302,42 +629,115 @@ def run_simulations(annual_ridership, num_track_beds, trash_threshold, cleaning_
     print("Cleaning Period: " + str(s1.cleaning_rate))
     print("Trash arrival rate (number of units of trash per minute): " + str(s1.trash_arrival_rate))
     print("Expected aggregation of trash in 1 cleaning period: " + str(s1.trash_arrival_rate * s1.cleaning_rate))
+    if ridership_profile is not None:
+        print("Ridership profile: busiest hour " + str(max(ridership_profile.multipliers))
+              + " times the average, quietest " + str(min(ridership_profile.multipliers)))
+    if fire_rate_inflation != 1.0:
+        print("Baseline fire rate inflation (importance sampling): " + str(s1.fire_rate_inflation_baseline))
+        print("Alt fire rate inflation (importance sampling): " + str(s1.fire_rate_inflation_alt))
     print()
-    fires_baseline = []
-    fires_alt = []
-    cleanings_baseline = []
-    scheduled_cleanings = []
-    cleanings_alt = []
-    threshold_cleanings = []
-    maintenance_cost_baseline = []
-    maintenance_cost_alt = []
-    productivity_loss_baseline = []
-    productivity_loss_alt = []
+    state = None
+    if checkpoint is not None and resume and os.path.exists(checkpoint):
+        state = load_checkpoint(checkpoint)
+        if seed is None:
+            seed = state["seed"]
+        print("Resuming from checkpoint after " + str(state["reps"]) + " replications")
+    if cache is not None and seed is None:
+        print("No seed given, using seed 0 so replications can be cached")
+        seed = 0
+    if checkpoint is not None and seed is None:
+        seed = random.getrandbits(32)
+    if antithetic and seed is None:
+        seed = random.getrandbits(32)
+    elif seed is not None:
+        s1.seed(seed, 0)
+    if cache is not None:
+        cache_key = replication_key(s1.cache_parameters(seed, 525600, antithetic))
+    # replications loaded from the cache, 256 at a time
+    cached = {}
+    cached_until = 0
+    expected_trash_arrivals = s1.trash_arrival_rate * 525600
+    # every metric is tracked against a control with a known mean: the trash arrival
+    # count, or under importance sampling its sim's likelihood ratio (mean 1), which
+    # takes out the noise the weights add to the cost and productivity estimates
+    controls = {}
+    control_means = {}
+    for metric in METRICS:
+        controls[metric] = "trash_arrivals"
+        control_means[metric] = expected_trash_arrivals
+    if s1.fire_rate_inflation_baseline != 1.0:
+        for metric in ["maintenance_cost_baseline", "productivity_loss_baseline"]:
+            controls[metric] = "likelihood_ratio_baseline"
+            control_means[metric] = 1.0
+    if s1.fire_rate_inflation_alt != 1.0:
+        for metric in ["maintenance_cost_alt", "productivity_loss_alt"]:
+            controls[metric] = "likelihood_ratio_alt"
+            control_means[metric] = 1.0
+    # known control means of the metrics whose intervals (and stopping rule) are adjusted
+    adjusted_means = {}
+    for metric in METRICS:
+        if control_variate or controls[metric] != "trash_arrivals":
+            adjusted_means[metric] = control_means[metric]
+    accumulators = MetricAccumulators(METRICS, controls)
+    # metric -> total in every time bucket over the simulated years
+    bucket_totals = None if bucket is None else {}
+    simulated_years = 0
     Z = 1.96  # z-value for interval formula
     reps = 0
-    while True:
+    finished = False
+    if checkpoint is not None:
+        # everything that has to match for a checkpoint to belong to this run
+        run_parameters = {"parameters": s1.cache_parameters(seed, 525600, antithetic),
+                          "comparison_var": comparison_var, "limit": limit, "control_variate": control_variate}
+    if state is not None:
+        if state["run_parameters"] != run_parameters:
+            raise ValueError("CHECKPOINT " + checkpoint + " IS FROM A DIFFERENT RUN")
+        accumulators = state["accumulators"]
+        reps = state["reps"]
+        finished = state["finished"]
+    update_accumulators = accumulators.update
+    confidence_interval = metric_confidence_interval
+    if profiler is not None:
+        update_accumulators = profiler.timed("accumulators.update", update_accumulators)
+        confidence_interval = profiler.timed("metric_confidence_interval", confidence_interval)
+    while not finished:
         reps = reps + 1
-        s1.simulate(525600)
-        s1.print_year_simulation_summary()
-        fires_baseline.append(s1.num_fires_baseline)
-        fires_alt.append(s1.num_fires_alt)
-        cleanings_baseline.append(s1.num_cleanings_baseline)
-        scheduled_cleanings.append(s1.num_scheduled_cleanings)
-        cleanings_alt.append(s1.num_cleanings_alt)
-        threshold_cleanings.append(s1.num_threshold_cleanings)
-        maintenance_cost_baseline.append(s1.total_maintenance_cost_baseline)
-        maintenance_cost_alt.append(s1.total_maintenance_cost_alt)
-        productivity_loss_baseline.append(s1.total_productivity_loss_baseline)
-        productivity_loss_alt.append(s1.total_productivity_loss_alt)
+        if cache is not None and reps - 1 >= cached_until:
+            cached = cache.get_many(cache_key, range(reps - 1, reps - 1 + 256))
+            cached_until = reps - 1 + 256
+        if reps - 1 in cached:
+            year = cached[reps - 1]
+            print("Replication " + str(reps - 1) + " loaded from cache")
+        else:
+            if antithetic:
+                year = simulate_antithetic_pair(s1, seed, reps - 1, 525600, bucket_totals)
+                simulated_years = simulated_years + 2
+            else:
+                if seed is not None:
+                    s1.seed(seed, reps - 1)
+                s1.simulate(525600)
+                year = s1.year_results()
+                if bucket_totals is not None:
+                    add_bucket_totals(bucket_totals, s1)
+                simulated_years = simulated_years + 1
+            if s1.tracer.active["year_summary"]:
+                s1.tracer.emit("year_summary", s1.time, rep=reps - 1, **year)
+            if cache is not None:
+                cache.put(cache_key, reps - 1, year)
+        update_accumulators(year)
         # CI stuff
         if reps > 10:
-            fires_sample_mean_baseline, fires_stddev_baseline, fires_ci_baseline = calculate_confidence_intervals(fires_baseline, reps, Z)
-            fires_sample_mean_alt, fires_stddev_alt, fires_ci_alt = calculate_confidence_intervals(fires_alt, reps, Z)
-            maintenance_sample_mean_baseline, maintenance_stddev_baseline, maintenance_ci_baseline = calculate_confidence_intervals(maintenance_cost_baseline, reps, Z)
-            maintenance_sample_mean_alt, maintenance_stddev_alt, maintenance_ci_alt = calculate_confidence_intervals(maintenance_cost_alt, reps, Z)
-            productivity_sample_mean_baseline, productivity_stddev_baseline, productivity_ci_baseline = calculate_confidence_intervals(productivity_loss_baseline, reps, Z)
-            productivity_sample_mean_alt, productivity_stddev_alt, productivity_ci_alt = calculate_confidence_intervals(productivity_loss_alt, reps, Z)
-            print("number of yearlong simulations run: " + str(reps))
+            fires_sample_mean_baseline, fires_stddev_baseline, fires_ci_baseline = confidence_interval(accumulators, "fires_baseline", Z, adjusted_means.get("fires_baseline"))
+            fires_sample_mean_alt, fires_stddev_alt, fires_ci_alt = confidence_interval(accumulators, "fires_alt", Z, adjusted_means.get("fires_alt"))
+            maintenance_sample_mean_baseline, maintenance_stddev_baseline, maintenance_ci_baseline = confidence_interval(accumulators, "maintenance_cost_baseline", Z, adjusted_means.get("maintenance_cost_baseline"))
+            maintenance_sample_mean_alt, maintenance_stddev_alt, maintenance_ci_alt = confidence_interval(accumulators, "maintenance_cost_alt", Z, adjusted_means.get("maintenance_cost_alt"))
+            productivity_sample_mean_baseline, productivity_stddev_baseline, productivity_ci_baseline = confidence_interval(accumulators, "productivity_loss_baseline", Z, adjusted_means.get("productivity_loss_baseline"))
+            productivity_sample_mean_alt, productivity_stddev_alt, productivity_ci_alt = confidence_interval(accumulators, "productivity_loss_alt", Z, adjusted_means.get("productivity_loss_alt"))
+            if antithetic:
+                print("number of yearlong simulations run: " + str(2 * reps))
+                print("number of antithetic pairs: " + str(reps))
+            else:
+                print("number of yearlong simulations run: " + str(reps))
             print("baseline fires: " + str(fires_sample_mean_baseline) + " +/- " + str(fires_ci_baseline))
             print("alt fires: " + str(fires_sample_mean_alt) + " +/- " + str(fires_ci_alt))
             print("baseline maintenance: " + str(maintenance_sample_mean_baseline) + " +/- " + str(maintenance_ci_baseline))
@@ -378,56 +778,81 @@ def run_simulations(annual_ridership, num_track_beds, trash_threshold, cleaning_
         if limit is not None:
             if reps >= limit:
                 break
+        if checkpoint is not None and reps % checkpoint_every == 0:
+            save_checkpoint(checkpoint, {"run_parameters": run_parameters, "seed": seed, "reps": reps,
+                                         "accumulators": accumulators, "finished": False})
+    if checkpoint is not None:
+        save_checkpoint(checkpoint, {"run_parameters": run_parameters, "seed": seed, "reps": reps,
+                                     "accumulators": accumulators, "finished": True})
 
     print("\nFires baseline")
-    # print(fires_baseline)
-    print(sum(fires_baseline)/len(fires_baseline))
-    print(statistics.stdev(fires_baseline))
+    print(accumulators["fires_baseline"].mean)
+    print(accumulators["fires_baseline"].stdev())
 
     print("\nFires alt")
-    # print(fires_alt)
-    print(sum(fires_alt)/len(fires_alt))
-    print(statistics.stdev(fires_alt))
+    print(accumulators["fires_alt"].mean)
+    print(accumulators["fires_alt"].stdev())
 
     print("\nCleanings baseline")
-    # print(cleanings_baseline)
-    print(sum(cleanings_baseline)/len(cleanings_baseline))
-    print(statistics.stdev(cleanings_baseline))
+    print(accumulators["cleanings_baseline"].mean)
+    print(accumulators["cleanings_baseline"].stdev())
 
     print("\nScheduled Cleanings baseline")
-    # print(cleanings_baseline)
-    print(sum(scheduled_cleanings)/len(scheduled_cleanings))
-    print(statistics.stdev(scheduled_cleanings))
+    print(accumulators["scheduled_cleanings"].mean)
+    print(accumulators["scheduled_cleanings"].stdev())
 
     print("\nCleanings alt")
-    # print(cleanings_alt)
-    print(sum(cleanings_alt)/len(cleanings_alt))
-    print(statistics.stdev(cleanings_alt))
+    print(accumulators["cleanings_alt"].mean)
+    print(accumulators["cleanings_alt"].stdev())
 
     print("\nThreshold Cleanings alt")
-    # print(cleanings_alt)
-    print(sum(threshold_cleanings)/len(threshold_cleanings))
-    print(statistics.stdev(threshold_cleanings))
+    print(accumulators["threshold_cleanings"].mean)
+    print(accumulators["threshold_cleanings"].stdev())
 
     print("\nMaintenance baseline")
-    # print(maintenance_cost_baseline)
-    print(sum(maintenance_cost_baseline)/len(maintenance_cost_baseline))
-    print(statistics.stdev(maintenance_cost_baseline))
+    print(accumulators["maintenance_cost_baseline"].mean)
+    print(accumulators["maintenance_cost_baseline"].stdev())
 
     print("\nMaintenance alt")
-    # print(maintenance_cost_alt)
-    print(sum(maintenance_cost_alt)/len(maintenance_cost_alt))
-    print(statistics.stdev(maintenance_cost_alt))
+    print(accumulators["maintenance_cost_alt"].mean)
+    print(accumulators["maintenance_cost_alt"].stdev())
 
     print("\nProductivity baseline")
-    # print(maintenance_cost_baseline)
-    print(sum(productivity_loss_baseline)/len(productivity_loss_baseline))
-    print(statistics.stdev(productivity_loss_baseline))
+    print(accumulators["productivity_loss_baseline"].mean)
+    print(accumulators["productivity_loss_baseline"].stdev())
 
     print("\nProductivity alt")
-    # print(maintenance_cost_alt)
-    print(sum(productivity_loss_alt)/len(productivity_loss_alt))
-    print(statistics.stdev(productivity_loss_alt))
+    print(accumulators["productivity_loss_alt"].mean)
+    print(accumulators["productivity_loss_alt"].stdev())
+
+    print("\nTrash arrivals")
+    print(accumulators["trash_arrivals"].mean)
+    print(accumulators["trash_arrivals"].stdev())
+    print("Expected: " + str(expected_trash_arrivals))
+
+    if ridership_profile is None:
+        # renewal theory needs a constant trash arrival rate
+        print("\nAnalytic expectations (renewal reward)")
+        expected = s1.expected_year_results(525600)
+        for metric in ["fires_baseline", "fires_alt", "maintenance_cost_baseline", "maintenance_cost_alt",
+                       "productivity_loss_baseline", "productivity_loss_alt"]:
+            print(metric + ": " + str(expected[metric]))
+
+    if bucket_totals is not None and simulated_years > 0:
+        print("\nAverage per year by " + bucket + " (" + str(simulated_years) + " simulated years)")
+        for metric in BUCKET_METRICS:
+            print(metric + ": " + ", ".join(str(round(total / simulated_years, 3)) for total in bucket_totals[metric]))
+
+    print("\nControl variate adjusted")
+    for metric in ["fires_baseline", "fires_alt", "maintenance_cost_baseline", "maintenance_cost_alt",
+                   "productivity_loss_baseline", "productivity_loss_alt"]:
+        adjusted_mean, adjusted_stddev, adjusted_ci = accumulators.control_variate_interval(metric, control_means[metric], Z)
+        print(metric + " (" + controls[metric] + "): " + str(adjusted_mean) + " +/- " + str(adjusted_ci))
+    if profiler is not None:
+        if started_profiler:
+            profiler.stop()
+        profiler.report()
+    return accumulators
 
 
 # run_simulations(20000000, 1, 2500, 30240, "fires", 50)
@@ -441,7 +866,8 @@ def run_simulations(annual_ridership, num_track_beds, trash_threshold, cleaning_
 
 # run_simulations(13300000, 1, 1725, 36250, "maintenance", 1500)
 
-run_simulations(25000000, 1, 2150, 26280, "maintenance", 1500)
+if __name__ == "__main__":
+    run_simulations(25000000, 1, 2150, 26280, "maintenance", 1500)
 
 
 
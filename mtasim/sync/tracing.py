@@ -0,0 +1,101 @@
+from collections import deque
+
+
+# Structured tracing for the Station simulations, in place of print calls.
+#
+# Every trace record is an event name, the simulation time and a dict of fields.
+# Each event has a verbosity level, and a Tracer passes on the events at or below
+# its level (optionally only those named in events) to its sinks. Call sites check
+# tracer.active[event] before building a record, so a disabled event costs one dict
+# lookup and nothing is formatted.
+SILENT = 0
+SUMMARY = 1
+EVENTS = 2
+DETAIL = 3
+TRACE = 4
+
+EVENT_LEVELS = {"year_summary": SUMMARY,
+                "scheduled_cleaning": EVENTS,
+                "threshold_cleaning": EVENTS,
+                "fire_baseline": EVENTS,
+                "fire_alt": EVENTS,
+                "productivity_loss_baseline": DETAIL,
+                "productivity_loss_alt": DETAIL,
+                "trash_arrival": TRACE}
+
+
+def format_record(event, time, fields):
+    line = str(time) + " " + event
+    for name in fields:
+        line = line + " " + name + "=" + str(fields[name])
+    return line
+
+
+# prints every record to stdout
+class PrintSink:
+
+    def write(self, event, time, fields):
+        print(format_record(event, time, fields))
+
+    def close(self):
+        pass
+
+
+# appends every record to a text file, one line per record
+class FileSink:
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "a")
+
+    def write(self, event, time, fields):
+        self.file.write(format_record(event, time, fields) + "\n")
+
+    def close(self):
+        self.file.close()
+
+
+# keeps the last capacity records in memory, e.g. to look at what led up to a fire
+class RingBufferSink:
+
+    def __init__(self, capacity=10000):
+        self.records = deque(maxlen=capacity)
+
+    def write(self, event, time, fields):
+        self.records.append((event, time, fields))
+
+    def close(self):
+        pass
+
+
+class Tracer:
+
+    def __init__(self, level=EVENTS, events=None, sinks=None):
+        self.level = level
+        self.events = None if events is None else set(events)
+        self.sinks = [PrintSink()] if sinks is None else list(sinks)
+        # event -> whether it is traced
+        self.active = {}
+        self.update_active()
+
+    def update_active(self):
+        for event in EVENT_LEVELS:
+            self.active[event] = (len(self.sinks) > 0 and EVENT_LEVELS[event] <= self.level
+                                  and (self.events is None or event in self.events))
+
+    def set_level(self, level, events=None):
+        self.level = level
+        self.events = None if events is None else set(events)
+        self.update_active()
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+        self.update_active()
+
+    def emit(self, event, time, **fields):
+        for sink in self.sinks:
+            sink.write(event, time, fields)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
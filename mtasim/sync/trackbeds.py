@@ -0,0 +1,254 @@
+import math
+from mtasim.sync import prodloss
+
+
+# A station with several track beds, each with its own trash and its own fire clock,
+# simulated together in numpy.
+#
+# syncprod.Station divides the ridership by num_track_beds and simulates one track
+# bed. TrackBedStation simulates every track bed of the station (and, if asked,
+# many years at once): each (year, track bed) pair is a "lane" in a set of numpy
+# arrays, with the model, the rates, the costs and both policies of syncprod (the
+# periodic baseline and the threshold alt on the same trash), and the results are
+# added up to station totals. The track beds share the ridership equally unless
+# ridership_shares says otherwise.
+#
+# Each step draws the next block_size trash arrivals of every lane at once. A fire
+# happens when the exposure since the last reset (the integral of the track bed's
+# trash over time) reaches an Exp(1) / fire_arrival_rate_scalar draw, which the two
+# policies share until one of them resets, so until then they burn together like in
+# syncprod. Cumulative sums over the block give each lane's first fire, its
+# threshold cleaning (a fixed number of arrivals away) and its scheduled cleaning,
+# and only the earliest of those is processed; the arrivals drawn past it are
+# thrown away, which is fine since the arrivals and fire clocks are memoryless.
+# A block without an event just moves the lane to its last arrival. Like
+# syncprod, each lane keeps going until it has processed its first event (trash
+# arrival, cleaning or fire) at or past end_time.
+#
+# The number of steps depends on the events and blocks per lane, not on the number
+# of lanes, so four track beds cost little more than one. numpy is imported in the
+# functions that use it.
+
+# per-(year, track bed) values in bed_results, station totals in year_results
+BED_METRICS = ["fires_baseline", "fires_alt", "cleanings_baseline", "scheduled_cleanings", "cleanings_alt",
+               "threshold_cleanings", "maintenance_cost_baseline", "maintenance_cost_alt",
+               "productivity_loss_baseline", "productivity_loss_alt", "trash_arrivals"]
+
+
+def crossing_times(levels, gaps, exposures, exposure_left, arrivals, time):
+    # time at which each lane's exposure reaches exposure_left within the block,
+    # infinity if it does not; gap j of the block has levels + j units of trash
+    import numpy
+    crossed = exposures >= exposure_left[:, None]
+    found = crossed.any(axis=1)
+    gap = crossed.argmax(axis=1)
+    rows = numpy.arange(len(levels))
+    before = numpy.where(gap > 0, exposures[rows, gap - 1], 0.0)
+    start = numpy.where(gap > 0, arrivals[rows, gap - 1], time)
+    level = numpy.maximum(levels + gap, 1)
+    return numpy.where(found, start + (exposure_left - before) / level, math.inf)
+
+
+class TrackBedStation:
+
+    def __init__(self, annual_ridership, num_track_beds, trash_threshold, cleaning_rate, ridership_shares=None,
+                 block_size=512):
+        import numpy
+        self.annual_ridership = annual_ridership
+        self.num_track_beds = num_track_beds
+        self.trash_threshold = trash_threshold
+        self.cleaning_rate = cleaning_rate
+        if ridership_shares is None:
+            ridership_shares = [1.0] * num_track_beds
+        if len(ridership_shares) != num_track_beds:
+            raise ValueError("MUST PROVIDE ONE RIDERSHIP SHARE PER TRACK BED")
+        shares = numpy.asarray(ridership_shares, dtype=numpy.float64)
+        self.ridership_shares = shares / shares.sum()
+
+        # rates and costs of syncprod.Station, per track bed
+        self.trash_arrival_rate_scalar = 1.0/380
+        number_of_minutes_per_year = 525600
+        self.riders_per_minute_per_track = annual_ridership * self.ridership_shares / number_of_minutes_per_year
+        self.trash_arrival_rates = self.trash_arrival_rate_scalar * self.riders_per_minute_per_track
+        self.fire_arrival_rate_scalar = 1.0/100000000
+        self.cost_of_track_cleaning_fireless = 10000.0
+        self.cost_of_track_cleaning_fire = 30000.0
+        self.wage_per_minute = 0.56667
+        self.minutes_per_cleaning = 90
+        self.minutes_per_fire_repair = 270
+
+        # number of trash arrivals drawn per lane on each step
+        self.block_size = block_size
+
+        self.num_reps = 0
+        self.rng = None
+        # one entry per lane, year major
+        self.lane_rates = None
+        self.lane_riders = None
+        self.time = None
+        self.finished = None
+        self.trash_baseline = None
+        self.trash_alt = None
+        self.exposure_left_baseline = None
+        self.exposure_left_alt = None
+        self.next_scheduled_cleaning = None
+        self.results = {}
+        # steps taken by the last simulate
+        self.num_steps = 0
+
+    def initialize_simulation(self, num_reps, seed):
+        import numpy
+        self.num_reps = num_reps
+        self.rng = numpy.random.RandomState(seed)
+        num_lanes = num_reps * self.num_track_beds
+        self.lane_rates = numpy.tile(self.trash_arrival_rates, num_reps)
+        self.lane_riders = numpy.tile(self.riders_per_minute_per_track, num_reps)
+        self.time = numpy.zeros(num_lanes)
+        self.finished = numpy.zeros(num_lanes, dtype=bool)
+        self.trash_baseline = numpy.zeros(num_lanes, dtype=numpy.int64)
+        self.trash_alt = numpy.zeros(num_lanes, dtype=numpy.int64)
+        # both policies start with the same fire clock
+        self.exposure_left_baseline = self.rng.standard_exponential(num_lanes) / self.fire_arrival_rate_scalar
+        self.exposure_left_alt = self.exposure_left_baseline.copy()
+        self.next_scheduled_cleaning = numpy.full(num_lanes, float(self.cleaning_rate))
+        self.results = {}
+        for metric in BED_METRICS:
+            self.results[metric] = numpy.zeros(num_lanes)
+        self.num_steps = 0
+
+    def print_state(self):
+        print("--------------------------------")
+        print("Number of track beds: " + str(self.num_track_beds))
+        print("Number of replications: " + str(self.num_reps))
+        # station totals averaged over the replications
+        year = self.year_results()
+        for metric in BED_METRICS:
+            print(metric + ": " + str(year[metric].mean()))
+        print("--------------------------------\n\n")
+
+    def add_losses(self, metric, lanes, duration):
+        if lanes.size > 0:
+            self.results[metric][lanes] += prodloss.sample_productivity_loss(
+                self.lane_riders[lanes], duration, self.wage_per_minute, lanes.size, self.rng)
+
+    def advance(self, lanes, end_time):
+        import numpy
+        rng = self.rng
+        block_size = self.block_size
+        num_lanes = lanes.size
+        rows = numpy.arange(num_lanes)
+        steps = numpy.arange(block_size)
+
+        time = self.time[lanes]
+        trash_baseline = self.trash_baseline[lanes]
+        trash_alt = self.trash_alt[lanes]
+        exposure_left_baseline = self.exposure_left_baseline[lanes]
+        exposure_left_alt = self.exposure_left_alt[lanes]
+        next_scheduled_cleaning = self.next_scheduled_cleaning[lanes]
+
+        gaps = rng.standard_exponential((num_lanes, block_size)) / self.lane_rates[lanes, None]
+        arrivals = time[:, None] + numpy.cumsum(gaps, axis=1)
+        exposures_baseline = numpy.cumsum((trash_baseline[:, None] + steps) * gaps, axis=1)
+        exposures_alt = numpy.cumsum((trash_alt[:, None] + steps) * gaps, axis=1)
+        fire_baseline = crossing_times(trash_baseline, gaps, exposures_baseline, exposure_left_baseline, arrivals, time)
+        fire_alt = crossing_times(trash_alt, gaps, exposures_alt, exposure_left_alt, arrivals, time)
+
+        # arrivals that end the step: the one that takes the alt trash past the
+        # threshold, the first at or past end_time, or the last of the block
+        threshold_arrival = numpy.where(self.trash_threshold - trash_alt < block_size,
+                                        self.trash_threshold - trash_alt, block_size)
+        before_end = (arrivals < end_time).sum(axis=1)
+        arrival = numpy.minimum(numpy.minimum(threshold_arrival, before_end), block_size - 1)
+        arrival_time = arrivals[rows, arrival]
+
+        # the earliest other event, if it comes before that arrival
+        event_time = numpy.minimum(numpy.minimum(fire_baseline, fire_alt), next_scheduled_cleaning)
+        other = event_time < arrival_time
+        event_time = numpy.where(other, event_time, arrival_time)
+        num_arrivals = numpy.where(other, (arrivals < event_time[:, None]).sum(axis=1), arrival + 1)
+
+        # exposure up to the event
+        last = num_arrivals - 1
+        last_arrival = numpy.where(num_arrivals > 0, arrivals[rows, last], time)
+        consumed_baseline = numpy.where(num_arrivals > 0, exposures_baseline[rows, last], 0.0)
+        consumed_alt = numpy.where(num_arrivals > 0, exposures_alt[rows, last], 0.0)
+        partial = event_time - last_arrival
+        consumed_baseline = consumed_baseline + (trash_baseline + num_arrivals) * partial
+        consumed_alt = consumed_alt + (trash_alt + num_arrivals) * partial
+
+        self.time[lanes] = event_time
+        self.finished[lanes] = event_time >= end_time
+        self.trash_baseline[lanes] = trash_baseline + num_arrivals
+        self.trash_alt[lanes] = trash_alt + num_arrivals
+        self.exposure_left_baseline[lanes] = exposure_left_baseline - consumed_baseline
+        self.exposure_left_alt[lanes] = exposure_left_alt - consumed_alt
+        self.results["trash_arrivals"][lanes] += numpy.minimum(num_arrivals, before_end)
+
+        # a fresh fire clock for every policy that resets, shared when both do
+        fresh = rng.standard_exponential(num_lanes) / self.fire_arrival_rate_scalar
+        burned_baseline = other & (fire_baseline == event_time)
+        burned_alt = other & (fire_alt == event_time)
+        scheduled = other & (next_scheduled_cleaning == event_time)
+        threshold = ~other & (arrival == threshold_arrival)
+        reset_baseline = burned_baseline | scheduled
+        reset_alt = burned_alt | threshold
+        self.trash_baseline[lanes[reset_baseline]] = 0
+        self.exposure_left_baseline[lanes[reset_baseline]] = fresh[reset_baseline]
+        self.trash_alt[lanes[reset_alt]] = 0
+        self.exposure_left_alt[lanes[reset_alt]] = fresh[reset_alt]
+        # like syncprod, a fire leaves the cleaning schedule alone
+        self.next_scheduled_cleaning[lanes[scheduled]] += self.cleaning_rate
+
+        results = self.results
+        burned = lanes[burned_baseline]
+        results["fires_baseline"][burned] += 1
+        results["cleanings_baseline"][burned] += 1
+        results["maintenance_cost_baseline"][burned] += self.cost_of_track_cleaning_fire
+        self.add_losses("productivity_loss_baseline", burned, self.minutes_per_fire_repair)
+        cleaned = lanes[scheduled]
+        results["cleanings_baseline"][cleaned] += 1
+        results["scheduled_cleanings"][cleaned] += 1
+        results["maintenance_cost_baseline"][cleaned] += self.cost_of_track_cleaning_fireless
+        self.add_losses("productivity_loss_baseline", cleaned, self.minutes_per_cleaning)
+        burned = lanes[burned_alt]
+        results["fires_alt"][burned] += 1
+        results["cleanings_alt"][burned] += 1
+        results["maintenance_cost_alt"][burned] += self.cost_of_track_cleaning_fire
+        self.add_losses("productivity_loss_alt", burned, self.minutes_per_fire_repair)
+        cleaned = lanes[threshold]
+        results["cleanings_alt"][cleaned] += 1
+        results["threshold_cleanings"][cleaned] += 1
+        results["maintenance_cost_alt"][cleaned] += self.cost_of_track_cleaning_fireless
+        # like syncprod's clean_alt, every alt cleaning, fire or not, costs a cleaning's loss
+        self.add_losses("productivity_loss_alt", lanes[reset_alt], self.minutes_per_cleaning)
+
+    def simulate(self, end_time, num_reps=1, seed=None):
+        import numpy
+        self.initialize_simulation(num_reps, seed)
+        lanes = numpy.arange(num_reps * self.num_track_beds)
+        while lanes.size > 0:
+            self.advance(lanes, end_time)
+            self.num_steps = self.num_steps + 1
+            lanes = lanes[~self.finished[lanes]]
+        return self.year_results()
+
+    def bed_results(self):
+        # metric -> array of (replication, track bed) values
+        results = {}
+        for metric in BED_METRICS:
+            results[metric] = self.results[metric].reshape(self.num_reps, self.num_track_beds)
+        return results
+
+    def year_results(self):
+        # metric -> array of station totals, one per replication
+        results = {}
+        for metric in BED_METRICS:
+            results[metric] = self.results[metric].reshape(self.num_reps, self.num_track_beds).sum(axis=1)
+        return results
+
+
+if __name__ == "__main__":
+    print("Starting")
+    s1 = TrackBedStation(25000000, 4, 2150, 26280)
+    s1.simulate(525600, 100, seed=0)
+    s1.print_state()
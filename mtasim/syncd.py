@@ -187,21 +187,22 @@ class Station:
                 self.clean(True)
 
 
-print("Starting")
-# s1 = Station(40000000, 2, 6000, 30240)
-# s1 = Station(200000, 1, 6000, 30240)
-# s1 = Station(200000, 1, 6000, 250000)
-s1 = Station(40000000, 1, 6000, 60000)
-num_reps = 50
-reps = []
-for i in range(num_reps):
-    s1.simulate(525600)
-    s1.print_state()
-    reps.append(s1.num_fires)
-print()
-print(reps)
-print(sum(reps)/len(reps))
-print(statistics.stdev(reps))
+if __name__ == "__main__":
+    print("Starting")
+    # s1 = Station(40000000, 2, 6000, 30240)
+    # s1 = Station(200000, 1, 6000, 30240)
+    # s1 = Station(200000, 1, 6000, 250000)
+    s1 = Station(40000000, 1, 6000, 60000)
+    num_reps = 50
+    reps = []
+    for i in range(num_reps):
+        s1.simulate(525600)
+        s1.print_state()
+        reps.append(s1.num_fires)
+    print()
+    print(reps)
+    print(sum(reps)/len(reps))
+    print(statistics.stdev(reps))
 
 
 